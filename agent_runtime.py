@@ -0,0 +1,165 @@
+import asyncio
+import os
+import threading
+import time
+
+import httpx
+import pandas as pd
+from mistralai import Mistral
+
+from llm_client import RateLimitedClient
+
+
+# Process-wide pandas semantics, set once at startup by every entry point (UI, API, batch
+# workers) before any tool loads: shallow copies share column buffers and copy only what
+# gets written, which the execute_code snapshots rely on. pandas 3 always does this and
+# deprecates the option
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+
+class AgentRuntime:
+    """Long-lived event loop running in a background thread
+
+    Streamlit reruns submit coroutines here instead of calling asyncio.run(),
+    so the loop and the HTTP connection pools bound to it survive between queries.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "total_run_s": 0.0}
+
+        self._thread = threading.Thread(target=self._run_loop, name="agent-runtime", daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        """Schedule a coroutine on the runtime loop and return a concurrent Future"""
+        with self._lock:
+            self._stats["submitted"] += 1
+        return asyncio.run_coroutine_threadsafe(self._timed(coro), self.loop)
+
+    def run(self, coro, timeout=None):
+        """Submit a coroutine and block the calling thread until it finishes"""
+        return self.submit(coro).result(timeout)
+
+    async def _timed(self, coro):
+        started = time.perf_counter()
+        try:
+            result = await coro
+        except Exception:
+            with self._lock:
+                self._stats["failed"] += 1
+            raise
+        finally:
+            with self._lock:
+                self._stats["total_run_s"] += time.perf_counter() - started
+
+        with self._lock:
+            self._stats["completed"] += 1
+        return result
+
+    def get_metrics(self):
+        """Loop lifetime, task counts and connection reuse of the pooled clients"""
+        with self._lock:
+            stats = dict(self._stats)
+        with _clients_lock:
+            http = dict(_http_stats)
+            llm = {}
+            for client in _clients.values():
+                if isinstance(client, RateLimitedClient):
+                    llm.update(client.get_metrics())
+
+        finished = (stats["completed"] + stats["failed"]) or 1
+        clients = http["clients_created"] or 1
+        return {
+            "loop_uptime_s": time.time() - self.started_at,
+            "loop_running": self.loop.is_running(),
+            "tasks_submitted": stats["submitted"],
+            "tasks_completed": stats["completed"],
+            "tasks_failed": stats["failed"],
+            "avg_task_s": stats["total_run_s"] / finished,
+            "http_clients_created": http["clients_created"],
+            "http_requests": http["requests"],
+            "requests_per_client": http["requests"] / clients,
+            "client_cache_hits": http["cache_hits"],
+            "llm": llm,
+        }
+
+
+_runtime = None
+_runtime_lock = threading.Lock()
+
+
+def get_runtime():
+    """Return the process-wide runtime, starting it on first use"""
+    global _runtime
+    with _runtime_lock:
+        if _runtime is None:
+            _runtime = AgentRuntime()
+        return _runtime
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+_http_stats = {"clients_created": 0, "requests": 0, "cache_hits": 0}
+
+
+async def _count_request(request):
+    with _clients_lock:
+        _http_stats["requests"] += 1
+
+
+def _get_or_create(key, factory):
+    with _clients_lock:
+        if key in _clients:
+            _http_stats["cache_hits"] += 1
+            return _clients[key]
+
+        client = factory()
+        _clients[key] = client
+        _http_stats["clients_created"] += 1
+        return client
+
+
+def get_mistral_client(api_key=None):
+    """Shared Mistral client whose async connection pool lives on the runtime loop
+
+    Calls go through RateLimitedClient (per-model limits, retries, coalescing).
+    MISTRAL_SERVER_URL points the client at another endpoint, e.g. a local stub for load tests.
+    """
+    api_key = api_key or os.getenv("MISTRAL_API_KEY")
+    server_url = os.getenv("MISTRAL_SERVER_URL")
+
+    def factory():
+        async_client = httpx.AsyncClient(
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=120),
+            event_hooks={"request": [_count_request]}
+        )
+        if server_url:
+            return RateLimitedClient(Mistral(api_key=api_key, async_client=async_client, server_url=server_url))
+        return RateLimitedClient(Mistral(api_key=api_key, async_client=async_client))
+
+    return _get_or_create(("mistral", api_key), factory)
+
+
+def get_tavily_client(api_key=None):
+    """Shared Tavily client (TAVILY_API_BASE_URL overrides the endpoint)"""
+    from tavily import TavilyClient
+
+    api_key = api_key or os.getenv("TAVILY_API_KEY")
+    base_url = os.getenv("TAVILY_API_BASE_URL")
+
+    def factory():
+        client = TavilyClient(api_key)
+        if base_url:
+            client.base_url = base_url
+        return client
+
+    return _get_or_create(("tavily", api_key), factory)
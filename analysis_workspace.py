@@ -0,0 +1,278 @@
+import ast
+import contextlib
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+from session_store import session_dir
+
+
+logger = logging.getLogger(__name__)
+
+WORKSPACE_DIR = os.getenv("WORKSPACE_DIR", os.path.join(os.getenv("SESSION_STORE_DIR", ".session_store"), "workspaces"))
+WORKSPACE_MEMORY_MB = float(os.getenv("WORKSPACE_MEMORY_MB", 256))
+WORKSPACE_DISK_MB = float(os.getenv("WORKSPACE_DISK_MB", 2048))
+WORKSPACE_MAX_ENTRIES = int(os.getenv("WORKSPACE_MAX_ENTRIES", 30))
+# Workspaces untouched for this long are cleared and forgotten
+WORKSPACE_IDLE_S = float(os.getenv("WORKSPACE_IDLE_S", 24 * 3600))
+EVICT_EVERY_S = 60
+# Entries and columns per entry listed in the codegen prompt
+PROMPT_ENTRIES = 12
+PROMPT_COLUMNS = 8
+
+
+def dataset_fingerprint(df):
+    """Cheap identity of a dataset version: shape, columns and its first and last rows"""
+    if df is None:
+        return None
+    edges = pd.concat([df.head(5), df.tail(5)])
+    return df.shape, tuple(map(str, df.columns)), hashlib.sha1(edges.to_csv().encode()).hexdigest()
+
+
+def _nbytes(value):
+    usage = value.memory_usage(deep=True)
+    return int(usage.sum()) if isinstance(value, pd.DataFrame) else int(usage)
+
+
+def _describe(value):
+    index = type(value.index).__name__
+    if isinstance(value, pd.Series):
+        return f"Series {value.name!r}, {len(value)} rows, dtype {value.dtype}, index {index}"
+    columns = [f"{column}: {dtype}" for column, dtype in value.dtypes.astype(str).items()]
+    more = f", +{len(columns) - PROMPT_COLUMNS} more" if len(columns) > PROMPT_COLUMNS else ""
+    return f"DataFrame {value.shape[0]}x{value.shape[1]}, index {index}, columns {', '.join(columns[:PROMPT_COLUMNS])}{more}"
+
+
+class _Entry:
+    def __init__(self, name, value):
+        self.name = name
+        self.kind = type(value).__name__
+        self.series_name = value.name if isinstance(value, pd.Series) else None
+        self.description = _describe(value)
+        self.bytes = _nbytes(value)
+        self.value = value
+        self.path = None
+        self.disk_bytes = 0
+
+
+class AnalysisWorkspace:
+    """Named DataFrames and Series kept between the code executions of one session
+
+    After a successful run, frames the generated code assigned to new names are kept.
+    Later runs that reference a name get it injected as a variable. Least recently used
+    entries are spilled to Parquet past the memory budget and dropped past the disk
+    budget or entry cap. Everything is discarded when the base dataset changes.
+    """
+
+    def __init__(self, session_id, root=WORKSPACE_DIR, memory_mb=WORKSPACE_MEMORY_MB,
+                 disk_mb=WORKSPACE_DISK_MB, max_entries=WORKSPACE_MAX_ENTRIES):
+        self.session_id = session_id
+        # Validated and resolved: clear() removes this directory
+        self.directory = session_dir(root, session_id)
+        self.memory_budget = int(memory_mb * 2**20)
+        self.disk_budget = int(disk_mb * 2**20)
+        self.max_entries = max_entries
+
+        self.dataset_key = None
+        self.last_access = time.time()
+        self.stats = {"captured": 0, "reused": 0, "spilled": 0, "reloaded": 0, "dropped": 0, "invalidated": 0}
+        self._entries = OrderedDict()  # name -> _Entry, least recently used first
+        self._lock = threading.RLock()
+        _register(self)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    @property
+    def memory_bytes(self):
+        return sum(entry.bytes for entry in self._entries.values() if entry.value is not None)
+
+    @property
+    def disk_bytes(self):
+        return sum(entry.disk_bytes for entry in self._entries.values())
+
+    def bind(self, df):
+        """Discard every entry unless df is the dataset they were computed from"""
+        key = dataset_fingerprint(df)
+        with self._lock:
+            if key == self.dataset_key:
+                return
+            if self._entries:
+                logger.info("workspace %s: dataset changed, dropping %d entries", self.session_id, len(self._entries))
+                self.stats["invalidated"] += len(self._entries)
+            self.clear()
+            self.dataset_key = key
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def inputs(self, code):
+        """Entries that code refers to by name, read back from disk if spilled"""
+        try:
+            names = {node.id for node in ast.walk(ast.parse(code)) if isinstance(node, ast.Name)}
+        except SyntaxError:
+            return {}
+
+        with self._lock:
+            self.last_access = time.time()
+            values = {name: self._load(name) for name in names if name in self._entries}
+            self.stats["reused"] += len(values)
+            self._enforce_budgets()
+            return values
+
+    def capture(self, namespace, injected, reserved=(), base=None):
+        """Keep the DataFrames and Series an execution left in its globals
+
+        injected are the values passed in from inputs(); they are stored again only if
+        the code rebound or reshaped them. reserved names and the base dataset are skipped.
+        """
+        with self._lock:
+            for name, value in namespace.items():
+                if name.startswith("_") or name in reserved or value is base \
+                        or not isinstance(value, (pd.DataFrame, pd.Series)):
+                    continue
+                entry = self._entries.get(name)
+                if value is injected.get(name) and entry is not None and entry.description == _describe(value):
+                    continue
+                self.put(name, value)
+
+    def put(self, name, value):
+        with self._lock:
+            self._drop(name)
+            self._entries[name] = _Entry(name, value)
+            self.stats["captured"] += 1
+            self.last_access = time.time()
+            self._enforce_budgets()
+
+    def spill(self):
+        """Move every in-memory entry to disk; returns the bytes released"""
+        with self._lock:
+            before = self.memory_bytes
+            for entry in list(self._entries.values()):
+                if entry.value is not None:
+                    self._spill(entry)
+            return before - self.memory_bytes
+
+    def describe(self):
+        """One line per entry for the codegen prompt, most recently used first"""
+        with self._lock:
+            entries = list(reversed(self._entries.values()))[:PROMPT_ENTRIES]
+        return "\n".join(f"- {entry.name}: {entry.description}" for entry in entries)
+
+    def get_metrics(self):
+        return {"entries": len(self._entries), "memory_mb": self.memory_bytes / 2**20,
+                "disk_mb": self.disk_bytes / 2**20, **self.stats}
+
+    def _load(self, name):
+        entry = self._entries[name]
+        self._entries.move_to_end(name)
+        if entry.value is None:
+            frame = pd.read_parquet(entry.path)
+            entry.value = frame.iloc[:, 0].rename(entry.series_name) if entry.kind == "Series" else frame
+            self.stats["reloaded"] += 1
+        return entry.value
+
+    def _drop(self, name):
+        entry = self._entries.pop(name, None)
+        if entry is not None and entry.path:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(entry.path)
+
+    def _spill(self, entry):
+        if entry.path is None:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, f"{entry.name}.parquet")
+            frame = entry.value.to_frame(name="value") if entry.kind == "Series" else entry.value
+            try:
+                frame.to_parquet(path)
+            except Exception as e:
+                # e.g. non-string column labels or mixed-type object columns
+                logger.warning("workspace %s: cannot spill %s (%s), dropping it", self.session_id, entry.name, e)
+                self._drop(entry.name)
+                self.stats["dropped"] += 1
+                return
+            entry.path = path
+            entry.disk_bytes = os.path.getsize(path)
+        # An entry reloaded but unchanged still has its file, so spilling it again is free
+        entry.value = None
+        self.stats["spilled"] += 1
+
+    def _enforce_budgets(self):
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+            self.stats["dropped"] += 1
+
+        for entry in list(self._entries.values()):
+            if self.memory_bytes <= self.memory_budget:
+                break
+            if entry.value is not None:
+                self._spill(entry)
+
+        for entry in list(self._entries.values()):
+            if self.disk_bytes <= self.disk_budget:
+                break
+            if entry.path:
+                self._drop(entry.name)
+                self.stats["dropped"] += 1
+
+
+_workspaces = {}
+_workspaces_lock = threading.Lock()
+
+
+def _register(workspace):
+    with _workspaces_lock:
+        _workspaces[workspace.session_id] = workspace
+
+
+_last_eviction = 0.0
+
+
+def get_workspace(session_id):
+    """Process-wide workspace for a session id, creating it on first use"""
+    if time.time() - _last_eviction > EVICT_EVERY_S:
+        evict_idle_workspaces()
+    with _workspaces_lock:
+        workspace = _workspaces.get(session_id)
+    return workspace or AnalysisWorkspace(session_id)
+
+
+def evict_idle_workspaces(max_idle_s=WORKSPACE_IDLE_S):
+    """Clear and forget workspaces nobody used for max_idle_s; returns their session ids"""
+    global _last_eviction
+    now = time.time()
+    _last_eviction = now
+    with _workspaces_lock:
+        idle = [workspace for workspace in _workspaces.values() if now - workspace.last_access > max_idle_s]
+        for workspace in idle:
+            del _workspaces[workspace.session_id]
+
+    for workspace in idle:
+        workspace.clear()
+    return [workspace.session_id for workspace in idle]
+
+
+def spill_workspaces(session_ids=None):
+    """Spill the workspaces of the given sessions (default: all); returns the bytes released"""
+    with _workspaces_lock:
+        workspaces = [workspace for workspace in _workspaces.values()
+                      if session_ids is None or workspace.session_id in session_ids]
+    return sum(workspace.spill() for workspace in workspaces)
+
+
+def workspace_report():
+    """Entries and memory per workspace, most recently used first"""
+    with _workspaces_lock:
+        workspaces = sorted(_workspaces.values(), key=lambda workspace: workspace.last_access, reverse=True)
+    return [{"session_id": workspace.session_id, **workspace.get_metrics()} for workspace in workspaces]
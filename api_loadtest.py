@@ -0,0 +1,173 @@
+"""Load test of api_server against local stub Mistral and Tavily backends
+
+    python api_loadtest.py --requests 500 --concurrency 32 --stub-latency-ms 50
+
+No real API is called: the stub answers chat completions (with a news tool call when
+the question mentions news) and Tavily search/extract with canned articles. Reports
+requests/sec and p50/p95 latency per scenario, plus the server's own endpoint metrics.
+/prices is not exercised because it scrapes live provider sites.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+
+def stub_backend(latency_s):
+    """Starlette app answering like Mistral chat completions and Tavily search/extract"""
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse
+    from starlette.routing import Route
+
+    async def chat(request):
+        body = await request.json()
+        await asyncio.sleep(latency_s)
+
+        last = body["messages"][-1]
+        if body.get("tools") and last["role"] == "user" and "news" in str(last.get("content", "")).lower():
+            message = {"role": "assistant", "content": "", "tool_calls": [{
+                "id": uuid.uuid4().hex[:9], "type": "function",
+                "function": {"name": "greek_news_tool", "arguments": json.dumps({"query": "ενέργεια"})},
+            }]}
+            finish_reason = "tool_calls"
+        else:
+            message = {"role": "assistant", "content": "Stub answer.", "tool_calls": None}
+            finish_reason = "stop"
+
+        return JSONResponse({
+            "id": uuid.uuid4().hex, "object": "chat.completion", "model": body["model"], "created": int(time.time()),
+            "usage": {"prompt_tokens": 100, "completion_tokens": 20, "total_tokens": 120},
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+        })
+
+    async def search(request):
+        await asyncio.sleep(latency_s)
+        return JSONResponse({"query": (await request.json()).get("query"), "response_time": latency_s, "results": [
+            {"url": f"https://energypress.gr/article-{i}", "title": f"Stub article {i}",
+             "content": "Electricity prices in Greece ...", "score": 0.9}
+            for i in range(5)
+        ]})
+
+    async def extract(request):
+        await asyncio.sleep(latency_s)
+        urls = (await request.json()).get("urls", [])
+        return JSONResponse({"results": [{"url": url, "raw_content": "Full stub article text."} for url in urls],
+                             "failed_results": []})
+
+    return Starlette(routes=[
+        Route("/v1/chat/completions", chat, methods=["POST"]),
+        Route("/search", search, methods=["POST"]),
+        Route("/extract", extract, methods=["POST"]),
+    ])
+
+
+def serve(app, port):
+    """Run an ASGI app with uvicorn in a daemon thread and wait until it accepts connections"""
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, name=f"uvicorn-{port}", daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def synthetic_dataset(rows=24 * 90):
+    index = pd.date_range("2025-01-01", periods=rows, freq="h")
+    hours = np.arange(rows)
+    consumption = 5 + 2 * np.sin(2 * np.pi * hours / 24) + np.random.default_rng(0).normal(0, 0.3, rows)
+    buffer = io.StringIO()
+    pd.DataFrame({"Timestamp_UTC": index, "Consumption_kWh": consumption}).to_csv(buffer, index=False)
+    return buffer.getvalue().encode()
+
+
+def scenarios(dataset_id):
+    return [
+        ("analyze", "/analyze", {"query": "What is the average consumption?", "dataset_id": dataset_id}),
+        ("analyze_news", "/analyze", {"query": "Latest energy news in Greece?"}),
+        ("forecast", "/forecast", {"dataset_id": dataset_id, "column_name": "Consumption_kWh",
+                                   "prediction_length": 48}),
+    ]
+
+
+async def run_load(base_url, total, concurrency):
+    import httpx
+
+    # /metrics needs the admin token when the server has one
+    token = os.getenv("API_ADMIN_TOKEN")
+    headers = {"Authorization": f"Bearer {token}"} if token else None
+    async with httpx.AsyncClient(base_url=base_url, timeout=300, headers=headers) as client:
+        response = await client.post("/datasets", params={"name": "load.csv"}, content=synthetic_dataset())
+        response.raise_for_status()
+        mix = scenarios(response.json()["dataset_id"])
+
+        latencies = defaultdict(list)
+        statuses = defaultdict(lambda: defaultdict(int))
+        issued = 0
+
+        async def worker():
+            nonlocal issued
+            while issued < total:
+                name, path, body = mix[issued % len(mix)]
+                issued += 1
+                started = time.perf_counter()
+                try:
+                    status = (await client.post(path, json=body)).status_code
+                except httpx.HTTPError:
+                    status = "error"
+                latencies[name].append(time.perf_counter() - started)
+                statuses[name][status] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+        server_metrics = (await client.get("/metrics")).json()
+
+    report = {"requests": total, "concurrency": concurrency, "seconds": elapsed, "requests_per_s": total / elapsed}
+    all_latencies = np.concatenate([np.array(values) for values in latencies.values()]) * 1000
+    report["p50_ms"] = float(np.percentile(all_latencies, 50))
+    report["p95_ms"] = float(np.percentile(all_latencies, 95))
+    report["scenarios"] = {
+        name: {"count": len(values), "statuses": dict(statuses[name]),
+               "p50_ms": float(np.percentile(np.array(values) * 1000, 50)),
+               "p95_ms": float(np.percentile(np.array(values) * 1000, 95))}
+        for name, values in latencies.items()
+    }
+    report["server"] = server_metrics["endpoints"]
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--stub-latency-ms", type=float, default=50)
+    parser.add_argument("--stub-port", type=int, default=8765)
+    parser.add_argument("--api-port", type=int, default=8766)
+    args = parser.parse_args()
+
+    serve(stub_backend(args.stub_latency_ms / 1000), args.stub_port)
+
+    # Must be set before the agent builds its clients
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    os.environ.update({"MISTRAL_SERVER_URL": stub_url, "TAVILY_API_BASE_URL": stub_url,
+                       "MISTRAL_API_KEY": "stub", "TAVILY_API_KEY": "stub"})
+
+    from api_server import app
+
+    serve(app, args.api_port)
+    report = asyncio.run(run_load(f"http://127.0.0.1:{args.api_port}", args.requests, args.concurrency))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,463 @@
+import asyncio
+import base64
+import contextlib
+import hmac
+import io
+import json
+import logging
+import math
+import os
+import time
+import uuid
+from collections import OrderedDict, deque
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from agent_runtime import get_runtime
+from analysis_workspace import get_workspace, workspace_report
+from dataset_store import load_dataset
+from main_agent import MainAgent
+from memory_accounting import MemoryBudgetError, get_memory_accountant
+from session_store import get_session_store, valid_session_id
+
+
+logger = logging.getLogger(__name__)
+
+MAX_DATASETS = int(os.getenv("API_MAX_DATASETS", 32))
+HEARTBEAT_S = float(os.getenv("API_HEARTBEAT_S", 5))
+# /metrics and /admin/memory list sessions: they need this bearer token, or come from localhost when it is unset
+ADMIN_TOKEN = os.getenv("API_ADMIN_TOKEN")
+_LOCAL_HOSTS = {"127.0.0.1", "::1", "localhost"}
+
+# Endpoint: (requests run at once, requests allowed to wait); override with API_<NAME>_CONCURRENCY/_QUEUE
+ENDPOINT_LIMITS = {
+    "analyze": (8, 64),
+    "forecast": (4, 32),
+    "prices": (4, 32),
+    "analysis": (4, 16),
+}
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class EndpointLimiter:
+    """Concurrency cap with a bounded wait queue for one endpoint
+
+    Requests beyond `concurrency` wait their turn; once `max_queue` are waiting,
+    new ones are rejected with 503 instead of piling up.
+    """
+
+    def __init__(self, name, concurrency, max_queue):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.waiting = 0
+        self.running = 0
+        self.stats = {"completed": 0, "failed": 0, "rejected": 0}
+        self.latencies = deque(maxlen=2000)
+        self.queue_waits = deque(maxlen=2000)
+
+    @property
+    def full(self):
+        return self.waiting >= self.max_queue
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        if self.full:
+            self.stats["rejected"] += 1
+            raise ApiError(503, f"{self.name} queue is full, retry later")
+
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        started = time.perf_counter()
+        self.queue_waits.append(started - queued_at)
+        self.running += 1
+        try:
+            yield
+            self.stats["completed"] += 1
+        except Exception:
+            self.stats["failed"] += 1
+            raise
+        finally:
+            self.running -= 1
+            self._semaphore.release()
+            self.latencies.append(time.perf_counter() - queued_at)
+
+    def get_metrics(self):
+        latencies = np.array(self.latencies) * 1000
+        waits = np.array(self.queue_waits) * 1000
+        return {
+            "concurrency": self.concurrency,
+            "max_queue": self.max_queue,
+            "running": self.running,
+            "waiting": self.waiting,
+            **self.stats,
+            "p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else None,
+            "p95_ms": float(np.percentile(latencies, 95)) if len(latencies) else None,
+            "p95_queue_wait_ms": float(np.percentile(waits, 95)) if len(waits) else None,
+        }
+
+
+def _limiter(name):
+    concurrency, max_queue = ENDPOINT_LIMITS[name]
+    return EndpointLimiter(
+        name,
+        int(os.getenv(f"API_{name.upper()}_CONCURRENCY", concurrency)),
+        int(os.getenv(f"API_{name.upper()}_QUEUE", max_queue)),
+    )
+
+
+LIMITERS = {name: _limiter(name) for name in ENDPOINT_LIMITS}
+
+_agent = None
+_datasets = OrderedDict()
+
+
+def get_agent():
+    global _agent
+    if _agent is None:
+        _agent = MainAgent(os.getenv("MISTRAL_API_KEY"), preload_tools=True)
+    return _agent
+
+
+async def _on_runtime(coro):
+    """Await a coroutine on the agent runtime loop, where the pooled API clients live"""
+    return await asyncio.wrap_future(get_runtime().submit(coro))
+
+
+def to_jsonable(value, figures=True):
+    """Convert tool results (frames, arrays, figures, timestamps) into JSON-ready values"""
+    if isinstance(value, dict):
+        return {str(key): to_jsonable(item, figures) for key, item in value.items()}
+    if isinstance(value, (list, tuple, range)):
+        return [to_jsonable(item, figures) for item in value]
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return json.loads(value.to_json(orient="split", date_format="iso"))
+    if isinstance(value, pd.Index):
+        return [to_jsonable(item, figures) for item in value.tolist()]
+    if isinstance(value, (pd.Timestamp, datetime, date)):
+        return value.isoformat()
+    if isinstance(value, np.ndarray):
+        return to_jsonable(value.tolist(), figures)
+    if isinstance(value, np.generic):
+        return to_jsonable(value.item(), figures)
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if hasattr(value, "savefig"):
+        from matplotlib import pyplot as plt
+
+        encoded = None
+        if figures:
+            buffer = io.BytesIO()
+            value.savefig(buffer, format="png", bbox_inches="tight")
+            encoded = base64.b64encode(buffer.getvalue()).decode("ascii")
+        plt.close(value)
+        return encoded and {"png_base64": encoded}
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    if value is None or isinstance(value, (str, int, bool)):
+        return value
+    return str(value)
+
+
+async def _json_body(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise ApiError(400, "Request body must be JSON")
+    if not isinstance(body, dict):
+        raise ApiError(400, "Request body must be a JSON object")
+    return body
+
+
+def _require(body, *keys):
+    missing = [key for key in keys if body.get(key) in (None, "")]
+    if missing:
+        raise ApiError(400, f"Missing field(s): {', '.join(missing)}")
+
+
+def _require_admin(request):
+    if ADMIN_TOKEN:
+        if not hmac.compare_digest(request.headers.get("authorization", ""), f"Bearer {ADMIN_TOKEN}"):
+            raise ApiError(401, "Admin token required")
+    elif request.client is None or request.client.host not in _LOCAL_HOSTS:
+        raise ApiError(403, "Only available from localhost unless API_ADMIN_TOKEN is set")
+
+
+def _positive_int(value, name):
+    """value as an int >= 1 (24, 24.0 or "24"), or a 400 error"""
+    try:
+        number = int(value)
+        valid = not isinstance(value, bool) and number == float(value) and number >= 1
+    except (TypeError, ValueError, OverflowError):
+        valid = False
+    if not valid:
+        raise ApiError(400, f"{name} must be a positive integer")
+    return number
+
+
+def _dataset(dataset_id):
+    if dataset_id is None:
+        return None
+    if dataset_id not in _datasets:
+        raise ApiError(404, f"Unknown dataset '{dataset_id}'")
+    _datasets.move_to_end(dataset_id)
+    return _datasets[dataset_id]
+
+
+def _dataset_info(dataset_id, dataset):
+    return {"dataset_id": dataset_id, "name": dataset.name, "rows": len(dataset.clean),
+            "columns": [{"name": name, "dtype": dtype} for name, dtype in dataset.schema],
+            "quality": dataset.quality}
+
+
+class _Upload(io.BytesIO):
+    """In-memory file with a name, as load_dataset expects from an upload widget"""
+
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+
+
+# --- datasets ---
+
+async def upload_dataset(request):
+    """POST /datasets?name=file.csv with the raw file as the body"""
+    name = request.query_params.get("name", "")
+    if not name.endswith((".csv", ".xlsx")):
+        raise ApiError(400, "Query parameter 'name' must end with .csv or .xlsx")
+
+    data = await request.body()
+    try:
+        dataset, _ = await asyncio.to_thread(load_dataset, _Upload(data, name))
+    except MemoryBudgetError as e:
+        raise ApiError(413, str(e))
+    if dataset is None:
+        raise ApiError(400, "Could not parse the dataset")
+
+    dataset_id = uuid.uuid4().hex
+    _datasets[dataset_id] = dataset
+    while len(_datasets) > MAX_DATASETS:
+        _datasets.popitem(last=False)
+    return JSONResponse(_dataset_info(dataset_id, dataset), status_code=201)
+
+
+async def get_dataset(request):
+    dataset_id = request.path_params["dataset_id"]
+    dataset = _dataset(dataset_id)
+    return JSONResponse({**_dataset_info(dataset_id, dataset), "summary": dataset.summary})
+
+
+async def delete_dataset(request):
+    _dataset(request.path_params["dataset_id"])
+    del _datasets[request.path_params["dataset_id"]]
+    return JSONResponse({"deleted": True})
+
+
+# --- agent ---
+
+def _analyze_payload(result, figures):
+    payload = {"type": result["type"], "response": result.get("llm_response", result.get("response"))}
+    if result["type"] == "tool_with_response":
+        payload["tool_results"] = to_jsonable(result["tool_results"], figures)
+    return payload
+
+
+def _line(event):
+    return json.dumps(event) + "\n"
+
+
+async def _stream_analyze(limiter, call, store, figures):
+    """NDJSON progress events while the agent works, then the result"""
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+
+    def on_event(event):
+        # Called on the runtime thread
+        loop.call_soon_threadsafe(events.put_nowait, event)
+
+    yield _line({"event": "queued", "waiting": limiter.waiting})
+    try:
+        async with limiter.slot():
+            yield _line({"event": "started"})
+            task = asyncio.ensure_future(_on_runtime(call(on_event)))
+
+            while True:
+                getter = asyncio.ensure_future(events.get())
+                done, _ = await asyncio.wait({task, getter}, timeout=HEARTBEAT_S,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if getter in done:
+                    yield _line(getter.result())
+                    continue
+                getter.cancel()
+                if task.done():
+                    break
+                yield _line({"event": "heartbeat"})
+
+            result = task.result()
+    except ApiError as e:
+        yield _line({"event": "error", "status": e.status, "error": e.message})
+        return
+    except Exception as e:
+        logger.exception("streamed analyze failed")
+        yield _line({"event": "error", "status": 500, "error": str(e)})
+        return
+
+    if store is not None:
+        store.set_history(result["conversation_history"])
+    yield _line({"event": "result", **_analyze_payload(result, figures)})
+
+
+async def analyze(request):
+    """POST /analyze {"query", "dataset_id"?, "session_id"?, "latency_budget_s"?, "stream"?, "figures"?}"""
+    body = await _json_body(request)
+    _require(body, "query")
+    if body.get("session_id") and not valid_session_id(body["session_id"]):
+        raise ApiError(400, "session_id must be 32 lowercase hex characters (uuid4().hex)")
+    dataset = _dataset(body.get("dataset_id"))
+    store = get_session_store(body["session_id"]) if body.get("session_id") else None
+    figures = body.get("figures", True)
+    agent = get_agent()
+
+    def call(on_event=None):
+        return agent.analyze_query(
+            body["query"],
+            dataset.clean if dataset is not None else None,
+            store.get_history() if store is not None else None,
+            latency_budget_s=body.get("latency_budget_s"),
+            dataset_summary=dataset.summary if dataset is not None else None,
+            on_event=on_event,
+            workspace=get_workspace(body["session_id"]) if body.get("session_id") else None
+        )
+
+    limiter = LIMITERS["analyze"]
+    if body.get("stream"):
+        # Reject before the 200 streaming response has started
+        if limiter.full:
+            limiter.stats["rejected"] += 1
+            raise ApiError(503, "analyze queue is full, retry later")
+        return StreamingResponse(_stream_analyze(limiter, call, store, figures), media_type="application/x-ndjson")
+
+    async with limiter.slot():
+        result = await _on_runtime(call())
+    if store is not None:
+        store.set_history(result["conversation_history"])
+    return JSONResponse(_analyze_payload(result, figures))
+
+
+async def _tool(endpoint, tool_name, args, dataset=None, figures=True):
+    async with LIMITERS[endpoint].slot():
+        result, text = await _on_runtime(get_agent().run_tool(
+            tool_name, json.dumps(args), dataset.clean if dataset is not None else None,
+            dataset_summary=dataset.summary if dataset is not None else None
+        ))
+    return {"text": text, "result": to_jsonable(result, figures)}
+
+
+async def forecast(request):
+    """POST /forecast {"dataset_id", "column_name", "prediction_length", "figures"?}"""
+    body = await _json_body(request)
+    _require(body, "dataset_id", "column_name", "prediction_length")
+    dataset = _dataset(body["dataset_id"])
+    if body["column_name"] not in dataset.clean.columns:
+        raise ApiError(400, f"Column '{body['column_name']}' not found")
+
+    length = _positive_int(body["prediction_length"], "prediction_length")
+    args = {"column_name": body["column_name"], "prediction_length": length}
+    return JSONResponse(await _tool("forecast", "forecast_tool", args, dataset, body.get("figures", False)))
+
+
+async def prices(request):
+    """POST /prices {"query"}"""
+    body = await _json_body(request)
+    _require(body, "query")
+    return JSONResponse(await _tool("prices", "live_price_tool", {"user_query": body["query"]}))
+
+
+async def analysis(request):
+    """POST /analysis {"dataset_id", "query", "figures"?}: generated pandas analysis without routing"""
+    body = await _json_body(request)
+    _require(body, "dataset_id", "query")
+    dataset = _dataset(body["dataset_id"])
+    args = {"user_query": body["query"]}
+    return JSONResponse(await _tool("analysis", "data_analysis_tool", args, dataset, body.get("figures", True)))
+
+
+# --- operations ---
+
+async def metrics(request):
+    _require_admin(request)
+    return JSONResponse(to_jsonable({
+        "endpoints": {name: limiter.get_metrics() for name, limiter in LIMITERS.items()},
+        "datasets": len(_datasets),
+        "runtime": get_runtime().get_metrics(),
+        "workspaces": workspace_report(),
+    }))
+
+
+async def admin_memory(request):
+    """GET /admin/memory?top=10: process RSS, the top sessions and tools, and dataset memory"""
+    _require_admin(request)
+    report = get_memory_accountant().report(_positive_int(request.query_params.get("top", 10), "top"))
+    report["datasets"] = sorted(
+        ({"dataset_id": dataset_id, "name": dataset.name, "mb": dataset.memory_bytes / 2**20}
+         for dataset_id, dataset in _datasets.items()),
+        key=lambda row: row["mb"], reverse=True
+    )
+    return JSONResponse(to_jsonable(report))
+
+
+async def health(request):
+    return JSONResponse({"status": "ok"})
+
+
+async def _api_error(request, exc):
+    return JSONResponse({"error": exc.message}, status_code=exc.status)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # Build the agent (and start preloading tools) before the first request
+    get_agent()
+    yield
+
+
+app = Starlette(
+    routes=[
+        Route("/health", health),
+        Route("/metrics", metrics),
+        Route("/admin/memory", admin_memory),
+        Route("/datasets", upload_dataset, methods=["POST"]),
+        Route("/datasets/{dataset_id}", get_dataset, methods=["GET"]),
+        Route("/datasets/{dataset_id}", delete_dataset, methods=["DELETE"]),
+        Route("/analyze", analyze, methods=["POST"]),
+        Route("/forecast", forecast, methods=["POST"]),
+        Route("/prices", prices, methods=["POST"]),
+        Route("/analysis", analysis, methods=["POST"]),
+    ],
+    exception_handlers={ApiError: _api_error},
+    lifespan=lifespan,
+)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    logging.basicConfig(level=logging.INFO)
+    uvicorn.run(app, host=os.getenv("API_HOST", "127.0.0.1"), port=int(os.getenv("API_PORT", 8000)))
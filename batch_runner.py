@@ -0,0 +1,273 @@
+"""Run a suite of queries over every dataset in a directory, without Streamlit
+
+    python batch_runner.py data/ queries.txt --output runs/nightly --workers 4
+
+The query file has one question per line (blank lines and # comments are skipped),
+or, as .jsonl, one object per line: {"id": ..., "query": ...} for a question routed
+through the agent, or {"id": ..., "tool": ..., "args": {...}} to call a tool directly.
+
+Each (dataset, query) pair writes report.md, figures as PNG and tables as CSV to
+<output>/<dataset file name>/<query id>/, and finally result.json. Pairs with a successful
+result.json are skipped when the run is restarted, so an interrupted run resumes.
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+
+
+logger = logging.getLogger("batch_runner")
+
+DATASET_PATTERNS = (".csv", ".xlsx")
+
+
+def load_queries(path):
+    """Read the query suite into a list of {"id", "query"} or {"id", "tool", "args"} dicts"""
+    queries = []
+    with open(path, encoding="utf-8") as f:
+        lines = [line.strip() for line in f]
+
+    for line in lines:
+        if not line or line.startswith("#"):
+            continue
+        entry = json.loads(line) if path.endswith(".jsonl") else {"query": line}
+        text = entry.get("query") or entry.get("tool", "")
+        slug = re.sub(r"[^a-z0-9]+", "_", text.lower()).strip("_")[:40]
+        entry.setdefault("id", f"q{len(queries) + 1:03d}_{slug}")
+        queries.append(entry)
+
+    ids = [entry["id"] for entry in queries]
+    if len(set(ids)) != len(ids):
+        raise ValueError("Query ids must be unique")
+    return queries
+
+
+def find_datasets(directory):
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith(DATASET_PATTERNS)
+    )
+
+
+def _query_dir(output, dataset_path, query):
+    # The extension is kept so a.csv and a.xlsx do not share a directory
+    return os.path.join(output, os.path.basename(dataset_path), query["id"])
+
+
+def is_done(output, dataset_path, query):
+    path = os.path.join(_query_dir(output, dataset_path, query), "result.json")
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f).get("status") == "ok"
+    except (OSError, ValueError):
+        return False
+
+
+# --- worker process ---
+
+_agent = None
+_runtime = None
+
+
+def _init_worker(api_key, log_level):
+    global _agent, _runtime
+
+    import matplotlib
+    matplotlib.use("Agg")
+    logging.basicConfig(level=log_level, format="%(asctime)s %(processName)s %(name)s: %(message)s")
+
+    from agent_runtime import get_runtime
+    from main_agent import MainAgent
+
+    _agent = MainAgent(api_key)
+    _runtime = get_runtime()
+
+
+def _write_outputs(directory, response, tool_results):
+    """Save figures, tables and the markdown report of one query; returns the written file names"""
+    import pandas as pd
+    from matplotlib import pyplot as plt
+
+    files = []
+    report = [response or "", ""]
+
+    for i, tool_result in enumerate(tool_results):
+        report.append(f"## {tool_result.get('type', 'tool')} ({i + 1})")
+        if tool_result.get("error"):
+            report.append(f"Error: {tool_result['error']}")
+        if tool_result.get("code"):
+            report.append(f"```python\n{tool_result['code']}\n```")
+        if tool_result.get("output"):
+            report.append(f"```\n{tool_result['output']}\n```")
+
+        figures = list(tool_result.get("figures", []))
+        tables = {key: tool_result[key] for key in ("table", "intervals") if tool_result.get(key) is not None}
+
+        if tool_result.get("type") == "forecast":
+            forecast = tool_result["result"]
+            figures.append(forecast["figure"])
+            index = tool_result.get("timestamps")
+            tables["forecast"] = pd.DataFrame(
+                {"low": forecast["low_quantile"], "median": forecast["median_forecast"],
+                 "high": forecast["high_quantile"]},
+                index=index if index is not None else forecast["forecast_index"]
+            )
+            report.append(f"Model: {tool_result.get('model')}\n\n{tool_result.get('digest', '')}")
+
+        for j, fig in enumerate(figures):
+            name = f"figure_{i + 1}_{j + 1}.png"
+            fig.savefig(os.path.join(directory, name), format="png", bbox_inches="tight")
+            plt.close(fig)
+            files.append(name)
+
+        for key, table in tables.items():
+            name = f"{key}_{i + 1}.csv"
+            table.to_csv(os.path.join(directory, name))
+            files.append(name)
+
+        report.append("")
+
+    files.append("report.md")
+    with open(os.path.join(directory, "report.md"), "w", encoding="utf-8") as f:
+        f.write("\n".join(report))
+    return files
+
+
+def _tool_error(result):
+    """The error a tool result reports, at the top level or in its nested result"""
+    if result.get("error"):
+        return result["error"]
+    inner = result.get("result")
+    # The news and live price tools report failures as success/status False
+    if isinstance(inner, dict) and (inner.get("success") is False or inner.get("status") is False):
+        return inner.get("error") or f"{result.get('type', 'tool')} failed"
+    return None
+
+
+def _run_query(df, summary, query):
+    if "tool" in query:
+        result, text = _runtime.run(_agent.run_tool(query["tool"], json.dumps(query.get("args", {})), df,
+                                                    dataset_summary=summary))
+        return text, [result]
+
+    result = _runtime.run(_agent.analyze_query(query["query"], df, dataset_summary=summary))
+    if result["type"] == "tool_with_response":
+        return result["llm_response"], result["tool_results"]
+    return result["response"], []
+
+
+def process_dataset(dataset_path, queries, output):
+    """Load one dataset and run every pending query on it; returns a status per query id"""
+    from main_agent import format_data_summary, load_data, profile_data
+    from tools.data_quality import clean_dataset, format_quality_report
+
+    statuses = {}
+    with open(dataset_path, "rb") as file:
+        df = load_data(file)
+    if df is None:
+        return {query["id"]: {"status": "error", "error": "could not load dataset"} for query in queries}
+    df, quality = clean_dataset(df)
+    summary = format_data_summary(profile_data(df)) + "\n" + format_quality_report(quality)
+
+    for query in queries:
+        directory = _query_dir(output, dataset_path, query)
+        os.makedirs(directory, exist_ok=True)
+
+        started = time.perf_counter()
+        record = {"dataset": dataset_path, "query": query}
+        try:
+            response, tool_results = _run_query(df, summary, query)
+            errors = [error for error in map(_tool_error, tool_results) if error]
+            # A tool error is a failed query, so --resume runs it again
+            record.update(status="error" if errors else "ok", files=_write_outputs(directory, response, tool_results),
+                          errors=errors, error="; ".join(errors) or None)
+        except Exception as e:
+            logger.exception("query %s on %s failed", query["id"], dataset_path)
+            record.update(status="error", error=str(e))
+        record["seconds"] = time.perf_counter() - started
+
+        # Written last and atomically: its presence marks the pair as done for --resume
+        path = os.path.join(directory, "result.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(record, f, indent=2, default=str)
+        os.replace(path + ".tmp", path)
+        statuses[query["id"]] = {key: record.get(key) for key in ("status", "error", "seconds")}
+
+    return statuses
+
+
+# --- driver ---
+
+def run_batch(dataset_dir, query_file, output, workers=1, resume=True, api_key=None):
+    """Process all datasets in parallel worker processes; returns a summary dict"""
+    queries = load_queries(query_file)
+    datasets = find_datasets(dataset_dir)
+    os.makedirs(output, exist_ok=True)
+
+    jobs = {}
+    skipped = 0
+    for dataset in datasets:
+        pending = [query for query in queries if not (resume and is_done(output, dataset, query))]
+        skipped += len(queries) - len(pending)
+        if pending:
+            jobs[dataset] = pending
+
+    total = sum(len(pending) for pending in jobs.values())
+    print(f"{len(datasets)} datasets x {len(queries)} queries: {total} to run, {skipped} already done",
+          file=sys.stderr)
+
+    started = time.perf_counter()
+    done, failed = 0, 0
+    # Spawned workers: the agent runtime and HTTP pools use threads, which do not survive fork
+    context = get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                             initargs=(api_key or os.getenv("MISTRAL_API_KEY"), logging.getLogger().level)) as pool:
+        futures = {pool.submit(process_dataset, dataset, pending, output): dataset
+                   for dataset, pending in jobs.items()}
+
+        for future in as_completed(futures):
+            dataset = futures[future]
+            try:
+                statuses = future.result()
+            except Exception as e:
+                statuses = {query["id"]: {"status": "error", "error": str(e)} for query in jobs[dataset]}
+
+            done += len(statuses)
+            failed += sum(status["status"] != "ok" for status in statuses.values())
+
+            elapsed = time.perf_counter() - started
+            eta = elapsed / done * (total - done) if done else 0
+            print(f"[{done}/{total}] {os.path.basename(dataset)}: "
+                  f"{sum(s['status'] == 'ok' for s in statuses.values())}/{len(statuses)} ok "
+                  f"(elapsed {elapsed:.0f}s, eta {eta:.0f}s)", file=sys.stderr)
+
+    summary = {"datasets": len(datasets), "queries": len(queries), "ran": done, "failed": failed,
+               "skipped": skipped, "seconds": time.perf_counter() - started}
+    with open(os.path.join(output, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a query suite over a directory of datasets")
+    parser.add_argument("datasets", help="directory with .csv/.xlsx datasets")
+    parser.add_argument("queries", help="query file (.txt, one per line, or .jsonl)")
+    parser.add_argument("--output", default="batch_output", help="output directory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--restart", action="store_true", help="rerun pairs that already completed")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    summary = run_batch(args.datasets, args.queries, args.output, args.workers, resume=not args.restart)
+    print(json.dumps(summary, indent=2))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+import hashlib
+import io
+import time
+
+import pandas as pd
+
+from main_agent import clean_csv_frame, extend_profile, format_data_summary, load_data, profile_data
+from memory_accounting import fit_dataset, frame_bytes
+from tools.data_quality import clean_append, clean_dataset, format_quality_report
+
+
+class LoadedDataset:
+    """A cleaned upload together with its profile and what is needed to detect appends
+
+    Only the cleaned frame is kept. Append detection uses the raw file's columns,
+    size, hash and header line.
+    """
+
+    def __init__(self, name, clean, quality, raw_columns, raw_size, raw_hash, header, profile, clean_bytes,
+                 version=1):
+        self.name = name
+        self.clean = clean
+        self.quality = quality
+        self.raw_columns = raw_columns
+        self.raw_size = raw_size
+        self.raw_hash = raw_hash
+        self.header = header
+        self.profile = profile
+        self.memory_bytes = clean_bytes
+        self.summary = format_data_summary(profile) + "\n" + format_quality_report(quality)
+        # Bumped whenever rows are added; caches derived from the frame key on (id(self), version)
+        self.version = version
+        self.load_seconds = 0.0
+
+    @property
+    def schema(self):
+        return list(zip(self.clean.columns, self.clean.dtypes.astype(str)))
+
+
+def _header(raw):
+    return raw.split(b"\n", 1)[0].rstrip(b"\r")
+
+
+def _parse(file):
+    file.seek(0)
+    return load_data(file)
+
+
+def _new_dataset(name, df, raw):
+    """Run the quality pass once over a freshly parsed file"""
+    clean, quality = clean_dataset(df)
+    # Large frames are downcast; raises MemoryBudgetError if still over the dataset limit
+    clean, clean_bytes, quality["downcast"] = fit_dataset(clean, name)
+    return LoadedDataset(name, clean, quality, list(df.columns), len(raw), hashlib.sha1(raw).hexdigest(),
+                         _header(raw), profile_data(clean), clean_bytes)
+
+
+def _append(previous, tail, raw):
+    """Clean only the parsed tail rows and merge them into the previous dataset and profile"""
+    raw_hash = hashlib.sha1(raw).hexdigest()
+    if tail.empty:
+        return LoadedDataset(previous.name, previous.clean, previous.quality, previous.raw_columns, len(raw),
+                             raw_hash, previous.header, previous.profile, previous.memory_bytes, previous.version)
+
+    merged, quality = clean_append(previous.clean, previous.quality, tail)
+    added = merged.iloc[len(previous.clean):]
+    merged, clean_bytes, quality["downcast"] = fit_dataset(
+        merged, previous.name, previous.memory_bytes + frame_bytes(added), previous.quality.get("downcast", False)
+    )
+    return LoadedDataset(
+        previous.name, merged, quality, previous.raw_columns, len(raw), raw_hash, previous.header,
+        extend_profile(previous.profile, added), clean_bytes, previous.version + 1
+    )
+
+
+def _csv_prefix_append(previous, raw):
+    """Parse only the bytes after the previously loaded file, if the new file extends it"""
+    if len(raw) <= previous.raw_size or _header(raw) != previous.header:
+        return None
+    if hashlib.sha1(raw[:previous.raw_size]).hexdigest() != previous.raw_hash:
+        return None
+
+    tail_bytes = raw[previous.raw_size:]
+    tail = pd.read_csv(io.BytesIO(previous.header + b"\n" + tail_bytes.lstrip(b"\r\n")))
+    tail = clean_csv_frame(tail)
+    if list(tail.columns) != previous.raw_columns:
+        return None
+    return _append(previous, tail, raw)
+
+
+def _timestamp_overlap_append(previous, df, raw):
+    """Take the rows of a freshly parsed file that come after the cached data"""
+    if list(df.columns) != previous.raw_columns or "Timestamp_UTC" not in df.columns:
+        return None
+
+    # The cleaned frame keeps Timestamp_UTC; its last row is the last real reading
+    last_seen = previous.clean["Timestamp_UTC"].max()
+    if pd.isna(last_seen) or not (df["Timestamp_UTC"] == last_seen).any():
+        return None
+
+    tail = df[df["Timestamp_UTC"] > last_seen].reset_index(drop=True)
+    return _append(previous, tail, raw)
+
+
+def load_dataset(file, previous=None):
+    """Load an upload, reusing or extending the previous dataset when possible
+
+    Returns (dataset, change) where change is one of:
+    "unchanged" - same bytes as before, nothing parsed
+    "appended"  - the file extends the previous dataset; only the new rows were parsed/profiled
+    "new"       - a different dataset, fully parsed
+    """
+    started = time.perf_counter()
+    raw = file.getvalue()
+
+    if previous is not None:
+        if len(raw) == previous.raw_size and hashlib.sha1(raw).hexdigest() == previous.raw_hash:
+            return previous, "unchanged"
+
+        extended = None
+        if file.name.endswith(".csv"):
+            extended = _csv_prefix_append(previous, raw)
+
+        if extended is None:
+            # Parsed but not cleaned yet: if it is an append only the new rows get cleaned
+            df = _parse(file)
+            if df is None:
+                return None, "new"
+            extended = _timestamp_overlap_append(previous, df, raw)
+            if extended is None:
+                dataset = _new_dataset(file.name, df, raw)
+                dataset.load_seconds = time.perf_counter() - started
+                return dataset, "new"
+
+        extended.load_seconds = time.perf_counter() - started
+        return extended, "appended"
+
+    df = _parse(file)
+    if df is None:
+        return None, "new"
+    dataset = _new_dataset(file.name, df, raw)
+    dataset.load_seconds = time.perf_counter() - started
+    return dataset, "new"
@@ -0,0 +1,232 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import time
+
+import httpx
+
+from model_tiers import estimate_tokens
+
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 4))
+BACKOFF_BASE_S = float(os.getenv("LLM_BACKOFF_BASE_S", 0.5))
+BACKOFF_MAX_S = float(os.getenv("LLM_BACKOFF_MAX_S", 20))
+DEFAULT_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 8))
+DEFAULT_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", 500_000))
+# Per-model overrides, e.g. {"codestral-2501": {"concurrency": 4, "tokens_per_minute": 200000}}
+MODEL_LIMITS = json.loads(os.getenv("LLM_MODEL_LIMITS", "{}"))
+# Completion tokens reserved when a request does not set max_tokens
+COMPLETION_TOKENS = 800
+
+
+class _ModelBudget:
+    """Concurrency slots and a tokens-per-minute bucket for one model"""
+
+    def __init__(self, model, concurrency, tokens_per_minute):
+        self.model = model
+        self.concurrency = concurrency
+        self.tokens_per_minute = tokens_per_minute
+        self.tokens = float(tokens_per_minute)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._lock = asyncio.Lock()
+        self.waiting = 0
+        self.in_flight = 0
+        self.stats = {"requests": 0, "coalesced": 0, "sent": 0, "retries": 0, "rate_limited": 0,
+                      "failed": 0, "tokens": 0, "total_queue_s": 0.0, "max_queue_s": 0.0}
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.tokens_per_minute, self.tokens + (now - self.updated) * self.tokens_per_minute / 60)
+        self.updated = now
+
+    async def acquire(self, tokens):
+        """Wait for a concurrency slot and enough token budget"""
+        started = time.monotonic()
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+            try:
+                # One request at a time waits on the bucket, so large requests are not starved
+                async with self._lock:
+                    tokens = min(tokens, self.tokens_per_minute)
+                    while True:
+                        self._refill()
+                        delay = self.blocked_until - time.monotonic()
+                        if delay <= 0 and self.tokens >= tokens:
+                            break
+                        await asyncio.sleep(max(delay, (tokens - self.tokens) * 60 / self.tokens_per_minute))
+                    self.tokens -= tokens
+            except BaseException:
+                self._semaphore.release()
+                raise
+        finally:
+            self.waiting -= 1
+
+        waited = time.monotonic() - started
+        self.in_flight += 1
+        self.stats["sent"] += 1
+        self.stats["total_queue_s"] += waited
+        self.stats["max_queue_s"] = max(self.stats["max_queue_s"], waited)
+
+    def release(self):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def refund(self, tokens):
+        self.tokens = min(self.tokens_per_minute, self.tokens + tokens)
+
+    def back_off(self, delay):
+        """Hold every request to this model, not just the one that got the 429"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+
+    def get_metrics(self):
+        sent = self.stats["sent"] or 1
+        return {
+            "concurrency": self.concurrency,
+            "tokens_per_minute": self.tokens_per_minute,
+            "waiting": self.waiting,
+            "in_flight": self.in_flight,
+            **{key: value for key, value in self.stats.items() if key not in ("total_queue_s", "max_queue_s")},
+            "avg_queue_ms": 1000 * self.stats["total_queue_s"] / sent,
+            "max_queue_ms": 1000 * self.stats["max_queue_s"],
+        }
+
+
+def _json_default(value):
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    return str(value)
+
+
+def _request_key(kwargs):
+    return hashlib.sha1(json.dumps(kwargs, sort_keys=True, default=_json_default).encode()).hexdigest()
+
+
+def _prompt_text(kwargs):
+    messages = kwargs.get("messages") or []
+    text = "".join(str(message.get("content") or "") for message in messages if isinstance(message, dict))
+    return text + json.dumps(kwargs.get("tools") or [], default=_json_default)
+
+
+def _status(error):
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def _retry_after(error):
+    response = getattr(error, "raw_response", None) or getattr(error, "response", None)
+    value = getattr(response, "headers", {}).get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _backoff(attempt, retry_after=None):
+    """Full-jitter exponential backoff, never shorter than the server's Retry-After"""
+    delay = random.uniform(0, min(BACKOFF_MAX_S, BACKOFF_BASE_S * 2 ** attempt))
+    return max(delay, retry_after or 0)
+
+
+class _Chat:
+    def __init__(self, owner):
+        self._owner = owner
+
+    async def complete_async(self, **kwargs):
+        return await self._owner.complete(**kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._owner.client.chat, name)
+
+
+class RateLimitedClient:
+    """Mistral client wrapper shared by the agent and its tools
+
+    `client.chat.complete_async(...)` keeps the SDK signature but goes through
+    per-model concurrency and token budgets, retries 429/5xx and connection errors
+    with jittered backoff, and sends identical concurrent requests only once.
+    Anything else is forwarded to the wrapped client.
+    """
+
+    def __init__(self, client, max_retries=MAX_RETRIES, model_limits=None):
+        self.client = client
+        self.max_retries = max_retries
+        self.model_limits = MODEL_LIMITS if model_limits is None else model_limits
+        self.chat = _Chat(self)
+        self._budgets = {}
+        self._in_flight = {}
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def _budget(self, model):
+        if model not in self._budgets:
+            limits = self.model_limits.get(model, {})
+            self._budgets[model] = _ModelBudget(
+                model,
+                limits.get("concurrency", DEFAULT_CONCURRENCY),
+                limits.get("tokens_per_minute", DEFAULT_TOKENS_PER_MINUTE),
+            )
+        return self._budgets[model]
+
+    async def complete(self, **kwargs):
+        budget = self._budget(kwargs.get("model"))
+        budget.stats["requests"] += 1
+
+        key = _request_key(kwargs)
+        task = self._in_flight.get(key)
+        if task is not None:
+            budget.stats["coalesced"] += 1
+        else:
+            task = asyncio.ensure_future(self._send(budget, kwargs))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+
+        # Shielded so one caller giving up does not cancel the request for the others
+        return await asyncio.shield(task)
+
+    async def _send(self, budget, kwargs):
+        tokens = estimate_tokens(_prompt_text(kwargs)) + (kwargs.get("max_tokens") or COMPLETION_TOKENS)
+
+        for attempt in range(self.max_retries + 1):
+            await budget.acquire(tokens)
+            try:
+                response = await self.client.chat.complete_async(**kwargs)
+            except Exception as e:
+                status = _status(e)
+                if not (status in RETRY_STATUSES or isinstance(e, httpx.TransportError)) \
+                        or attempt == self.max_retries:
+                    budget.stats["failed"] += 1
+                    raise
+
+                delay = _backoff(attempt, _retry_after(e))
+                budget.stats["retries"] += 1
+                if status == 429:
+                    budget.stats["rate_limited"] += 1
+                    budget.refund(tokens)
+                    budget.back_off(delay)
+                logger.warning("LLM %s failed (%s), retry %d in %.2fs", budget.model, status or e, attempt + 1, delay)
+            else:
+                usage = getattr(response, "usage", None)
+                budget.stats["tokens"] += getattr(usage, "total_tokens", 0) or 0
+                return response
+            finally:
+                budget.release()
+
+            await asyncio.sleep(delay)
+
+    def get_metrics(self):
+        """Per model: queue and in-flight counts, queueing delay, retries, 429s and coalesced requests"""
+        return {model: budget.get_metrics() for model, budget in list(self._budgets.items())}
+
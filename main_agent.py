@@ -1,44 +1,82 @@
+import asyncio
 import json
+import time
 import streamlit as st
 import pandas as pd
-from mistralai import Mistral
 
+from agent_runtime import get_mistral_client
+from memory_accounting import MemoryBudgetError, get_memory_accountant
+from model_tiers import ModelSelector, estimate_complexity, estimate_tokens
+from tool_registry import ToolRegistry
 
-from tools.news_tool import GreekNewsTool
-from tools.live_price_tool import LivePriceTool
-from tools.data_analysis_tool import DataAnalysisTool, execute_code
-from tools.forecast_tool import ChronosForecaster
+from tools.code_guard import format_findings, guard_code, worth_regenerating
+from tools.forecast_digest import forecast_digest, forecast_timestamps, series_step
+from tools.forecast_models import season_from_step
 
 
 class MainAgent:
     """Main agent that orchestrates data analysis and forecasting"""
 
-    def __init__(self, mistral_api_key):
-        self.client = Mistral(api_key=mistral_api_key)
-        self.data_analysis_tool = DataAnalysisTool(self.client)
-        self.forecaster = ChronosForecaster()
-        self.live_price_tool = LivePriceTool(self.client)
+    def __init__(self, mistral_api_key, preload_tools=False):
+        # Pooled client shared by every agent in the process
+        self.client = get_mistral_client(mistral_api_key)
+        self.model_selector = ModelSelector()
+
+        # Tools are imported and built on first use; their schemas need no imports
+        self.registry = ToolRegistry(self)
+        self.tools = self.registry.schemas()
         # self.bill_analysis_tool = BillAnalysisTool(self.client)
-        self.greek_news_tool = GreekNewsTool(self.client)
 
-        # Available tools for the agent
-        self.tools = [
-            self.data_analysis_tool.get_tool_schema(),
-            self.forecaster.get_tool_schema(),
-            self.live_price_tool.get_tool_schema(),
-            # self.bill_analysis_tool.get_tool_schema()
-            self.greek_news_tool.get_tool_schema(),
-        ]
+        if preload_tools:
+            self.registry.preload()
+
+    @property
+    def data_analysis_tool(self):
+        return self.registry.get("data_analysis_tool")
+
+    @property
+    def forecaster(self):
+        return self.registry.get("forecast_tool")
+
+    @property
+    def live_price_tool(self):
+        return self.registry.get("live_price_tool")
+
+    @property
+    def greek_news_tool(self):
+        return self.registry.get("greek_news_tool")
 
-    async def analyze_query(self, query, df, conversation_history=None):
-        """Main method that decides which tool to use based on query"""
-        global data_summary, tool_result_content, result
+    @property
+    def energy_kernel_tool(self):
+        return self.registry.get("energy_kernel_tool")
+
+    @property
+    def tariff_cost_tool(self):
+        return self.registry.get("tariff_cost_tool")
+
+    @property
+    def anomaly_tool(self):
+        return self.registry.get("anomaly_detection_tool")
+
+    async def analyze_query(self, query, df, conversation_history=None, latency_budget_s=None,
+                            dataset_summary=None, on_event=None, workspace=None):
+        """Main method that decides which tool to use based on query
+
+        latency_budget_s caps the model size picked for each LLM call of this request.
+        dataset_summary is a precomputed summary of df (e.g. from the upload cache).
+        on_event, if given, is called with progress dicts (tool started/finished, synthesizing).
+        workspace, the session's AnalysisWorkspace, keeps intermediate results between turns.
+        """
+        notify = on_event or (lambda event: None)
+        global data_summary
 
         if conversation_history is None:
             conversation_history = []
 
         if df is None:
             data_summary = None
+        elif dataset_summary is not None:
+            data_summary = dataset_summary
         else:
             data_summary = get_data_summary(df)
 
@@ -56,6 +94,9 @@ class MainAgent:
         - forecast_tool: For time-series forecasting using uploaded data
         - live_price_tool: For real-time Greek energy market price analysis and comparisons
         - greek_news_tool: For finding and summarizing current Greek news articles on any topic
+        - energy_kernel_tool: Instant load profiles, peak demand, daily/monthly energy, load factor and baseload split of uploaded datasets (no code generation needed)
+        - tariff_cost_tool: Ranks every live provider contract by annual cost for the user's uploaded consumption data, with savings against their current contract
+        - anomaly_detection_tool: Finds spikes, seasonal outliers, negative readings and flatlines/stuck meters in uploaded meter data
 
         ORCHESTRATION PROCESS:
         1. **Tool Selection**: Choose the most relevant tool(s) based on the user's query
@@ -87,12 +128,21 @@ class MainAgent:
         else:  # Continuation of conversation
             messages.append({"role": "user", "content": query})
 
-        response = await self.client.chat.complete_async(
-            model="devstral-medium-2507",
-            messages=messages,
-            tools=self.tools,
-            tool_choice="auto",
-            parallel_tool_calls=True
+        # Smallest orchestrator model that fits; escalate if the tool call arguments are unusable
+        response = await self.model_selector.complete(
+            "orchestrator",
+            lambda model: self.client.chat.complete_async(
+                model=model,
+                messages=messages,
+                tools=self.tools,
+                tool_choice="auto",
+                parallel_tool_calls=True
+            ),
+            prompt_text=_messages_text(messages),
+            tool_count=len(self.tools),
+            history_length=len(conversation_history),
+            latency_budget_s=latency_budget_s,
+            validate=self._valid_tool_calls
         )
 
         # Handle tool calls
@@ -106,34 +156,12 @@ class MainAgent:
 
             tool_results = []
             for tool_call in response.choices[0].message.tool_calls:
-                tool_name = tool_call.function.name
-                tool_args = tool_call.function.arguments
-
-                if tool_name == "data_analysis_tool":
-                    result = await self._handle_data_analysis(tool_args, df)
-                    if result['error']:
-                        tool_result_content += f"\nError: {result['error']}"
-                    else:
-                        tool_result_content = f"Analysis completed. Code: {result['code']}\nOutput: {result['output']}"
-
-                elif tool_name == "forecast_tool":
-                    result = await self._handle_forecasting(tool_args, df)
-                    tool_result_content = f"Forecast completed: {result['result']}"
-
-                elif tool_name == "live_price_tool":
-                    result = await self._handle_live_prices(tool_args)
-                    if not result['result']['status']:
-                        tool_result_content += f"\nError: {result['error']}"
-                    else:
-                        tool_result_content = f"Live energy prices analysis: {result['result']['insights']}"
-
-                elif tool_name == "greek_news_tool":
-                    result = await self._handle_greek_news(tool_args)
-                    if not result['result']['success']:
-                        tool_result_content += f"\nError: {result['result']['error']}"
-                    else:
-                        tool_result_content = f"Greek news analysis completed: {result['result']['analysis']}"
-
+                notify({"event": "tool_started", "tool": tool_call.function.name})
+                result, tool_result_content = await self.run_tool(
+                    tool_call.function.name, tool_call.function.arguments, df, latency_budget_s, workspace,
+                    dataset_summary=data_summary
+                )
+                notify({"event": "tool_finished", "tool": tool_call.function.name, "error": result.get("error")})
 
                 # Add tool result message
                 messages.append({
@@ -147,9 +175,14 @@ class MainAgent:
 
 
             # Get LLM response to tool results
-            final_response = await self.client.chat.complete_async(
-                model="devstral-medium-2507",
-                messages=messages
+            notify({"event": "synthesizing"})
+            final_response = await self.model_selector.complete(
+                "orchestrator",
+                lambda model: self.client.chat.complete_async(model=model, messages=messages),
+                prompt_text=_messages_text(messages),
+                tool_count=len(tool_results),
+                history_length=len(conversation_history),
+                latency_budget_s=latency_budget_s
             )
 
             # Add final assistant response to conversation
@@ -177,25 +210,158 @@ class MainAgent:
             "conversation_history": messages[1:]  # Exclude system message
         }
 
-    async def _handle_data_analysis(self, args, df):
+    async def run_tool(self, tool_name, tool_args, df, latency_budget_s=None, workspace=None, dataset_summary=None):
+        """Run one tool call and return (result, text for the tool message)
+
+        tool_args is the JSON argument string of the call, as sent by the model.
+        dataset_summary is a precomputed summary of df, used when the call does not bring one.
+        The call is refused with an error result when it would exceed a memory budget;
+        otherwise its memory growth is attributed to the workspace's session and the tool.
+        """
+        accountant = get_memory_accountant()
+        session_id = workspace.session_id if workspace is not None else None
+        try:
+            accountant.check(session_id, tool_name)
+        except MemoryBudgetError as e:
+            return {"type": tool_name, "error": str(e)}, f"Error: {e}"
+
+        with accountant.track(session_id, tool_name):
+            return await self._dispatch_tool(tool_name, tool_args, df, latency_budget_s, workspace, dataset_summary)
+
+    async def _dispatch_tool(self, tool_name, tool_args, df, latency_budget_s=None, workspace=None,
+                             dataset_summary=None):
+        if tool_name == "data_analysis_tool":
+            result = await self._handle_data_analysis(tool_args, df, latency_budget_s, workspace, dataset_summary)
+            if result['error']:
+                tool_result_content = f"Error: {result['error']}"
+            else:
+                tool_result_content = f"Analysis completed. Code: {result['code']}\nOutput: {result['output']}"
+
+        elif tool_name == "forecast_tool":
+            result = await self._handle_forecasting(tool_args, df)
+            # Only the bounded digest goes into the conversation; the arrays stay in result for the UI
+            tool_result_content = f"Forecast completed with {result['model']}:\n{result['digest']}"
+
+        elif tool_name == "live_price_tool":
+            result = await self._handle_live_prices(tool_args, latency_budget_s)
+            if not result['result']['status']:
+                tool_result_content = f"Error: {result['result'].get('error')}"
+            else:
+                tool_result_content = f"Live energy prices analysis: {result['result']['insights']}"
+
+        elif tool_name == "greek_news_tool":
+            result = await self._handle_greek_news(tool_args, latency_budget_s)
+            if not result['result']['success']:
+                tool_result_content = f"Error: {result['result']['error']}"
+            else:
+                tool_result_content = f"Greek news analysis completed: {result['result']['analysis']}"
+
+        elif tool_name == "energy_kernel_tool":
+            # pandas-heavy handlers run off the shared runtime loop so other sessions keep moving
+            result = await asyncio.to_thread(self._handle_energy_kernel, tool_args, df)
+            if result['error']:
+                tool_result_content = f"Error: {result['error']}"
+            else:
+                tool_result_content = f"{result['kernel']} result:\n{result['output']}"
+
+        elif tool_name == "tariff_cost_tool":
+            result = await self._handle_tariff_cost(tool_args, df)
+            if result['error']:
+                tool_result_content = f"Error: {result['error']}"
+            else:
+                tool_result_content = f"Annual cost per contract (cheapest first):\n{result['output']}"
+
+        elif tool_name == "anomaly_detection_tool":
+            result = await asyncio.to_thread(self._handle_anomalies, tool_args, df)
+            if result['error']:
+                tool_result_content = f"Error: {result['error']}"
+            else:
+                tool_result_content = f"Anomaly detection completed:\n{result['output']}"
+
+        else:
+            result = {"type": tool_name, "error": f"Unknown tool '{tool_name}'"}
+            tool_result_content = result["error"]
+
+        return result, tool_result_content
+
+    def _valid_tool_calls(self, response):
+        """Tool calls must name a known tool and carry JSON object arguments"""
+        tool_names = {tool["function"]["name"] for tool in self.tools}
+
+        for tool_call in response.choices[0].message.tool_calls or []:
+            if tool_call.function.name not in tool_names:
+                return False
+            args = tool_call.function.arguments
+            if isinstance(args, str):
+                try:
+                    args = json.loads(args)
+                except json.JSONDecodeError:
+                    return False
+            if not isinstance(args, dict):
+                return False
+        return True
+
+    async def _handle_data_analysis(self, args, df, latency_budget_s=None, workspace=None, dataset_summary=None):
         """Handle data analysis tool execution"""
         args = json.loads(args)
 
         query = args.get("user_query", "")
-        data_summary = args.get("data_summary", get_data_summary(df))
-
-        # Generate and execute code
-        code = await self.data_analysis_tool.generate_code(query, data_summary)
-        output, figures, error = execute_code(code, df)
+        # Profiling df is the expensive fallback; only done when no summary was passed along
+        data_summary = args.get("data_summary") or dataset_summary or get_data_summary(df)
+
+        workspace_summary = None
+        if workspace is not None:
+            # Results computed from an older version of the dataset are dropped here
+            workspace.bind(df)
+            workspace_summary = workspace.describe()
+
+        selector = self.model_selector
+        prompt_tokens = estimate_tokens(query + data_summary + (workspace_summary or ""))
+        complexity = estimate_complexity(prompt_tokens)
+        tier = selector.select("codegen", complexity, prompt_tokens, latency_budget_s)
+
+        from tools.data_analysis_tool import execute_code
+
+        # Generate and execute code, escalating to a bigger model if the code errors
+        while True:
+            model = selector.model("codegen", tier)
+            started = time.perf_counter()
+            code = await self.data_analysis_tool.generate_code(query, data_summary, model=model,
+                                                               workspace_summary=workspace_summary)
+            code = await self._guard_code(code, query, data_summary, df, model, workspace_summary)
+            memory = {}
+            output, figures, error = await asyncio.to_thread(execute_code, code, df, stats=memory, workspace=workspace)
+            selector.log("codegen", model, complexity, time.perf_counter() - started, valid=error is None)
+
+            next_tier = selector.escalate("codegen", tier)
+            if error is None or next_tier is None:
+                break
+            tier = next_tier
 
         return {
             "type": "analysis",
             "code": code,
             "output": output,
             "figures": figures,
-            "error": error
+            "error": error,
+            "memory": memory
         }
 
+    async def _guard_code(self, code, query, data_summary, df, model, workspace_summary=None):
+        """Rewrite easy slow patterns; ask the model once to fix the rest when that is worth a call"""
+        n_rows = len(df) if df is not None else 0
+        code, findings = guard_code(code, n_rows)
+
+        remaining = worth_regenerating(findings)
+        if remaining:
+            code = await self.data_analysis_tool.generate_code(
+                query, data_summary, model=model, previous_code=code, feedback=format_findings(remaining),
+                workspace_summary=workspace_summary
+            )
+            code, _ = guard_code(code, n_rows)
+
+        return code
+
     async def _handle_forecasting(self, args, df):
         """Handle forecasting tool execution"""
 
@@ -208,12 +374,28 @@ class MainAgent:
         length = args.get("prediction_length")
 
 
+        spacing = series_step(df, series)
+        season_length = season_from_step(spacing[1].total_seconds()) if spacing else None
+
         forecast_result = await self.forecaster.forecast(
             series=series,
-            prediction_length=length)
+            prediction_length=length,
+            season_length=season_length)
+
+        timestamps = forecast_timestamps(df, series, length)
+        digest = forecast_digest(
+            forecast_result["median_forecast"],
+            forecast_result["low_quantile"],
+            forecast_result["high_quantile"],
+            history=series,
+            timestamps=timestamps
+        )
 
         return {
             "type": "forecast",
+            "model": forecast_result["model"],
+            "digest": digest,
+            "timestamps": timestamps,
             "result": {
                 "median_forecast": forecast_result["median_forecast"],
                 "low_quantile": forecast_result["low_quantile"],
@@ -223,25 +405,98 @@ class MainAgent:
             }
         }
 
-    async def _handle_live_prices(self, args):
+    def _handle_energy_kernel(self, args, df):
+        """Handle direct energy kernel execution"""
+        args = json.loads(args)
+        kernel = args.get("kernel")
+        options = {key: args[key] for key in ("by", "freq") if args.get(key)}
+
+        if df is None:
+            return {"type": "energy_kernel", "kernel": kernel, "output": None,
+                    "error": "No dataset uploaded"}
+
+        result = self.energy_kernel_tool.execute(df, kernel, args.get("column_name"), **options)
+
+        return {
+            "type": "energy_kernel",
+            "kernel": kernel,
+            "output": result["text"],
+            "error": result["error"]
+        }
+
+    async def _handle_tariff_cost(self, args, df):
+        """Handle contract cost ranking against the uploaded consumption"""
+        args = json.loads(args)
+
+        if df is None:
+            return {"type": "tariff_cost", "table": None, "output": None,
+                    "error": "No consumption dataset uploaded"}
+
+        from tools.live_price_tool import get_live_energy_data
+
+        # The scrapers block for seconds; like the live-price tool, fetch and rank in worker threads
+        try:
+            prices = await asyncio.to_thread(get_live_energy_data)
+        except RuntimeError as e:
+            # Every price source failed and none has a cached copy
+            return {"type": "tariff_cost", "table": None, "output": None, "error": str(e)}
+
+        result = await asyncio.to_thread(
+            self.tariff_cost_tool.execute,
+            df,
+            prices,
+            args.get("column_name"),
+            is_power=args.get("is_power", False),
+            current_contract=args.get("current_contract")
+        )
+
+        return {
+            "type": "tariff_cost",
+            "table": result["table"],
+            "output": result["text"],
+            "error": result["error"]
+        }
+
+    def _handle_anomalies(self, args, df):
+        """Handle anomaly detection over the uploaded meter data"""
+        args = json.loads(args)
+
+        if df is None:
+            return {"type": "anomalies", "intervals": None, "output": None, "error": "No dataset uploaded"}
+
+        result = self.anomaly_tool.execute(
+            df,
+            columns=args.get("columns") or None,
+            window=args.get("window", 96),
+            threshold=args.get("threshold", 6.0)
+        )
+
+        return {
+            "type": "anomalies",
+            "intervals": result["intervals"],
+            "output": result["text"],
+            "error": result["error"]
+        }
+
+    async def _handle_live_prices(self, args, latency_budget_s=None):
         """Handle live prices tool execution"""
 
         args = json.loads(args)
         query = args.get("user_query", "")
 
-        result = await self.live_price_tool.execute(query)
+        result = await self.live_price_tool.execute(query, latency_budget_s)
 
         return {
             "type": "live_prices",
             "result": result
         }
 
-    async def _handle_greek_news(self, args):
+    async def _handle_greek_news(self, args, latency_budget_s=None):
         """Handle Greek news tool execution"""
         args = json.loads(args)
         query = args.get("query", "")
 
-        result = await self.greek_news_tool.execute(query)
+        result = await self.greek_news_tool.execute(query, latency_budget_s)
 
         return {
             "type": "greek_news",
@@ -250,6 +505,11 @@ class MainAgent:
 
 
 
+def _messages_text(messages):
+    """Concatenated message contents, used to size the prompt for model selection"""
+    return "".join(str(message.get("content") or "") for message in messages)
+
+
 def display_energy_providers_carousel(energy_data):
     """Display energy providers in a carousel format with toggle"""
     # Add toggle button
@@ -298,14 +558,18 @@ def display_energy_providers_carousel(energy_data):
             else:
                 st.info("No contracts available for this provider")
 
+def clean_csv_frame(df):
+    """Column fixes applied to every parsed CSV (full file or appended tail)"""
+    if 'Unnamed: 0' in df.columns:
+        df = df.drop(columns=['Unnamed: 0'])
+    if 'Timestamp_UTC' in df.columns:
+        df['Timestamp_UTC'] = pd.to_datetime(df['Timestamp_UTC'], errors='coerce')
+    return df
+
 def load_data(file):
     try:
         if file.name.endswith('.csv'):
-            df = pd.read_csv(file)
-            if 'Unnamed: 0' in df.columns:
-                df = df.drop(columns=['Unnamed: 0'])
-            if 'Timestamp_UTC' in df.columns:
-                df['Timestamp_UTC'] = pd.to_datetime(df['Timestamp_UTC'], errors='coerce')
+            df = clean_csv_frame(pd.read_csv(file))
         elif file.name.endswith('.xlsx'):
             df = pd.read_excel(file)
         else:
@@ -316,21 +580,39 @@ def load_data(file):
         st.error(f"Error loading file: {e}")
         return None
 
-def get_data_summary(df):
-    """Generate comprehensive dataset summary"""
-    numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
-    categorical_cols = df.select_dtypes(include=['object', 'category']).columns.tolist()
-    datetime_cols = df.select_dtypes(include=['datetime']).columns.tolist()
-
+def profile_data(df):
+    """Mergeable statistics behind the dataset summary"""
+    return {
+        "rows": df.shape[0],
+        "columns": df.shape[1],
+        "numeric_cols": df.select_dtypes(include=['number']).columns.tolist(),
+        "categorical_cols": df.select_dtypes(include=['object', 'category']).columns.tolist(),
+        "datetime_cols": df.select_dtypes(include=['datetime']).columns.tolist(),
+        "missing": df.isnull().sum(),
+        "sample": df.head(10).to_dict(),
+    }
+
+def extend_profile(profile, tail):
+    """Update a profile with appended rows without rescanning the existing ones"""
+    extended = dict(profile)
+    extended["rows"] = profile["rows"] + tail.shape[0]
+    extended["missing"] = profile["missing"].add(tail.isnull().sum(), fill_value=0).astype(int)
+    return extended
+
+def format_data_summary(profile):
     summary = f"""
             Dataset Summary:
-            - Shape: {df.shape[0]} rows, {df.shape[1]} columns
-            - Numeric columns: {numeric_cols}
-            - Categorical columns: {categorical_cols}
-            - DateTime columns: {datetime_cols}
-            - Missing values: {df.isnull().sum().to_dict()}
-            - Sample data: {df.head(10).to_dict()}
+            - Shape: {profile['rows']} rows, {profile['columns']} columns
+            - Numeric columns: {profile['numeric_cols']}
+            - Categorical columns: {profile['categorical_cols']}
+            - DateTime columns: {profile['datetime_cols']}
+            - Missing values: {profile['missing'].to_dict()}
+            - Sample data: {profile['sample']}
             """
 
     return summary
 
+def get_data_summary(df):
+    """Generate comprehensive dataset summary"""
+    return format_data_summary(profile_data(df))
+
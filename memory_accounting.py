@@ -0,0 +1,283 @@
+import contextlib
+import gc
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+
+import pandas as pd
+
+
+logger = logging.getLogger(__name__)
+
+# RSS budget for the whole process; 0 disables the process check
+PROCESS_BUDGET_MB = float(os.getenv("MEMORY_PROCESS_MB", 0))
+# Share of the process budget at which session caches are spilled to disk before a tool runs
+EVICT_AT = float(os.getenv("MEMORY_EVICT_AT", 0.8))
+SESSION_BUDGET_MB = float(os.getenv("MEMORY_SESSION_MB", 1024))
+# Datasets above this are downcast (32-bit numbers, categorical text); above the max they are refused
+DATASET_DOWNCAST_MB = float(os.getenv("MEMORY_DATASET_MB", 256))
+DATASET_MAX_MB = float(os.getenv("MEMORY_MAX_DATASET_MB", 1024))
+# tracemalloc slows allocations down, so Python-level attribution is opt-in
+TRACEMALLOC = os.getenv("MEMORY_TRACEMALLOC", "0") == "1"
+# Tool calls that grow RSS by more than this are logged
+LOG_GROWTH_MB = float(os.getenv("MEMORY_LOG_GROWTH_MB", 100))
+# Category dtype only pays off for repeated values
+CATEGORY_MAX_SHARE = 0.5
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+class MemoryBudgetError(RuntimeError):
+    """A tool call or dataset was refused because it would exceed a memory budget"""
+
+
+def rss_bytes():
+    """Current resident set size (peak RSS where /proc is not available)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def frame_bytes(df):
+    return int(df.memory_usage(deep=True).sum()) if df is not None else 0
+
+
+def _open_figures():
+    # Only count when matplotlib is already loaded; never import it just to look
+    pyplot = sys.modules.get("matplotlib.pyplot")
+    return len(pyplot.get_fignums()) if pyplot is not None else 0
+
+
+def downcast_frame(df):
+    """32-bit floats, smallest integer types and categories for repeated text"""
+    df = df.copy()
+    for column in df.select_dtypes(include=["float"]).columns:
+        df[column] = pd.to_numeric(df[column], downcast="float")
+    for column in df.select_dtypes(include=["integer"]).columns:
+        df[column] = pd.to_numeric(df[column], downcast="integer")
+    for column in df.select_dtypes(include=["object"]).columns:
+        if df[column].nunique(dropna=True) <= CATEGORY_MAX_SHARE * len(df):
+            df[column] = df[column].astype("category")
+    return df
+
+
+def fit_dataset(df, name="dataset", size=None, downcast=False):
+    """Shrink df to the dataset budget or refuse it; returns (df, bytes, downcast)
+
+    size and downcast describe df when they are already known, e.g. for an appended
+    frame whose older rows were measured (and possibly downcast) before.
+    """
+    size = frame_bytes(df) if size is None else size
+    if size > DATASET_DOWNCAST_MB * 2**20 and not downcast:
+        df = downcast_frame(df)
+        shrunk = frame_bytes(df)
+        logger.info("downcast %s from %.1fMB to %.1fMB", name, size / 2**20, shrunk / 2**20)
+        size, downcast = shrunk, True
+
+    if size > DATASET_MAX_MB * 2**20:
+        raise MemoryBudgetError(
+            f"'{name}' needs {size / 2**20:.0f} MB in memory{' even after downcasting' if downcast else ''}, over the "
+            f"{DATASET_MAX_MB:.0f} MB limit per dataset. Upload a shorter period or fewer columns."
+        )
+    return df, size, downcast
+
+
+def free_memory(session_ids=None):
+    """Spill hot chat messages and workspace entries to disk; returns the bytes released from the caches"""
+    from analysis_workspace import spill_workspaces
+    from session_store import spill_sessions
+
+    freed = spill_sessions(session_ids) + spill_workspaces(session_ids)
+    gc.collect()
+    return freed
+
+
+def session_usage():
+    """Bytes held in memory per session: hot chat messages, tracked objects and workspace entries"""
+    from analysis_workspace import workspace_report
+    from session_store import memory_report
+
+    usage = defaultdict(lambda: {"store_mb": 0.0, "objects_mb": 0.0, "workspace_mb": 0.0})
+    for row in memory_report():
+        usage[row["session_id"]].update(store_mb=row["hot_mb"], objects_mb=row["objects_mb"], objects=row["objects"])
+    for row in workspace_report():
+        usage[row["session_id"]]["workspace_mb"] = row["memory_mb"]
+    for row in usage.values():
+        row["total_mb"] = row["store_mb"] + row["objects_mb"] + row["workspace_mb"]
+    return dict(usage)
+
+
+class MemoryAccountant:
+    """Attributes memory growth to sessions and tools and enforces the budgets
+
+    check() runs before a tool call: past the soft limit it spills session caches to
+    disk, and past the budget it refuses the call. track() samples RSS (and, with
+    MEMORY_TRACEMALLOC=1, traced Python allocations) around the call. Calls running
+    at the same time share the process, so their RSS deltas are approximate. The
+    tracemalloc peak is process-wide too, so it is only recorded for calls that ran
+    alone; overlapping calls are counted in "overlapped" instead.
+    """
+
+    def __init__(self, process_budget_mb=PROCESS_BUDGET_MB, session_budget_mb=SESSION_BUDGET_MB,
+                 trace=TRACEMALLOC):
+        self.process_budget = int(process_budget_mb * 2**20)
+        self.session_budget = int(session_budget_mb * 2**20)
+        if trace and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+        self._lock = threading.Lock()
+        self.tools = defaultdict(lambda: {"calls": 0, "refused": 0, "overlapped": 0, "rss_growth_mb": 0.0,
+                                          "max_rss_growth_mb": 0.0, "max_traced_peak_mb": 0.0, "figures_opened": 0})
+        self.sessions = defaultdict(lambda: {"calls": 0, "refused": 0, "max_rss_growth_mb": 0.0,
+                                             "max_traced_peak_mb": 0.0, "tools": defaultdict(int)})
+        self.evictions = 0
+        # Calls inside track() right now, and how many have ever entered it
+        self._in_flight = 0
+        self._entered = 0
+
+    def _refuse(self, session_id, tool, message):
+        with self._lock:
+            self.tools[tool]["refused"] += 1
+            self.sessions[session_id]["refused"] += 1
+        logger.warning("refused %s for session %s: %s", tool, session_id, message)
+        raise MemoryBudgetError(message)
+
+    def check(self, session_id, tool):
+        """Free memory if needed, then raise MemoryBudgetError if the call would not fit"""
+        if self.process_budget:
+            rss = rss_bytes()
+            if rss > EVICT_AT * self.process_budget:
+                freed = free_memory()
+                self.evictions += 1
+                logger.info("RSS %.0fMB over %.0f%% of budget, spilled %.1fMB of session caches",
+                            rss / 2**20, 100 * EVICT_AT, freed / 2**20)
+                rss = rss_bytes()
+            if rss > self.process_budget:
+                self._refuse(session_id, tool,
+                             f"The server is using {rss / 2**20:.0f} MB of its {self.process_budget / 2**20:.0f} MB "
+                             f"memory budget, so {tool} was not run. Please try again in a moment.")
+
+        if session_id is None or not self.session_budget:
+            return
+        usage = session_usage().get(session_id)
+        if usage and usage["total_mb"] * 2**20 > self.session_budget:
+            free_memory([session_id])
+            self.evictions += 1
+            usage = session_usage().get(session_id, usage)
+            if usage["total_mb"] * 2**20 > self.session_budget:
+                self._refuse(session_id, tool,
+                             f"This session holds {usage['total_mb']:.0f} MB (dataset and results), over its "
+                             f"{self.session_budget / 2**20:.0f} MB budget, so {tool} was not run. "
+                             f"Upload a smaller dataset or start a new session.")
+
+    @contextlib.contextmanager
+    def track(self, session_id, tool):
+        """Record RSS growth, traced peak and figures opened by the calls inside the block"""
+        figures = _open_figures()
+        rss = rss_bytes()
+        tracing = tracemalloc.is_tracing()
+        with self._lock:
+            self._in_flight += 1
+            self._entered += 1
+            entered = self._entered
+            # Resetting the peak while another call runs would corrupt that call's peak
+            alone = self._in_flight == 1
+            if tracing and alone:
+                traced = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            growth = (rss_bytes() - rss) / 2**20
+            opened = max(_open_figures() - figures, 0)
+
+            with self._lock:
+                self._in_flight -= 1
+                alone = alone and self._entered == entered
+                peak = (tracemalloc.get_traced_memory()[1] - traced) / 2**20 if tracing and alone else 0.0
+
+                stats = self.tools[tool]
+                stats["calls"] += 1
+                stats["overlapped"] += not alone
+                stats["rss_growth_mb"] += growth
+                stats["max_rss_growth_mb"] = max(stats["max_rss_growth_mb"], growth)
+                stats["max_traced_peak_mb"] = max(stats["max_traced_peak_mb"], peak)
+                stats["figures_opened"] += opened
+
+                session = self.sessions[session_id]
+                session["calls"] += 1
+                session["tools"][tool] += 1
+                session["max_rss_growth_mb"] = max(session["max_rss_growth_mb"], growth)
+                session["max_traced_peak_mb"] = max(session["max_traced_peak_mb"], peak)
+
+            if growth > LOG_GROWTH_MB:
+                logger.warning("%s (session %s) grew RSS by %.0fMB in %.1fs", tool, session_id, growth,
+                               time.perf_counter() - started)
+
+    def report(self, top=10, session_id=None):
+        """Admin view: process memory and the top sessions and tools
+
+        With session_id, only that session is listed, e.g. for a user looking at their own usage.
+        """
+        usage = session_usage()
+        with self._lock:
+            sessions = [
+                {"session_id": session_id, **usage.get(session_id, {}),
+                 **{key: dict(value) if key == "tools" else value for key, value in stats.items()}}
+                for session_id, stats in self.sessions.items()
+            ]
+            tracked = {row["session_id"] for row in sessions}
+            sessions += [{"session_id": session_id, **row} for session_id, row in usage.items() if session_id not in tracked]
+            tools = [{"tool": tool, **stats} for tool, stats in self.tools.items()]
+        if session_id is not None:
+            sessions = [row for row in sessions if row["session_id"] == session_id]
+
+        result = {
+            "rss_mb": rss_bytes() / 2**20,
+            "process_budget_mb": self.process_budget / 2**20 or None,
+            "session_budget_mb": self.session_budget / 2**20 or None,
+            "open_figures": _open_figures(),
+            "evictions": self.evictions,
+            "top_sessions": sorted(sessions, key=lambda row: (row.get("total_mb", 0), row.get("max_rss_growth_mb", 0)),
+                                   reverse=True)[:top],
+            "top_tools": sorted(tools, key=lambda row: row["max_rss_growth_mb"], reverse=True)[:top],
+        }
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            result["tracemalloc"] = {"current_mb": current / 2**20, "peak_mb": peak / 2**20,
+                                     "top_allocations": top_allocations(top)}
+        return result
+
+
+def top_allocations(top=10):
+    """Source lines holding the most traced memory right now"""
+    snapshot = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ])
+    return [
+        {"where": str(stat.traceback), "mb": stat.size / 2**20, "blocks": stat.count}
+        for stat in snapshot.statistics("lineno")[:top]
+    ]
+
+
+_accountant = None
+_accountant_lock = threading.Lock()
+
+
+def get_memory_accountant():
+    """Return the process-wide accountant, creating it on first use"""
+    global _accountant
+    with _accountant_lock:
+        if _accountant is None:
+            _accountant = MemoryAccountant()
+        return _accountant
@@ -0,0 +1,117 @@
+import logging
+import os
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+class ModelTier:
+    """A model with a rough capability level and latency profile"""
+
+    def __init__(self, model, capability, base_latency_s, s_per_1k_tokens):
+        self.model = model
+        self.capability = capability
+        self.base_latency_s = base_latency_s
+        self.s_per_1k_tokens = s_per_1k_tokens
+
+    def estimate_latency(self, prompt_tokens):
+        return self.base_latency_s + self.s_per_1k_tokens * prompt_tokens / 1000
+
+
+# Ordered smallest to largest for every role. The last tier of each role is the
+# model that used to be hardcoded at that call site.
+TIERS = {
+    "orchestrator": [
+        ModelTier("ministral-8b-2410", capability=0.35, base_latency_s=0.6, s_per_1k_tokens=0.05),
+        ModelTier("mistral-small-2506", capability=0.7, base_latency_s=1.2, s_per_1k_tokens=0.1),
+        ModelTier("devstral-medium-2507", capability=1.0, base_latency_s=2.5, s_per_1k_tokens=0.2),
+    ],
+    "codegen": [
+        ModelTier("codestral-2501", capability=0.6, base_latency_s=1.0, s_per_1k_tokens=0.08),
+        ModelTier("devstral-medium-2507", capability=1.0, base_latency_s=2.5, s_per_1k_tokens=0.2),
+    ],
+    "prices": [
+        ModelTier("ministral-8b-2410", capability=0.6, base_latency_s=0.6, s_per_1k_tokens=0.05),
+        ModelTier("mistral-small-2506", capability=1.0, base_latency_s=1.2, s_per_1k_tokens=0.1),
+    ],
+    "news": [
+        ModelTier("mistral-small-2506", capability=0.5, base_latency_s=1.5, s_per_1k_tokens=0.1),
+        ModelTier("mistral-medium-2508", capability=1.0, base_latency_s=4.0, s_per_1k_tokens=0.3),
+    ],
+}
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token)"""
+    return len(text) // 4
+
+
+def estimate_complexity(prompt_tokens, tool_count=0, history_length=0):
+    """Score a request between 0 (trivial follow-up) and 1 (large multi-tool question)"""
+    size = min(prompt_tokens / 8000, 1.0)
+    tools = min(tool_count / 8, 1.0)
+    history = min(history_length / 20, 1.0)
+    return round(0.4 * size + 0.3 * tools + 0.3 * history, 3)
+
+
+class ModelSelector:
+    """Picks the smallest model that fits the request and escalates on failed validation"""
+
+    def __init__(self, tiers=None, default_budget_s=None):
+        self.tiers = tiers or TIERS
+        self.default_budget_s = default_budget_s or float(os.getenv("LATENCY_BUDGET_S", 20))
+
+    def select(self, role, complexity, prompt_tokens, latency_budget_s=None):
+        """Return the tier index to start with for this request"""
+        tiers = self.tiers[role]
+        budget = latency_budget_s or self.default_budget_s
+
+        for index, tier in enumerate(tiers):
+            if tier.capability >= complexity:
+                break
+        else:
+            index = len(tiers) - 1
+
+        # If the capable model would blow the budget, settle for the largest one that fits
+        while index > 0 and tiers[index].estimate_latency(prompt_tokens) > budget:
+            index -= 1
+
+        return index
+
+    def escalate(self, role, index):
+        """Next bigger tier, or None if already at the top"""
+        return index + 1 if index + 1 < len(self.tiers[role]) else None
+
+    def model(self, role, index):
+        return self.tiers[role][index].model
+
+    async def complete(self, role, call, prompt_text, tool_count=0, history_length=0,
+                       latency_budget_s=None, validate=None):
+        """Run `call(model)` on the chosen tier, escalating while `validate(result)` fails
+
+        Returns the result of the last attempt, even if it never validated.
+        """
+        prompt_tokens = estimate_tokens(prompt_text)
+        complexity = estimate_complexity(prompt_tokens, tool_count, history_length)
+        index = self.select(role, complexity, prompt_tokens, latency_budget_s)
+
+        while True:
+            model = self.model(role, index)
+            started = time.perf_counter()
+            result = await call(model)
+            latency = time.perf_counter() - started
+
+            valid = validate is None or validate(result)
+            self.log(role, model, complexity, latency, valid)
+
+            next_index = self.escalate(role, index)
+            if valid or next_index is None:
+                return result
+            index = next_index
+
+    def log(self, role, model, complexity, latency, valid=True):
+        logger.info(
+            "model tier role=%s model=%s complexity=%.3f latency=%.2fs valid=%s",
+            role, model, complexity, latency, valid
+        )
@@ -0,0 +1,344 @@
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import pandas as pd
+
+
+STORE_DIR = os.getenv("SESSION_STORE_DIR", ".session_store")
+HOT_MESSAGES = int(os.getenv("SESSION_HOT_MESSAGES", 20))
+SESSION_MEMORY_MB = float(os.getenv("SESSION_MEMORY_MB", 64))
+GLOBAL_MEMORY_MB = float(os.getenv("SESSION_GLOBAL_MEMORY_MB", 512))
+HOT_HISTORY = int(os.getenv("SESSION_HOT_HISTORY", 40))
+# Sessions untouched for this long are closed and their messages and files deleted
+SESSION_IDLE_S = float(os.getenv("SESSION_IDLE_S", 24 * 3600))
+EVICT_EVERY_S = 60
+
+# Session ids are uuid4().hex; anything else could escape the store directory
+_SESSION_ID = re.compile(r"[0-9a-f]{32}")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    session_id TEXT, idx INTEGER, role TEXT, content TEXT, code_blocks TEXT, figures TEXT, tables TEXT,
+    PRIMARY KEY (session_id, idx)
+);
+CREATE TABLE IF NOT EXISTS history (
+    session_id TEXT, idx INTEGER, message TEXT,
+    PRIMARY KEY (session_id, idx)
+);
+"""
+
+
+def _figure_bytes(fig):
+    """Approximate memory held by a live figure (its rendered RGBA canvas)"""
+    width, height = fig.get_size_inches() * fig.dpi
+    return int(width * height * 4) + 50_000
+
+
+def estimate_message_bytes(message):
+    size = len(message.get("content") or "") + sum(len(code) for code in message.get("code_blocks", []))
+    for fig in message.get("figures", []):
+        size += _figure_bytes(fig) if hasattr(fig, "savefig") else 0
+    for table in message.get("tables", []):
+        size += int(table.memory_usage(deep=True).sum()) if hasattr(table, "memory_usage") else 0
+    return size
+
+
+def valid_session_id(session_id):
+    return isinstance(session_id, str) and _SESSION_ID.fullmatch(session_id) is not None
+
+
+def session_dir(root, session_id):
+    """Resolved directory of a session directly under root; ValueError for invalid ids"""
+    if not valid_session_id(session_id):
+        raise ValueError(f"Invalid session id {session_id!r}")
+    root = os.path.realpath(root)
+    path = os.path.realpath(os.path.join(root, session_id))
+    if os.path.dirname(path) != root:
+        raise ValueError(f"Session directory {path!r} is outside {root!r}")
+    return path
+
+
+def _json_default(value):
+    # Mistral SDK objects (tool calls) are pydantic models
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    return str(value)
+
+
+class SessionStore:
+    """Chat messages and artifacts of one session, with older entries spilled to disk
+
+    Every message is written through to SQLite on append, with figures rendered once
+    to PNG (and then closed) and result tables saved as Parquet. Only the most recent
+    messages stay in memory with their frames; older ones are rehydrated from disk on demand.
+    """
+
+    def __init__(self, session_id=None, root=STORE_DIR, hot_messages=HOT_MESSAGES,
+                 memory_mb=SESSION_MEMORY_MB, hot_history=HOT_HISTORY):
+        self.session_id = session_id or uuid.uuid4().hex
+        self.root = root
+        self.blob_dir = session_dir(root, self.session_id)
+        self.hot_messages = hot_messages
+        self.memory_budget = int(memory_mb * 2**20)
+        self.hot_history = hot_history
+
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(root, "sessions.sqlite3"), check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.RLock()
+
+        self._hot = OrderedDict()  # idx -> (message, estimated bytes)
+        self._count = self._db.execute(
+            "SELECT COUNT(*) FROM messages WHERE session_id = ?", (self.session_id,)
+        ).fetchone()[0]
+
+        self._history_tail = []
+        self._history_count = self._db.execute(
+            "SELECT COUNT(*) FROM history WHERE session_id = ?", (self.session_id,)
+        ).fetchone()[0]
+
+        # Live objects this session keeps outside the store, e.g. {"dataset": (name, bytes)}
+        self.objects = {}
+
+        self.last_access = time.time()
+        _register(self)
+
+    # --- chat messages ---
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def memory_bytes(self):
+        return sum(size for _, size in self._hot.values())
+
+    def track_object(self, kind, name, nbytes):
+        """Record the size of an object held for this session (nbytes None forgets it)"""
+        with self._lock:
+            if nbytes is None:
+                self.objects.pop(kind, None)
+            else:
+                self.objects[kind] = (name, int(nbytes))
+
+    def append(self, message):
+        """Store a message; returns it as kept in memory, with figures as PNG paths"""
+        with self._lock:
+            idx = self._count
+            message = self._persist(idx, message)
+            self._hot[idx] = (message, estimate_message_bytes(message))
+            self._count += 1
+            self.last_access = time.time()
+            self._enforce_session_budget()
+        _enforce_global_budget()
+        return message
+
+    def page(self, start, stop=None):
+        """Messages [start, stop), from memory when hot and from disk otherwise"""
+        with self._lock:
+            self.last_access = time.time()
+            stop = self._count if stop is None else min(stop, self._count)
+            cold = [idx for idx in range(max(start, 0), stop) if idx not in self._hot]
+            loaded = self._load(cold)
+            return [self._hot[idx][0] if idx in self._hot else loaded[idx] for idx in range(max(start, 0), stop)]
+
+    def clear(self):
+        with self._lock:
+            for idx in list(self._hot):
+                self._evict(idx)
+            self._db.execute("DELETE FROM messages WHERE session_id = ?", (self.session_id,))
+            self._db.execute("DELETE FROM history WHERE session_id = ?", (self.session_id,))
+            self._db.commit()
+            shutil.rmtree(self.blob_dir, ignore_errors=True)
+            os.makedirs(self.blob_dir, exist_ok=True)
+            self._count = 0
+            self._history_tail = []
+            self._history_count = 0
+
+    def _persist(self, idx, message):
+        figure_paths, table_paths = [], []
+        # clear() restarts idx at 0; the token keeps paths unique so path-keyed caches never serve old files
+        token = uuid.uuid4().hex[:8]
+
+        for i, fig in enumerate(message.get("figures", [])):
+            if isinstance(fig, str):
+                figure_paths.append(fig)
+                continue
+            # Imported here so loading the store does not pull in matplotlib at startup
+            from matplotlib import pyplot as plt
+
+            path = os.path.join(self.blob_dir, f"{idx}_{i}_{token}.png")
+            fig.savefig(path, format="png", bbox_inches="tight")
+            plt.close(fig)
+            figure_paths.append(path)
+
+        for i, table in enumerate(message.get("tables", [])):
+            path = os.path.join(self.blob_dir, f"{idx}_{i}_{token}.parquet")
+            table.to_parquet(path)
+            table_paths.append(path)
+
+        self._db.execute(
+            "INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (self.session_id, idx, message["role"], message.get("content"),
+             json.dumps(message.get("code_blocks", [])), json.dumps(figure_paths), json.dumps(table_paths))
+        )
+        self._db.commit()
+        return {**message, "figures": figure_paths}
+
+    def _load(self, indexes):
+        if not indexes:
+            return {}
+
+        rows = self._db.execute(
+            f"SELECT idx, role, content, code_blocks, figures, tables FROM messages "
+            f"WHERE session_id = ? AND idx IN ({','.join('?' * len(indexes))})",
+            (self.session_id, *indexes)
+        ).fetchall()
+
+        # Figures come back as PNG paths; tables are read lazily by whoever displays them
+        return {
+            idx: {"role": role, "content": content, "code_blocks": json.loads(code),
+                  "figures": json.loads(figures), "table_paths": json.loads(tables)}
+            for idx, role, content, code, figures, tables in rows
+        }
+
+    def _evict(self, idx):
+        # Hot messages hold PNG paths, not live figures, so dropping them is enough
+        self._hot.pop(idx)
+
+    def delete(self):
+        """Remove the session's messages, history and files and close its connection"""
+        with self._lock:
+            self.clear()
+            shutil.rmtree(self.blob_dir, ignore_errors=True)
+            self.objects.clear()
+            self._db.close()
+
+    def _enforce_session_budget(self):
+        while self._hot and (len(self._hot) > self.hot_messages or self.memory_bytes > self.memory_budget):
+            self._evict(next(iter(self._hot)))
+
+    def spill_oldest(self):
+        """Evict the oldest hot message; returns False when nothing is left in memory"""
+        with self._lock:
+            if not self._hot:
+                return False
+            self._evict(next(iter(self._hot)))
+            return True
+
+    # --- raw LLM conversation history ---
+
+    def set_history(self, history):
+        """Persist new history entries and keep only the recent tail in memory"""
+        with self._lock:
+            new = history[self._history_count:]
+            self._db.executemany(
+                "INSERT OR REPLACE INTO history VALUES (?, ?, ?)",
+                [(self.session_id, self._history_count + i, json.dumps(entry, default=_json_default))
+                 for i, entry in enumerate(new)]
+            )
+            self._db.commit()
+            self._history_count = len(history)
+            self._history_tail = list(history[-self.hot_history:])
+
+    def get_history(self):
+        """Full history, reading the spilled prefix from disk"""
+        with self._lock:
+            spilled = self._history_count - len(self._history_tail)
+            if spilled <= 0:
+                return list(self._history_tail)
+            rows = self._db.execute(
+                "SELECT message FROM history WHERE session_id = ? AND idx < ? ORDER BY idx",
+                (self.session_id, spilled)
+            ).fetchall()
+            return [json.loads(row[0]) for row in rows] + list(self._history_tail)
+
+
+def load_table(path):
+    return pd.read_parquet(path)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def _register(store):
+    with _stores_lock:
+        _stores[store.session_id] = store
+
+
+_last_eviction = 0.0
+
+
+def get_session_store(session_id=None):
+    """Process-wide store for a session id, creating it on first use"""
+    if time.time() - _last_eviction > EVICT_EVERY_S:
+        evict_idle_sessions()
+    with _stores_lock:
+        store = _stores.get(session_id)
+    return store or SessionStore(session_id)
+
+
+def evict_idle_sessions(max_idle_s=SESSION_IDLE_S):
+    """Delete sessions nobody used for max_idle_s; returns their ids"""
+    global _last_eviction
+    now = time.time()
+    _last_eviction = now
+    with _stores_lock:
+        idle = [store for store in _stores.values() if now - store.last_access > max_idle_s]
+        for store in idle:
+            del _stores[store.session_id]
+
+    for store in idle:
+        store.delete()
+    return [store.session_id for store in idle]
+
+
+def _enforce_global_budget(limit_mb=GLOBAL_MEMORY_MB):
+    """Spill hot messages from the least recently used sessions until under the global cap"""
+    limit = limit_mb * 2**20
+    with _stores_lock:
+        stores = sorted(_stores.values(), key=lambda store: store.last_access)
+
+    total = sum(store.memory_bytes for store in stores)
+    for store in stores:
+        while total > limit:
+            before = store.memory_bytes
+            if not store.spill_oldest():
+                break
+            total -= before - store.memory_bytes
+        if total <= limit:
+            break
+
+
+def memory_report():
+    """Hot memory per session, most recently used first"""
+    with _stores_lock:
+        stores = sorted(_stores.values(), key=lambda store: store.last_access, reverse=True)
+    return [
+        {"session_id": store.session_id, "messages": len(store), "hot_messages": len(store._hot),
+         "hot_mb": store.memory_bytes / 2**20,
+         "objects_mb": sum(nbytes for _, nbytes in store.objects.values()) / 2**20,
+         "objects": {kind: {"name": name, "mb": nbytes / 2**20} for kind, (name, nbytes) in store.objects.items()}}
+        for store in stores
+    ]
+
+
+def spill_sessions(session_ids=None):
+    """Move every hot message of the given sessions (default: all) to disk; returns the bytes released"""
+    with _stores_lock:
+        stores = [store for store in _stores.values() if session_ids is None or store.session_id in session_ids]
+
+    freed = 0
+    for store in sorted(stores, key=lambda store: store.last_access):
+        before = store.memory_bytes
+        while store.spill_oldest():
+            pass
+        freed += before - store.memory_bytes
+    return freed
@@ -0,0 +1,45 @@
+import pytest
+from starlette.testclient import TestClient
+
+import api_server
+
+
+CSV = "Timestamp_UTC,Consumption_kWh\n" + "".join(f"2024-01-01 {hour:02d}:00:00,{hour}\n" for hour in range(24))
+
+
+@pytest.fixture
+def client():
+    # Without a `with` block the lifespan (which builds the agent) does not run
+    return TestClient(api_server.app)
+
+
+@pytest.fixture
+def dataset_id(client):
+    response = client.post("/datasets?name=meter.csv", content=CSV.encode())
+    assert response.status_code == 201
+    return response.json()["dataset_id"]
+
+
+@pytest.mark.parametrize("length", ["abc", 2.5, 0, -3, True, None, [24]])
+def test_forecast_rejects_invalid_prediction_length(client, dataset_id, length):
+    response = client.post("/forecast", json={"dataset_id": dataset_id, "column_name": "Consumption_kWh",
+                                              "prediction_length": length})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("value", [24, 24.0, "24"])
+def test_positive_int_accepts_whole_numbers(value):
+    assert api_server._positive_int(value, "prediction_length") == 24
+
+
+@pytest.mark.parametrize("path", ["/metrics", "/admin/memory"])
+def test_operations_endpoints_are_not_public(client, monkeypatch, path):
+    monkeypatch.setattr(api_server, "ADMIN_TOKEN", None)
+    # The test client connects from host "testclient", not localhost
+    assert client.get(path).status_code == 403
+
+    monkeypatch.setattr(api_server, "ADMIN_TOKEN", "secret")
+    assert client.get(path).status_code == 401
+    assert client.get(path, headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get(path, headers={"Authorization": "Bearer secret"}).status_code == 200
+
@@ -0,0 +1,14 @@
+from batch_runner import _query_dir, _tool_error
+
+
+def test_datasets_with_the_same_stem_get_their_own_directories():
+    query = {"id": "q001"}
+    assert _query_dir("out", "data/a.csv", query) != _query_dir("out", "data/a.xlsx", query)
+
+
+def test_nested_tool_failures_are_errors():
+    assert _tool_error({"type": "analysis", "error": "boom"}) == "boom"
+    assert _tool_error({"type": "greek_news", "result": {"success": False, "error": "no key"}}) == "no key"
+    assert _tool_error({"type": "live_prices", "result": {"status": False}}) == "live_prices failed"
+    assert _tool_error({"type": "greek_news", "result": {"success": True, "analysis": "..."}}) is None
+    assert _tool_error({"type": "forecast", "result": {"median_forecast": []}}) is None
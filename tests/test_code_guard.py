@@ -0,0 +1,13 @@
+from tools.code_guard import CORPUS, check_corpus, guard_code, worth_regenerating
+
+
+def test_corpus():
+    assert check_corpus() == [], f"{len(CORPUS)} corpus snippets"
+
+
+def test_small_frames_are_not_regenerated():
+    snippet = "for index, row in df.iterrows():\n    print(row['Consumption_kWh'])\n"
+    _, small = guard_code(snippet, n_rows=1_000)
+    _, large = guard_code(snippet, n_rows=1_000_000)
+    assert worth_regenerating(small) == []
+    assert [finding.kind for finding in worth_regenerating(large)] == ["iterrows"]
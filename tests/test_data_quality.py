@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tools.data_quality import GAP_COLUMN, TIME_COLUMN, clean_append, clean_dataset, infer_frequency
+
+
+def _hourly_text(periods=500, missing=range(100, 184)):
+    times = pd.date_range("2024-01-01", periods=periods, freq="h")
+    df = pd.DataFrame({"timestamp": times.strftime("%Y-%m-%d %H:%M:%S"), "Consumption_kWh": np.arange(periods, dtype=float)})
+    return df.drop(index=list(missing)).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("unit", ["ns", "us", "s"])
+def test_infer_frequency_does_not_depend_on_the_datetime_unit(unit):
+    times = pd.date_range("2024-01-01", periods=10, freq="15min").as_unit(unit)
+    assert infer_frequency(times) == pd.Timedelta(minutes=15)
+
+
+def test_missing_hours_are_reindexed_and_filled():
+    clean, report = clean_dataset(_hourly_text())
+    assert report["frequency"] == str(pd.Timedelta(hours=1))
+    assert not report.get("irregular")
+    assert report["missing_intervals"] == 84
+    assert len(clean) == 500 and clean[GAP_COLUMN].sum() == 84
+    assert clean["Consumption_kWh"].tolist() == pytest.approx(list(range(500)))
+
+
+def test_irregular_series_is_not_regularized():
+    times = pd.to_datetime(["2024-01-01 00:00:00", "2024-01-01 00:00:01", "2024-01-01 00:00:02", "2024-01-03 00:00:00"])
+    clean, report = clean_dataset(pd.DataFrame({TIME_COLUMN: times, "value": [1.0, 2.0, 3.0, 4.0]}))
+    assert report["irregular"] and len(clean) == 4
+
+
+def test_clean_append_matches_a_full_pass():
+    raw = _hourly_text(missing=[10, 11, 450])
+    # Decimal commas, so the appended rows need the same text-to-number conversion
+    raw["Consumption_kWh"] = raw["Consumption_kWh"].map(lambda value: f"{value:.1f}".replace(".", ","))
+    clean, report = clean_dataset(raw.iloc[:300])
+    merged, merged_report = clean_append(clean, report, raw.iloc[300:])
+    full, full_report = clean_dataset(raw)
+    pd.testing.assert_frame_equal(merged, full)
+    assert merged_report["missing_intervals"] == full_report["missing_intervals"] == 3
@@ -0,0 +1,22 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tools.energy_kernels import baseload_peak_split, energy_totals
+
+
+def _hourly(unit, periods=2000):
+    times = pd.date_range("2024-01-01", periods=periods, freq="h").as_unit(unit)
+    return pd.DataFrame({"Timestamp_UTC": times, "Consumption_kW": np.ones(periods)})
+
+
+@pytest.mark.parametrize("unit", ["ns", "us", "s"])
+def test_energy_totals_do_not_depend_on_the_datetime_unit(unit):
+    daily = energy_totals(_hourly(unit), "Consumption_kW", freq="D")
+    assert daily.iloc[:-1].tolist() == pytest.approx([24.0] * (len(daily) - 1))
+
+
+def test_outage_is_not_credited_to_the_last_reading():
+    df = _hourly("us", periods=48).drop(index=range(10, 30))
+    split = baseload_peak_split(df, "Consumption_kW")
+    assert split["total_energy"] == pytest.approx(len(df))
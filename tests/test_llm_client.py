@@ -0,0 +1,81 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from mistralai import Mistral
+
+from llm_client import RateLimitedClient
+
+
+@pytest.fixture
+def fake_server():
+    """Local chat-completions endpoint answering every 3rd request with 429; yields (url, counter)"""
+    counter = {"requests": 0, "rate_limited": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            with lock:
+                counter["requests"] += 1
+                limited = counter["requests"] % 3 == 0
+                counter["rate_limited"] += limited
+            time.sleep(0.02)
+
+            if limited:
+                payload, status = {"message": "Requests rate limit exceeded"}, 429
+            else:
+                payload, status = {
+                    "id": "fake", "object": "chat.completion", "model": body["model"], "created": int(time.time()),
+                    "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": body["messages"][-1]["content"]}}],
+                }, 200
+
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            if limited:
+                self.send_header("Retry-After", "0.1")
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", counter
+    server.shutdown()
+
+
+def _client(url):
+    return RateLimitedClient(Mistral(api_key="fake", server_url=url), max_retries=8,
+                             model_limits={"fake-model": {"concurrency": 4, "tokens_per_minute": 100_000}})
+
+
+async def _ask(client, prompts):
+    return await asyncio.gather(*(
+        client.chat.complete_async(model="fake-model", messages=[{"role": "user", "content": prompt}])
+        for prompt in prompts
+    ), return_exceptions=True)
+
+
+def test_rate_limited_calls_are_retried_and_duplicates_coalesced(fake_server):
+    url, counter = fake_server
+    client = _client(url)
+    prompts = [f"question {i}" for i in range(20)] + ["same question"] * 10
+
+    responses = asyncio.run(_ask(client, prompts))
+
+    assert not [response for response in responses if isinstance(response, Exception)]
+    assert [response.choices[0].message.content for response in responses] == prompts
+    metrics = client.get_metrics()["fake-model"]
+    assert metrics["coalesced"] == 9
+    assert metrics["rate_limited"] == metrics["retries"] == counter["rate_limited"] > 0
+    assert metrics["sent"] == counter["requests"] == len(prompts) - metrics["coalesced"] + metrics["retries"]
+    assert metrics["in_flight"] == metrics["waiting"] == 0
@@ -0,0 +1,35 @@
+import asyncio
+import json
+
+import pandas as pd
+
+from main_agent import MainAgent
+from tools import price_sources
+
+
+class _BrokenSource(price_sources.PriceSource):
+    name = "broken-test-source"
+    timeout_s = 1
+
+    def fetch(self):
+        raise ConnectionError("site down")
+
+
+def test_tariff_cost_reports_failed_price_sources(monkeypatch):
+    monkeypatch.setattr(price_sources, "PRICE_SOURCES", [_BrokenSource()])
+    agent = MainAgent.__new__(MainAgent)
+    df = pd.DataFrame({"Timestamp_UTC": pd.date_range("2024-01-01", periods=3, freq="h"), "Consumption_kWh": 1.0})
+
+    result = asyncio.run(agent._handle_tariff_cost(json.dumps({"column_name": "Consumption_kWh"}), df))
+
+    assert result["type"] == "tariff_cost" and result["table"] is None
+    assert "site down" in result["error"]
+
+
+def test_live_prices_report_failed_price_sources(monkeypatch):
+    from tools.live_price_tool import LivePriceTool
+
+    monkeypatch.setattr(price_sources, "PRICE_SOURCES", [_BrokenSource()])
+    result = asyncio.run(LivePriceTool(mistral_client=None).execute("cheapest contract"))
+
+    assert result["status"] is False and "site down" in result["error"]
@@ -0,0 +1,10 @@
+from memory_accounting import MemoryAccountant
+
+
+def test_memory_report_can_be_limited_to_one_session():
+    accountant = MemoryAccountant(trace=False)
+    for session_id in ("a" * 32, "b" * 32):
+        with accountant.track(session_id, "energy_kernel_tool"):
+            pass
+    sessions = accountant.report(session_id="a" * 32)["top_sessions"]
+    assert [row["session_id"] for row in sessions] == ["a" * 32]
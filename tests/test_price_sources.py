@@ -0,0 +1,33 @@
+import os
+
+import pytest
+
+from tools.price_sources import FixtureSource, KilovatoraSource, collect_prices
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+@pytest.fixture
+def kilovatora():
+    return FixtureSource(KilovatoraSource(), os.path.join(FIXTURE_DIR, "kilovatora.html"))
+
+
+def test_kilovatora_parser(kilovatora):
+    records = kilovatora.collect()
+
+    assert len(records) == 9
+    assert records[0] == {"provider": "Alpha Energy", "name": "Alpha Home",
+                          "price_under_2000": "0,145 €/kWh", "price_over_2000": "0,152 €/kWh"}
+    assert [record["provider"] for record in records] == ["Alpha Energy"] * 5 + ["Beta Power"] * 4
+
+
+def test_collect_prices_from_fixtures(kilovatora):
+    records, status = collect_prices([kilovatora])
+
+    assert status["kilovatora"]["ok"] and not status["kilovatora"]["stale"]
+    assert len(records) == 9
+    assert {record["source"] for record in records} == {"kilovatora"}
+
+
+def test_collect_prices_without_sources():
+    assert collect_prices([]) == ([], {})
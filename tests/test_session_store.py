@@ -0,0 +1,20 @@
+import pandas as pd
+
+from session_store import SessionStore
+
+
+def _table_paths(store, idx):
+    return store._load([idx])[idx]["table_paths"]
+
+
+def test_cleared_session_does_not_reuse_file_paths(tmp_path):
+    store = SessionStore(root=str(tmp_path))
+    store.append({"role": "assistant", "content": "old", "tables": [pd.DataFrame({"x": [1]})]})
+    old_paths = _table_paths(store, 0)
+
+    store.clear()
+    store.append({"role": "assistant", "content": "new", "tables": [pd.DataFrame({"x": [2]})]})
+    new_paths = _table_paths(store, 0)
+
+    assert new_paths != old_paths
+    assert pd.read_parquet(new_paths[0])["x"].tolist() == [2]
@@ -0,0 +1,23 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tools.tariff_engine import annualization_factor, rank_contracts
+
+
+def _hourly(days, start="2024-03-05"):
+    times = pd.date_range(start, periods=days * 24, freq="h")
+    return pd.DataFrame({"Timestamp_UTC": times, "Consumption_kWh": np.ones(len(times))})
+
+
+@pytest.mark.parametrize("days", [10, 45, 365])
+def test_annualization_uses_the_span_of_the_readings(days):
+    times = pd.DatetimeIndex(_hourly(days)["Timestamp_UTC"])
+    assert annualization_factor(times) == pytest.approx(365.25 / days)
+
+
+def test_ten_days_are_annualized_to_a_full_year():
+    prices = {"Provider": [{"name": "Flat", "price_under_2000": "0,10 €/kWh", "price_over_2000": "0,10 €/kWh"}]}
+    table = rank_contracts(prices, _hourly(10), "Consumption_kWh")
+    assert table["annual_kwh"].iloc[0] == pytest.approx(24 * 365.25)
+    assert table["annual_cost_eur"].iloc[0] == pytest.approx(0.10 * 24 * 365.25)
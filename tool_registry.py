@@ -0,0 +1,128 @@
+import importlib
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from tools.tool_schemas import TOOL_SCHEMAS
+
+
+logger = logging.getLogger(__name__)
+
+
+class ToolDescriptor:
+    """Where a tool lives and how to build it, without importing it"""
+
+    def __init__(self, name, module, class_name, agent_args=()):
+        self.name = name
+        self.module = module
+        self.class_name = class_name
+        # Names of MainAgent attributes passed positionally to the tool constructor
+        self.agent_args = agent_args
+
+    def get_tool_schema(self):
+        return TOOL_SCHEMAS[self.name]
+
+
+TOOL_DESCRIPTORS = [
+    ToolDescriptor("data_analysis_tool", "tools.data_analysis_tool", "DataAnalysisTool", ("client",)),
+    ToolDescriptor("forecast_tool", "tools.forecast_tool", "ChronosForecaster"),
+    ToolDescriptor("live_price_tool", "tools.live_price_tool", "LivePriceTool", ("client", "model_selector")),
+    ToolDescriptor("greek_news_tool", "tools.news_tool", "GreekNewsTool", ("client", "model_selector")),
+    ToolDescriptor("energy_kernel_tool", "tools.energy_kernels", "EnergyKernelTool"),
+    ToolDescriptor("tariff_cost_tool", "tools.tariff_engine", "TariffCostTool"),
+    ToolDescriptor("anomaly_detection_tool", "tools.anomaly_tool", "AnomalyDetectionTool"),
+]
+
+
+class ToolRegistry:
+    """Imports and instantiates each tool of an agent on first use"""
+
+    def __init__(self, agent, descriptors=None):
+        self.agent = agent
+        self.descriptors = {descriptor.name: descriptor for descriptor in descriptors or TOOL_DESCRIPTORS}
+        self._instances = {}
+        self._locks = {name: threading.Lock() for name in self.descriptors}
+        self.load_times = {}
+
+    def schemas(self):
+        return [descriptor.get_tool_schema() for descriptor in self.descriptors.values()]
+
+    def is_loaded(self, name):
+        return name in self._instances
+
+    def get(self, name):
+        """Return the tool instance, importing its module the first time"""
+        if name in self._instances:
+            return self._instances[name]
+
+        with self._locks[name]:
+            if name not in self._instances:
+                descriptor = self.descriptors[name]
+
+                started = time.perf_counter()
+                module = importlib.import_module(descriptor.module)
+                imported = time.perf_counter()
+                args = [getattr(self.agent, attr) for attr in descriptor.agent_args]
+                self._instances[name] = getattr(module, descriptor.class_name)(*args)
+                finished = time.perf_counter()
+
+                self.load_times[name] = {"import_s": imported - started, "init_s": finished - imported}
+                logger.info("loaded tool %s import=%.2fs init=%.2fs", name, imported - started, finished - imported)
+
+        return self._instances[name]
+
+    def preload(self, names=None):
+        """Load tools in a background thread so the first query does not pay for them"""
+
+        def run():
+            for name in names or self.descriptors:
+                try:
+                    self.get(name)
+                except Exception:
+                    logger.exception("preloading tool %s failed", name)
+
+        thread = threading.Thread(target=run, name="tool-preload", daemon=True)
+        thread.start()
+        return thread
+
+
+def _import_time(module):
+    """Cumulative import time of a module in a fresh interpreter, in seconds"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    for line in reversed(result.stderr.splitlines()):
+        parts = [part.strip() for part in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1e6
+    return None
+
+
+def benchmark_startup(query="What are the latest energy news in Greece?"):
+    """Import time per module, agent construction time and time to the first response"""
+    modules = ["streamlit", "main_agent", "agent_runtime"] + [descriptor.module for descriptor in TOOL_DESCRIPTORS]
+    report = {"import_s": {module: _import_time(module) for module in modules}}
+
+    started = time.perf_counter()
+    from agent_runtime import get_runtime
+    from main_agent import MainAgent
+
+    agent = MainAgent(os.getenv("MISTRAL_API_KEY"))
+    report["agent_ready_s"] = time.perf_counter() - started
+
+    if os.getenv("MISTRAL_API_KEY"):
+        get_runtime().run(agent.analyze_query(query, None))
+        report["first_response_s"] = time.perf_counter() - started
+        report["tools_loaded"] = agent.registry.load_times
+
+    return report
+
+
+if __name__ == "__main__":
+    import json
+
+    print(json.dumps(benchmark_startup(), indent=2))
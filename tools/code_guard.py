@@ -0,0 +1,294 @@
+import ast
+import logging
+import os
+
+
+logger = logging.getLogger(__name__)
+
+# Above this many points a scatter plot is thinned before drawing
+SCATTER_MAX_POINTS = 50_000
+# A regenerate request costs an LLM round-trip, so it is only made above this estimated saving
+REGENERATE_MIN_SAVINGS_S = float(os.getenv("CODE_GUARD_MIN_SAVINGS_S", 2.0))
+
+# Rough per-row cost in seconds of each slow pattern, used to estimate savings
+_ROW_COST_S = {
+    "iterrows": 20e-6,
+    "row_apply": 10e-6,
+    "series_apply": 1e-6,
+    "loop_append": 50e-6,
+    "row_loop": 15e-6,
+    "large_scatter": 1e-6,
+}
+
+_ALLOWED_NUMPY = {"abs", "sqrt", "log", "log1p", "exp", "round", "floor", "ceil", "sign", "clip", "maximum", "minimum"}
+
+# apply on these receivers gets whole groups or windows, not elements
+_GROUPING_METHODS = {"groupby", "resample", "rolling", "expanding", "ewm"}
+
+
+class Finding:
+    def __init__(self, kind, line, message, n_rows, fixed=False):
+        self.kind = kind
+        self.line = line
+        self.message = message
+        self.fixed = fixed
+        self.estimated_savings_s = _ROW_COST_S.get(kind, 0) * n_rows
+
+    def __repr__(self):
+        status = "rewritten" if self.fixed else "needs regeneration"
+        return f"line {self.line}: {self.kind} ({status}) - {self.message}"
+
+
+def _is_vectorizable(node, arg):
+    """True if a lambda body uses its argument and otherwise only constants, arithmetic and simple numpy ufuncs"""
+    # lambda x: 1 would collapse to a scalar instead of a Series
+    if not any(isinstance(child, ast.Name) and child.id == arg for child in ast.walk(node)):
+        return False
+    for child in ast.walk(node):
+        if isinstance(child, (ast.BinOp, ast.UnaryOp, ast.Constant, ast.operator, ast.unaryop, ast.Load)):
+            continue
+        if isinstance(child, ast.Name) and child.id in (arg, "np"):
+            continue
+        if isinstance(child, ast.Attribute) and isinstance(child.value, ast.Name) \
+                and child.value.id == "np" and child.attr in _ALLOWED_NUMPY:
+            continue
+        if isinstance(child, ast.Call) and isinstance(child.func, ast.Attribute) \
+                and isinstance(child.func.value, ast.Name) and child.func.value.id == "np" and not child.keywords:
+            continue
+        return False
+    return True
+
+
+class _Substitute(ast.NodeTransformer):
+    def __init__(self, name, replacement):
+        self.name = name
+        self.replacement = replacement
+
+    def visit_Name(self, node):
+        if node.id == self.name:
+            return self.replacement
+        return node
+
+
+def _keyword(call, name):
+    return next((kw for kw in call.keywords if kw.arg == name), None)
+
+
+def _is_row_apply(call):
+    axis = _keyword(call, "axis")
+    return axis is not None and isinstance(axis.value, ast.Constant) and axis.value.value in (1, "columns")
+
+
+def _is_grouped(receiver):
+    return any(isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+               and node.func.attr in _GROUPING_METHODS for node in ast.walk(receiver))
+
+
+def _thin(node, step):
+    return ast.Subscript(value=node, slice=ast.Slice(step=ast.Constant(step)), ctx=ast.Load())
+
+
+def _thin_rows(node, step):
+    return _thin(ast.Attribute(value=node, attr="iloc", ctx=ast.Load()), step)
+
+
+class _Guard(ast.NodeTransformer):
+    def __init__(self, n_rows):
+        self.n_rows = n_rows
+        self.findings = []
+        self.loop_depth = 0
+
+    def _add(self, kind, node, message, fixed=False):
+        self.findings.append(Finding(kind, getattr(node, "lineno", 0), message, self.n_rows, fixed))
+
+    def _visit_loop(self, node):
+        if isinstance(node, ast.For):
+            iterator = node.iter
+            if isinstance(iterator, ast.Call) and isinstance(iterator.func, ast.Attribute):
+                if iterator.func.attr == "iterrows":
+                    self._add("iterrows", node, "loop over DataFrame.iterrows(); use vectorized column operations")
+            if (isinstance(iterator, ast.Call) and isinstance(iterator.func, ast.Name) and iterator.func.id == "range"
+                    and any(isinstance(n, ast.Call) and isinstance(n.func, ast.Name) and n.func.id == "len"
+                            for n in ast.walk(iterator))):
+                self._add("row_loop", node, "Python loop over row positions; use vectorized operations or groupby")
+
+        self.loop_depth += 1
+        self.generic_visit(node)
+        self.loop_depth -= 1
+        return node
+
+    visit_For = _visit_loop
+    visit_While = _visit_loop
+
+    def visit_Assign(self, node):
+        self.generic_visit(node)
+        if not self.loop_depth:
+            return node
+
+        value = node.value
+        if isinstance(value, ast.Call) and isinstance(value.func, ast.Attribute):
+            if value.func.attr == "append" and isinstance(value.func.value, ast.Name) \
+                    and any(isinstance(t, ast.Name) and t.id == value.func.value.id for t in node.targets):
+                self._add("loop_append", node, "DataFrame.append inside a loop is quadratic; collect rows and build once")
+            if value.func.attr == "concat" and isinstance(value.func.value, ast.Name) and value.func.value.id == "pd":
+                self._add("loop_append", node, "pd.concat inside a loop is quadratic; concat once after the loop")
+
+        for target in node.targets:
+            if isinstance(target, ast.Subscript) and isinstance(target.value, ast.Attribute) \
+                    and target.value.attr == "loc" and "len(" in ast.unparse(target.slice):
+                self._add("loop_append", node, "df.loc[len(df)] = ... inside a loop; build the rows first")
+        return node
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        func = node.func
+        if not isinstance(func, ast.Attribute):
+            return node
+
+        if func.attr == "apply" and node.args and isinstance(node.args[0], ast.Lambda) \
+                and not _is_grouped(func.value):
+            lam = node.args[0]
+            if _is_row_apply(node):
+                self._add("row_apply", node, "row-wise apply(lambda, axis=1); use column arithmetic or np.where")
+            elif len(lam.args.args) == 1 and len(node.args) == 1 and not node.keywords:
+                arg = lam.args.args[0].arg
+                if _is_vectorizable(lam.body, arg):
+                    self._add("series_apply", node, "element-wise apply(lambda) replaced by a vectorized expression",
+                              fixed=True)
+                    return ast.copy_location(_Substitute(arg, func.value).visit(lam.body), node)
+                self._add("series_apply", node, "element-wise apply(lambda); use vectorized Series methods")
+
+        if self.n_rows > SCATTER_MAX_POINTS:
+            step = -(-self.n_rows // SCATTER_MAX_POINTS)
+            is_scatter = func.attr == "scatter" and len(node.args) >= 2 \
+                and all(isinstance(kw.value, ast.Constant) for kw in node.keywords)
+            if is_scatter and isinstance(func.value, ast.Attribute) and func.value.attr == "plot" \
+                    and all(isinstance(arg, ast.Constant) for arg in node.args[:2]):
+                # df.plot.scatter('x', 'y'): the column names stay, the frame is thinned
+                func.value.value = _thin_rows(func.value.value, step)
+                self._add("large_scatter", node, f"scatter of ~{self.n_rows} points thinned to every {step}th row",
+                          fixed=True)
+            elif is_scatter and not any(isinstance(arg, ast.Constant) for arg in node.args[:2]):
+                node.args[0], node.args[1] = _thin(node.args[0], step), _thin(node.args[1], step)
+                self._add("large_scatter", node, f"scatter of ~{self.n_rows} points thinned to every {step}th point",
+                          fixed=True)
+            elif func.attr == "scatterplot" and _keyword(node, "data") is not None:
+                data = _keyword(node, "data")
+                data.value = _thin_rows(data.value, step)
+                self._add("large_scatter", node, f"scatterplot of ~{self.n_rows} points thinned to every {step}th row",
+                          fixed=True)
+            elif func.attr == "scatter":
+                self._add("large_scatter", node, f"scatter of ~{self.n_rows} points; sample or use hexbin")
+
+        return node
+
+
+def guard_code(code, n_rows=0):
+    """Find slow pandas/matplotlib patterns and rewrite the easy ones
+
+    Returns (code, findings). The code is only re-rendered when something was rewritten
+    (re-rendering drops comments). Unparseable code is returned unchanged.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return code, []
+
+    guard = _Guard(n_rows)
+    tree = ast.fix_missing_locations(guard.visit(tree))
+
+    if any(finding.fixed for finding in guard.findings):
+        code = ast.unparse(tree)
+
+    for finding in guard.findings:
+        logger.info("code guard %r est_savings=%.2fs", finding, finding.estimated_savings_s)
+
+    return code, guard.findings
+
+
+def unresolved(findings):
+    return [finding for finding in findings if not finding.fixed]
+
+
+def worth_regenerating(findings, min_savings_s=REGENERATE_MIN_SAVINGS_S):
+    """Unresolved findings, or none if together they save less than a regenerate request costs"""
+    remaining = unresolved(findings)
+    savings = sum(finding.estimated_savings_s for finding in remaining)
+    if remaining and savings < min_savings_s:
+        logger.info("code guard: %d unresolved findings save ~%.2fs, not regenerating", len(remaining), savings)
+        return []
+    return remaining
+
+
+def format_findings(findings):
+    return "\n".join(f"- {finding!r}" for finding in findings)
+
+
+# Snippets as returned by the code generation model, with the kinds the guard should report
+CORPUS = [
+    ("""
+for index, row in df.iterrows():
+    if row['Consumption_kWh'] > 5:
+        print(row['Timestamp_UTC'])
+""", {"iterrows"}),
+    ("""
+df['Hour'] = df['Timestamp_UTC'].apply(lambda x: x.hour)
+df['Consumption_MWh'] = df['Consumption_kWh'].apply(lambda x: x / 1000)
+""", {"series_apply"}),
+    ("""
+df['Cost'] = df.apply(lambda row: row['Consumption_kWh'] * 0.15 if row['Tariff'] == 'day' else row['Consumption_kWh'] * 0.1, axis=1)
+""", {"row_apply"}),
+    ("""
+results = pd.DataFrame(columns=['day', 'total'])
+for day in df['Timestamp_UTC'].dt.date.unique():
+    total = df[df['Timestamp_UTC'].dt.date == day]['Consumption_kWh'].sum()
+    results = pd.concat([results, pd.DataFrame({'day': [day], 'total': [total]})])
+""", {"loop_append"}),
+    ("""
+plt.figure(figsize=(12, 8))
+plt.scatter(df['Temperature'], df['Consumption_kWh'], alpha=0.5)
+plt.title('Temperature vs Consumption')
+""", {"large_scatter"}),
+    ("""
+sns.scatterplot(data=df, x='Temperature', y='Consumption_kWh')
+""", {"large_scatter"}),
+    ("""
+df.plot.scatter('Temperature', 'Consumption_kWh', alpha=0.3)
+""", {"large_scatter"}),
+    ("""
+df['Reading'] = df['Consumption_kWh'].apply(lambda x: 1)
+""", {"series_apply"}),
+    ("""
+share = df.groupby('Tariff')['Consumption_kWh'].apply(lambda g: g / 1000)
+hourly = df.set_index('Timestamp_UTC')['Consumption_kWh'].resample('h').apply(lambda w: w * 2)
+""", set()),
+    ("""
+daily = df.set_index('Timestamp_UTC')['Consumption_kWh'].resample('D').sum()
+print(f"Average daily consumption: {daily.mean():.2f} kWh")
+""", set()),
+    ("""
+peaks = []
+for i in range(len(df)):
+    if df.iloc[i]['Consumption_kWh'] > df['Consumption_kWh'].quantile(0.95):
+        peaks.append(df.iloc[i]['Timestamp_UTC'])
+""", {"row_loop"}),
+]
+
+
+def check_corpus(n_rows=1_000_000):
+    """Run the guard over the corpus; report missed or unexpected kinds and broken rewrites"""
+    problems = []
+    for i, (snippet, expected) in enumerate(CORPUS):
+        code, findings = guard_code(snippet, n_rows)
+        kinds = {finding.kind for finding in findings}
+        if kinds != expected:
+            problems.append(f"snippet {i}: expected {sorted(expected)}, got {sorted(kinds)}")
+        try:
+            tree = ast.parse(code)
+        except SyntaxError as e:
+            problems.append(f"snippet {i}: rewritten code does not compile: {e}")
+            continue
+        # Thinning must slice data, never literals such as column names
+        if any(isinstance(node, ast.Subscript) and isinstance(node.value, ast.Constant) for node in ast.walk(tree)):
+            problems.append(f"snippet {i}: rewrite slices a constant: {code.strip()}")
+    return problems
@@ -4,29 +4,106 @@ import numpy as np
 import seaborn as sns
 from datetime import datetime
 import io
+import logging
 import sys
+import threading
 
+from tools.energy_kernels import KERNELS, describe_kernels
+from tools.tool_schemas import TOOL_SCHEMAS
 
-def execute_code(code, df):
-    """Execute code and capture outputs"""
+
+logger = logging.getLogger(__name__)
+
+
+def snapshot(df):
+    """Logically isolated view of df for one execution, without copying its data
+
+    Relies on pandas copy-on-write, which agent_runtime enables for the whole process.
+    """
+    return None if df is None else df.copy(deep=False)
+
+
+def snapshot_memory(original, view):
+    """Bytes of the view still shared with the original vs. copied or newly created"""
+    stats = {"original_bytes": 0, "shared_bytes": 0, "copied_bytes": 0}
+    if original is None or not isinstance(view, pd.DataFrame):
+        return stats
+
+    stats["original_bytes"] = int(original.memory_usage(index=False).sum())
+    for column in view.columns.unique():
+        series = view[column]
+        # Skip duplicate labels and extension dtypes, whose to_numpy() would copy
+        if isinstance(series, pd.DataFrame) or not isinstance(series.dtype, np.dtype):
+            continue
+        values = series.to_numpy()
+        source = original[column] if column in original.columns else None
+        if isinstance(source, pd.Series) and isinstance(source.dtype, np.dtype) \
+                and np.shares_memory(values, source.to_numpy()):
+            stats["shared_bytes"] += values.nbytes
+        else:
+            stats["copied_bytes"] += values.nbytes
+    return stats
+
+
+# stdout redirection and pyplot's figure registry are process-wide, so runs take turns
+_exec_lock = threading.Lock()
+
+
+def execute_code(code, df, stats=None, workspace=None):
+    """Execute code and capture outputs
+
+    The code sees a copy-on-write snapshot of df, so in-place changes
+    (new columns, dropna(inplace=True), set_index(...)) never leak into the session's
+    dataset. If `stats` is a dict it is filled with the snapshot's memory use.
+    With a workspace, earlier results the code names are injected as variables and the
+    DataFrames/Series it assigns are kept for later runs. Calls from several worker
+    threads run one at a time.
+    """
+    with _exec_lock:
+        return _execute_code(code, df, stats, workspace)
+
+
+def _execute_code(code, df, stats=None, workspace=None):
     old_stdout = sys.stdout
     sys.stdout = captured_output = io.StringIO()
     plt.switch_backend('Agg')
+    open_before = set(plt.get_fignums())
 
+    base = snapshot(df)
     exec_globals = {
-        'df': df, 'pd': pd, 'np': np, 'plt': plt,
-        'sns': sns, 'datetime': datetime, 'print': print
+        'df': base, 'pd': pd, 'np': np, 'plt': plt,
+        'sns': sns, 'datetime': datetime, 'print': print,
+        **KERNELS
     }
+    reserved = set(exec_globals)
+    # Shallow copies: with copy-on-write, in-place edits do not reach the stored entries
+    injected = {} if workspace is None else {
+        name: value.copy(deep=False) for name, value in workspace.inputs(code).items() if name not in reserved
+    }
+    exec_globals.update(injected)
 
     try:
         exec(code, exec_globals)
         output = captured_output.getvalue()
-        figures = [plt.figure(i) for i in plt.get_fignums()]
+        # Only this run's figures; others may still be open for earlier results
+        figures = [plt.figure(i) for i in plt.get_fignums() if i not in open_before]
+        if workspace is not None:
+            workspace.capture(exec_globals, injected, reserved, base)
         return output, figures, None
     except Exception as e:
+        # Figures of a failed run are never shown or stored, so nothing else would close them
+        for number in set(plt.get_fignums()) - open_before:
+            plt.close(number)
         return None, [], str(e)
     finally:
         sys.stdout = old_stdout
+        memory = snapshot_memory(df, exec_globals.get('df'))
+        logger.info(
+            "execute_code snapshot shared=%.1fMB copied=%.1fMB original=%.1fMB",
+            memory["shared_bytes"] / 2**20, memory["copied_bytes"] / 2**20, memory["original_bytes"] / 2**20
+        )
+        if stats is not None:
+            stats.update(memory)
 
 
 def _clean_code(code):
@@ -44,34 +121,26 @@ class DataAnalysisTool():
     def __init__(self, mistral_client):
         self.client = mistral_client
         self.name = "data_analysis_tool"
-        self.description = "Generate and execute Python code for data analysis tasks including statistics, visualizations, and data exploration"
 
     def get_tool_schema(self):
         """Tool schema for Mistral function calling"""
-        return {
-            "type": "function",
-            "function": {
-                "name": self.name,
-                "description": self.description,
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "user_query": {
-                            "type": "string",
-                            "description": "The user's data analysis question or request"
-                        },
-                        "data_summary": {
-                            "type": "string",
-                            "description": "Summary of the dataset structure and contents"
-                        }
-                    },
-                    "required": ["user_query", "data_summary"]
-                }
-            }
-        }
-
-    async def generate_code(self, user_query, data_summary):
-        """Generate analysis code using Codestral"""
+        return TOOL_SCHEMAS[self.name]
+
+    async def generate_code(self, user_query, data_summary, model="codestral-2501", previous_code=None, feedback=None,
+                            workspace_summary=None):
+        """Generate analysis code using Codestral (or the tier picked by the caller)
+
+        With previous_code and feedback, asks for a targeted rewrite of that code instead.
+        workspace_summary lists results of earlier runs that the code can reuse by name.
+        """
+        workspace = ""
+        if workspace_summary is not None:
+            workspace = f"""
+                WORKSPACE (results of earlier analyses in this session, already defined as variables):
+{workspace_summary or "                (empty)"}
+                - Reuse these variables instead of recomputing them from 'df'; compute only what is new
+                - Assign intermediate DataFrames/Series to descriptive variable names (e.g. daily_consumption); they are kept for follow-up questions
+"""
 
         prompt = f"""
 
@@ -98,6 +167,11 @@ class DataAnalysisTool():
                 - Example: print(f"Average energy consumption: {{df['Energy_Consumption'].mean():.3f}}")
 
 
+                VECTORIZED HELPERS (already available, no import needed):
+{describe_kernels()}
+                - Prefer these helpers and vectorized pandas/numpy operations over loops, iterrows() or row-wise apply()
+{workspace}
+
                 PLOTTING GUIDELINES:
                 - Use matplotlib/seaborn for visualizations
                 - Create figure with plt.figure(figsize=(12, 8)) 
@@ -110,18 +184,29 @@ class DataAnalysisTool():
                 """
 
 
+        messages = [
+            {
+                "role": "system",
+                "content": prompt
+            },
+            {
+                "role": "user",
+                "content": user_query
+            }
+        ]
+
+        if previous_code is not None:
+            messages.append({"role": "assistant", "content": f"```python\n{previous_code}\n```"})
+            messages.append({
+                "role": "user",
+                "content": f"This code is too slow for a dataset of this size:\n{feedback}\n\n"
+                           "Rewrite it with the same results using vectorized pandas/numpy operations. "
+                           "Return the complete code."
+            })
+
         response = await self.client.chat.complete_async(
-            model="codestral-2501",
-            messages=[
-                {
-                    "role": "system",
-                    "content": prompt
-                },
-                {
-                    "role": "user",
-                    "content": user_query
-                }
-            ],
+            model=model,
+            messages=messages,
             temperature=0.7
         )
 
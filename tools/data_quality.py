@@ -0,0 +1,285 @@
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+
+TIME_COLUMN = "Timestamp_UTC"
+GAP_COLUMN = "Gap_Filled"
+
+# How to fill numeric values in inserted gap rows and existing NaNs: interpolate, ffill, zero or none
+FILL_POLICY = os.getenv("DATA_QUALITY_FILL", "interpolate")
+# Which row to keep for repeated timestamps: first, last or mean
+DUPLICATE_POLICY = os.getenv("DATA_QUALITY_DUPLICATES", "last")
+# Share of non-empty values that must parse for a text column to be converted
+MIN_PARSED_SHARE = 0.95
+# Do not regularize when the grid would be this many times larger than the data (irregular series)
+MAX_GRID_FACTOR = 3
+# Text columns are object on pandas 2 and the str dtype on pandas 3
+TEXT_DTYPES = ["object", "string"]
+
+_TIME_NAME = re.compile(r"time|date|datetime|timestamp|ημερομηνία|ώρα", re.IGNORECASE)
+
+
+def _parse_share(parsed, original):
+    present = original.notna().sum()
+    return parsed.notna().sum() / present if present else 0.0
+
+
+def detect_time_column(df):
+    """Timestamp_UTC if present, else a datetime column, else a text column that parses as dates"""
+    if TIME_COLUMN in df.columns:
+        return TIME_COLUMN
+
+    datetime_cols = df.select_dtypes(include=["datetime", "datetimetz"]).columns
+    if len(datetime_cols):
+        return datetime_cols[0]
+
+    candidates = [column for column in df.select_dtypes(include=TEXT_DTYPES).columns
+                  if _TIME_NAME.search(str(column))]
+    for column in candidates:
+        sample = df[column].dropna().head(500)
+        if len(sample) and _parse_share(pd.to_datetime(sample, errors="coerce"), sample) >= MIN_PARSED_SHARE:
+            return column
+    return None
+
+
+def infer_frequency(times):
+    """Typical spacing of sorted, unique timestamps, or None"""
+    if len(times) < 3:
+        return None
+    # Timedelta diffs, not asi8: the integer unit is microseconds for parsed dates on pandas 3
+    step = pd.Series(times).diff().median()
+    return step if step > pd.Timedelta(0) else None
+
+
+def _to_number(values):
+    """Numbers from text, NaN where a value does not parse"""
+    text = values.astype("string").str.strip()
+    parsed = pd.to_numeric(text, errors="coerce")
+    if _parse_share(parsed, values) < MIN_PARSED_SHARE and text.str.contains(",", regex=False).any():
+        # Decimal comma, optionally with dot thousands separators (1.234,5)
+        parsed = pd.to_numeric(text.str.replace(".", "", regex=False).str.replace(",", ".", regex=False),
+                               errors="coerce")
+    return parsed
+
+
+def _coerce_numeric(df, exclude):
+    """Convert text columns that are really numbers; returns {column: values that failed to parse}"""
+    coerced = {}
+    for column in df.select_dtypes(include=TEXT_DTYPES).columns:
+        if column in exclude:
+            continue
+        parsed = _to_number(df[column])
+        if _parse_share(parsed, df[column]) >= MIN_PARSED_SHARE:
+            coerced[column] = int(parsed.isna().sum() - df[column].isna().sum())
+            df[column] = parsed
+    return coerced
+
+
+def _deduplicate(df, policy):
+    if policy == "mean":
+        numeric = df.select_dtypes(include=["number"]).columns
+        aggregations = {column: ("mean" if column in numeric else "last") for column in df.columns if column != TIME_COLUMN}
+        return df.groupby(TIME_COLUMN, sort=False, as_index=False).agg(aggregations)
+    return df.drop_duplicates(subset=TIME_COLUMN, keep=policy)
+
+
+def _fill(df, policy):
+    """Fill numeric NaNs by the policy; returns {column: values filled}"""
+    numeric = [column for column in df.select_dtypes(include=["number"]).columns if column != GAP_COLUMN]
+    if not numeric:
+        return {}
+    before = df[numeric].isna().sum()
+
+    if policy == "interpolate":
+        indexed = df.set_index(TIME_COLUMN)[numeric]
+        df[numeric] = indexed.interpolate(method="time", limit_area="inside").to_numpy()
+    elif policy == "ffill":
+        df[numeric] = df[numeric].ffill()
+    elif policy == "zero":
+        df[numeric] = df[numeric].fillna(0)
+    elif policy != "none":
+        raise ValueError("fill policy must be 'interpolate', 'ffill', 'zero' or 'none'")
+
+    filled = before - df[numeric].isna().sum()
+    return {column: int(count) for column, count in filled.items() if count}
+
+
+def clean_dataset(df, fill=None, duplicates=None):
+    """One vectorized quality pass: time column, sort, dedupe, types, gaps
+
+    Returns (clean frame, report). The frame has its time column as Timestamp_UTC,
+    sorted with unique timestamps, numeric text converted, and, for regular series,
+    one row per interval with inserted rows flagged in Gap_Filled.
+    """
+    fill = fill or FILL_POLICY
+    duplicates = duplicates or DUPLICATE_POLICY
+    df = df.copy()
+    report = {"rows_in": len(df), "fill_policy": fill, "duplicate_policy": duplicates}
+
+    time_column = detect_time_column(df)
+    report["time_column"] = time_column
+    report["coerced_columns"] = _coerce_numeric(df, exclude={time_column})
+
+    if time_column is None:
+        report["rows_out"] = len(df)
+        return df, report
+
+    if time_column != TIME_COLUMN:
+        df = df.rename(columns={time_column: TIME_COLUMN})
+    df[TIME_COLUMN] = pd.to_datetime(df[TIME_COLUMN], errors="coerce")
+
+    invalid = df[TIME_COLUMN].isna()
+    report["invalid_timestamps"] = int(invalid.sum())
+    df = df[~invalid]
+
+    report["was_sorted"] = bool(df[TIME_COLUMN].is_monotonic_increasing)
+    if not report["was_sorted"]:
+        df = df.sort_values(TIME_COLUMN, kind="stable")
+
+    rows = len(df)
+    df = _deduplicate(df, duplicates)
+    report["duplicates_removed"] = rows - len(df)
+
+    times = pd.DatetimeIndex(df[TIME_COLUMN])
+    step = infer_frequency(times)
+    report["frequency"] = str(step) if step is not None else None
+
+    df[GAP_COLUMN] = False
+    report["missing_intervals"] = 0
+    if step is not None:
+        # Sized before it is built, so a tiny step cannot allocate a huge grid
+        grid_size = (times[-1] - times[0]) // step + 1
+        if grid_size <= MAX_GRID_FACTOR * len(times) \
+                and times.isin(pd.date_range(times[0], times[-1], freq=step)).mean() >= MIN_PARSED_SHARE:
+            df = _regularize(df, times, step, report)
+        else:
+            report["irregular"] = True
+
+    report["filled_values"] = _fill(df, fill)
+    report["rows_out"] = len(df)
+    return df.reset_index(drop=True), report
+
+
+def _regularize(df, times, step, report):
+    """One row per interval from the first to the last timestamp; inserted rows flagged in Gap_Filled"""
+    grid = pd.date_range(times[0], times[-1], freq=step)
+    df = df.set_index(TIME_COLUMN).reindex(grid.union(times))
+    df.index.name = TIME_COLUMN
+    inserted = df[GAP_COLUMN].isna()
+    df[GAP_COLUMN] = inserted
+    df = df.reset_index()
+
+    report["missing_intervals"] = int(inserted.sum())
+    if inserted.any():
+        runs = np.diff(np.flatnonzero(np.diff(np.r_[0, inserted.to_numpy().astype(int), 0])).reshape(-1, 2))
+        report["largest_gap"] = str(step * int(runs.max()))
+    return df
+
+
+def _merge_reports(report, tail_report, rows_out):
+    merged = dict(report)
+    merged["rows_in"] = report["rows_in"] + tail_report["rows_in"]
+    merged["rows_out"] = rows_out
+    for key in ("invalid_timestamps", "duplicates_removed", "missing_intervals"):
+        merged[key] = report.get(key, 0) + tail_report.get(key, 0)
+    gaps = [pd.Timedelta(gap) for gap in (report.get("largest_gap"), tail_report.get("largest_gap")) if gap]
+    if gaps:
+        merged["largest_gap"] = str(max(gaps))
+    filled = dict(report.get("filled_values", {}))
+    for column, count in tail_report.get("filled_values", {}).items():
+        filled[column] = filled.get(column, 0) + count
+    merged["filled_values"] = filled
+    return merged
+
+
+def _match_dtypes(part, clean):
+    """Cast new rows to the cleaned frame's dtypes so the concatenation keeps them"""
+    for column, dtype in clean.dtypes.items():
+        if column in part.columns and part[column].dtype != dtype and not isinstance(dtype, pd.CategoricalDtype):
+            try:
+                part[column] = part[column].astype(dtype)
+            except (TypeError, ValueError):
+                pass
+    return part
+
+
+def clean_append(clean, report, tail):
+    """Clean appended raw rows against a frame that clean_dataset already produced
+
+    Only the tail is processed, together with the last cleaned row so that gaps and
+    interpolation across the boundary are handled. Tails reaching back before the
+    cleaned data fall back to a full pass. Returns (merged frame, updated report).
+    """
+    fill, duplicates = report["fill_policy"], report["duplicate_policy"]
+    tail = tail.copy()
+    tail_report = {"rows_in": len(tail)}
+    for column in report.get("coerced_columns", {}):
+        if column in tail.columns and not pd.api.types.is_numeric_dtype(tail[column]):
+            tail[column] = _to_number(tail[column])
+
+    time_column = report.get("time_column")
+    if time_column is None or clean.empty:
+        merged = pd.concat([clean, _match_dtypes(tail, clean)], ignore_index=True)
+        return merged, _merge_reports(report, tail_report, len(merged))
+
+    tail = tail.rename(columns={time_column: TIME_COLUMN})
+    tail[TIME_COLUMN] = pd.to_datetime(tail[TIME_COLUMN], errors="coerce")
+    invalid = tail[TIME_COLUMN].isna()
+    tail_report["invalid_timestamps"] = int(invalid.sum())
+    tail = tail[~invalid].sort_values(TIME_COLUMN, kind="stable")
+
+    if tail.empty:
+        return clean, _merge_reports(report, tail_report, len(clean))
+    if tail[TIME_COLUMN].iloc[0] < clean[TIME_COLUMN].iloc[-1]:
+        # Out-of-order rows: redo the whole pass on the real rows plus the tail
+        real = clean[~clean[GAP_COLUMN]].drop(columns=GAP_COLUMN)
+        merged, full_report = clean_dataset(pd.concat([real, tail], ignore_index=True), fill, duplicates)
+        return merged, {**full_report, "rows_in": report["rows_in"] + len(tail)}
+
+    # The last cleaned row is a real reading (gap rows only sit between real ones)
+    part = pd.concat([clean.iloc[-1:].drop(columns=GAP_COLUMN), tail], ignore_index=True)
+    rows = len(part)
+    part = _deduplicate(part, duplicates)
+    tail_report["duplicates_removed"] = rows - len(part)
+
+    part[GAP_COLUMN] = False
+    if report.get("frequency") and not report.get("irregular"):
+        part = _regularize(part, pd.DatetimeIndex(part[TIME_COLUMN]), pd.Timedelta(report["frequency"]), tail_report)
+    tail_report["filled_values"] = _fill(part, fill)
+
+    merged = pd.concat([clean.iloc[:-1], _match_dtypes(part, clean)], ignore_index=True)
+    for column, dtype in clean.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            merged[column] = merged[column].astype("category")
+    return merged, _merge_reports(report, tail_report, len(merged))
+
+
+def format_quality_report(report):
+    """Short text version of the report for the dataset summary"""
+    lines = [f"Data quality pass ({report['rows_in']} -> {report['rows_out']} rows):"]
+    if report.get("time_column") is None:
+        lines.append("- No time column detected")
+    else:
+        renamed = f" (renamed from '{report['time_column']}')" if report["time_column"] != TIME_COLUMN else ""
+        lines.append(f"- Time column: {TIME_COLUMN}{renamed}, frequency {report.get('frequency') or 'irregular'}, "
+                     f"sorted{' (was unsorted)' if not report.get('was_sorted', True) else ''}")
+        if report.get("invalid_timestamps"):
+            lines.append(f"- Dropped {report['invalid_timestamps']} rows with unparseable timestamps")
+        if report.get("duplicates_removed"):
+            lines.append(f"- Removed {report['duplicates_removed']} duplicate timestamps (kept {report['duplicate_policy']})")
+        if report.get("missing_intervals"):
+            lines.append(f"- Inserted {report['missing_intervals']} missing intervals (largest gap {report['largest_gap']}), "
+                         f"flagged in the {GAP_COLUMN} column")
+        if report.get("irregular"):
+            lines.append("- Timestamps are irregular; no gap rows inserted")
+    if report.get("coerced_columns"):
+        lines.append(f"- Converted text to numbers: {list(report['coerced_columns'])}")
+    if report.get("filled_values"):
+        lines.append(f"- Filled missing values ({report['fill_policy']}): {report['filled_values']}")
+    if report.get("downcast"):
+        lines.append("- Large dataset: floats are 32-bit and repeated text columns are categorical")
+    lines.append("The dataframe is already clean; do not re-parse, sort or deduplicate it.")
+    return "\n".join(lines)
@@ -0,0 +1,237 @@
+import inspect
+import time
+
+import numpy as np
+import pandas as pd
+
+from tools.tool_schemas import TOOL_SCHEMAS
+
+
+TIME_COLUMN = "Timestamp_UTC"
+
+
+def _time_indexed(df, time_column=TIME_COLUMN):
+    """Return the frame indexed by its timestamps, sorted, without copying when possible"""
+    if isinstance(df.index, pd.DatetimeIndex):
+        indexed = df
+    elif time_column in df.columns:
+        indexed = df.set_index(pd.to_datetime(df[time_column], errors="coerce"))
+        indexed = indexed[indexed.index.notna()]
+    else:
+        raise ValueError(f"No DatetimeIndex and no '{time_column}' column to index by")
+
+    if not indexed.index.is_monotonic_increasing:
+        indexed = indexed.sort_index()
+    return indexed
+
+
+def _interval_hours(index):
+    """Length in hours each reading stands for: the gap to the next reading, at most the median step
+
+    The cap keeps the last reading before an outage from standing for the whole outage.
+    """
+    # asi8 is in the index's own unit (microseconds for parsed dates on pandas 3)
+    seconds = np.diff(index.as_unit("ns").asi8) / 1e9
+    if len(seconds) == 0:
+        return np.ones(len(index))
+    step = np.median(seconds)
+    return np.append(np.minimum(seconds, step), step) / 3600
+
+
+def load_profile(df, column, by="hour", time_column=TIME_COLUMN):
+    """Average value per hour of day, weekday, or hour within each weekday"""
+    data = _time_indexed(df, time_column)[column]
+    index = data.index
+
+    if by == "hour":
+        keys = [index.hour]
+    elif by == "weekday":
+        keys = [index.dayofweek]
+    elif by == "hour_weekday":
+        keys = [index.dayofweek, index.hour]
+    else:
+        raise ValueError("by must be 'hour', 'weekday' or 'hour_weekday'")
+
+    profile = data.groupby(keys).agg(["mean", "min", "max"])
+    profile.index.names = ["weekday", "hour"] if by == "hour_weekday" else [by]
+    return profile
+
+
+def peak_demand(df, column, time_column=TIME_COLUMN):
+    """Highest reading and when it happened"""
+    data = _time_indexed(df, time_column)[column]
+    values = data.to_numpy(dtype=float)
+    position = int(np.nanargmax(values))
+    return {"peak": float(values[position]), "timestamp": data.index[position]}
+
+
+def energy_totals(df, column, freq="D", time_column=TIME_COLUMN):
+    """Energy per period from power readings (power × interval length, summed per period)"""
+    data = _time_indexed(df, time_column)[column]
+    energy = data.to_numpy(dtype=float) * _interval_hours(data.index)
+    return pd.Series(energy, index=data.index, name=f"{column}_energy").resample(freq).sum(min_count=1)
+
+
+def load_factor(df, column, time_column=TIME_COLUMN):
+    """Average load divided by peak load"""
+    values = _time_indexed(df, time_column)[column].to_numpy(dtype=float)
+    peak = np.nanmax(values)
+    return float(np.nanmean(values) / peak) if peak else float("nan")
+
+
+def baseload_peak_split(df, column, base_quantile=0.1, time_column=TIME_COLUMN):
+    """Split energy into the always-on baseload and the part above it"""
+    data = _time_indexed(df, time_column)[column]
+    values = data.to_numpy(dtype=float)
+    hours = _interval_hours(data.index)
+
+    baseload = float(np.nanquantile(values, base_quantile))
+    total = np.nansum(values * hours)
+    base = np.nansum(np.minimum(values, baseload) * hours)
+
+    return {
+        "baseload_level": baseload,
+        "total_energy": float(total),
+        "baseload_energy": float(base),
+        "peak_energy": float(total - base),
+        "baseload_share": float(base / total) if total else float("nan"),
+    }
+
+
+KERNELS = {
+    "load_profile": load_profile,
+    "peak_demand": peak_demand,
+    "energy_totals": energy_totals,
+    "load_factor": load_factor,
+    "baseload_peak_split": baseload_peak_split,
+}
+
+
+def describe_kernels():
+    """One line per kernel for prompts"""
+    return "\n".join(f"- {name}(df, column, ...): {kernel.__doc__}" for name, kernel in KERNELS.items())
+
+
+def format_result(result):
+    """Render a kernel result as compact text for the LLM"""
+    if isinstance(result, (pd.DataFrame, pd.Series)):
+        return result.round(3).to_string(max_rows=60)
+    if isinstance(result, dict):
+        return "\n".join(
+            f"{key}: {round(value, 3) if isinstance(value, float) else value}" for key, value in result.items()
+        )
+    return str(round(result, 3) if isinstance(result, float) else result)
+
+
+class EnergyKernelTool:
+    """Direct access to the analytics kernels without generating code"""
+
+    def __init__(self):
+        self.name = "energy_kernel_tool"
+
+    def get_tool_schema(self):
+        return TOOL_SCHEMAS[self.name]
+
+    def execute(self, df, kernel, column_name, **options):
+        if kernel not in KERNELS:
+            return {"error": f"Unknown kernel '{kernel}'", "result": None, "text": ""}
+        if column_name not in df.columns:
+            return {"error": f"Column '{column_name}' not found", "result": None, "text": ""}
+
+        # Drop options that belong to other kernels (e.g. 'by' sent with energy_totals)
+        accepted = inspect.signature(KERNELS[kernel]).parameters
+        options = {key: value for key, value in options.items() if key in accepted}
+
+        try:
+            result = KERNELS[kernel](df, column_name, **options)
+        except Exception as e:
+            return {"error": str(e), "result": None, "text": ""}
+
+        return {"error": None, "result": result, "text": format_result(result)}
+
+
+# --- Benchmarks against naive row-wise pandas ---
+
+def _naive_load_profile(df, column):
+    sums, counts = {}, {}
+    for _, row in df.iterrows():
+        hour = row[TIME_COLUMN].hour
+        sums[hour] = sums.get(hour, 0) + row[column]
+        counts[hour] = counts.get(hour, 0) + 1
+    return {hour: sums[hour] / counts[hour] for hour in sums}
+
+
+def _naive_peak_demand(df, column):
+    best, when = -np.inf, None
+    for _, row in df.iterrows():
+        if row[column] > best:
+            best, when = row[column], row[TIME_COLUMN]
+    return {"peak": best, "timestamp": when}
+
+
+def _naive_energy_totals(df, column):
+    rows = df.sort_values(TIME_COLUMN).reset_index(drop=True)
+    totals = {}
+    for i in range(len(rows) - 1):
+        hours = (rows.loc[i + 1, TIME_COLUMN] - rows.loc[i, TIME_COLUMN]).total_seconds() / 3600
+        day = rows.loc[i, TIME_COLUMN].date()
+        totals[day] = totals.get(day, 0) + rows.loc[i, column] * hours
+    return totals
+
+
+def _naive_load_factor(df, column):
+    values = [row[column] for _, row in df.iterrows()]
+    return sum(values) / len(values) / max(values)
+
+
+def _naive_baseload_peak_split(df, column):
+    baseload = df[column].quantile(0.1)
+    base = total = 0.0
+    for _, row in df.iterrows():
+        total += row[column]
+        base += min(row[column], baseload)
+    return {"baseload_share": base / total}
+
+
+_BASELINES = {
+    "load_profile": _naive_load_profile,
+    "peak_demand": _naive_peak_demand,
+    "energy_totals": _naive_energy_totals,
+    "load_factor": _naive_load_factor,
+    "baseload_peak_split": _naive_baseload_peak_split,
+}
+
+
+def make_benchmark_frame(n_rows, freq="15min", seed=0):
+    """Synthetic meter data with a daily cycle and noise"""
+    rng = np.random.default_rng(seed)
+    timestamps = pd.date_range("2024-01-01", periods=n_rows, freq=freq, tz="UTC")
+    daily = 1 + 0.5 * np.sin(2 * np.pi * (timestamps.hour.to_numpy() - 6) / 24)
+    return pd.DataFrame({
+        TIME_COLUMN: timestamps,
+        "Power_kW": 10 * daily + rng.normal(0, 1, n_rows),
+    })
+
+
+def benchmark_kernels(n_rows=20000):
+    """Time every kernel against its naive pandas baseline on the same data"""
+    df = make_benchmark_frame(n_rows)
+    rows = []
+
+    for name, kernel in KERNELS.items():
+        started = time.perf_counter()
+        kernel(df, "Power_kW")
+        vectorized = time.perf_counter() - started
+
+        started = time.perf_counter()
+        _BASELINES[name](df, "Power_kW")
+        naive = time.perf_counter() - started
+
+        rows.append({"kernel": name, "rows": n_rows, "vectorized_s": vectorized,
+                     "naive_s": naive, "speedup": naive / vectorized if vectorized else float("inf")})
+
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    print(benchmark_kernels().round(4).to_string(index=False))
@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+
+
+# Upper bounds that keep the digest the same size whatever the horizon
+MAX_EXTREMES = 3
+MAX_PERIODS = 12
+
+
+def series_step(df, series, time_column="Timestamp_UTC"):
+    """(last timestamp, typical spacing) of the series, or None without a usable time column"""
+    if df is None or time_column not in df.columns or len(series) < 2:
+        return None
+
+    times = pd.to_datetime(df.loc[series.index, time_column], errors="coerce").dropna()
+    if len(times) < 2:
+        return None
+
+    step = times.diff().dropna().median()
+    if pd.isna(step) or step <= pd.Timedelta(0):
+        return None
+    return times.iloc[-1], step
+
+
+def forecast_timestamps(df, series, prediction_length, time_column="Timestamp_UTC"):
+    """Timestamps of the forecast steps, continuing the spacing of the input series"""
+    spacing = series_step(df, series, time_column)
+    if spacing is None:
+        return None
+    last, step = spacing
+    return pd.date_range(last + step, periods=prediction_length, freq=step)
+
+
+def _label(position, timestamps):
+    if timestamps is None:
+        return f"step {position + 1}"
+    return timestamps[position].strftime("%Y-%m-%d %H:%M")
+
+
+def _extremes(values, timestamps, largest):
+    order = np.argsort(values)
+    if largest:
+        order = order[::-1]
+
+    # Skip neighbours of an already chosen point so a single broad peak is not listed three times
+    spacing = max(1, len(values) // (4 * MAX_EXTREMES))
+    chosen = []
+    for position in order:
+        if all(abs(position - other) > spacing for other in chosen):
+            chosen.append(int(position))
+        if len(chosen) == MAX_EXTREMES:
+            break
+    return ", ".join(f"{values[position]:.3f} at {_label(position, timestamps)}" for position in chosen)
+
+
+def _period_rule(timestamps):
+    """The finest of day/week/month/quarter/year giving at most MAX_PERIODS periods"""
+    span = timestamps[-1] - timestamps[0]
+    for rule, length in (("D", pd.Timedelta(days=1)), ("W", pd.Timedelta(days=7)),
+                         ("MS", pd.Timedelta(days=31)), ("QS", pd.Timedelta(days=92))):
+        if span / length < MAX_PERIODS - 1:
+            return rule
+    return "YS"
+
+
+def _period_aggregates(median, timestamps):
+    if timestamps is not None and len(timestamps) > 1:
+        rule = _period_rule(timestamps)
+        grouped = pd.Series(median, index=timestamps).resample(rule)
+        frame = pd.DataFrame({"mean": grouped.mean(), "total": grouped.sum()}).dropna()
+        labels = frame.index.strftime("%Y-%m-%d")
+    else:
+        # No timestamps: equal blocks of steps
+        blocks = np.array_split(np.arange(len(median)), min(MAX_PERIODS, len(median)))
+        frame = pd.DataFrame({
+            "mean": [median[block].mean() for block in blocks],
+            "total": [median[block].sum() for block in blocks],
+        })
+        labels = [f"steps {block[0] + 1}-{block[-1] + 1}" for block in blocks]
+
+    return "\n".join(f"  {label}: mean {row.mean:.3f}, total {row.total:.3f}"
+                     for label, row in zip(labels, frame.itertuples()))
+
+
+def forecast_digest(median, low, high, history=None, timestamps=None):
+    """Bounded text summary of a forecast for the LLM
+
+    Reports level, trend, peaks and troughs, interval width and period aggregates.
+    The output has a fixed number of lines, so long horizons cost no more prompt
+    tokens than short ones; the full arrays stay in the tool result for the UI.
+    """
+    median = np.asarray(median, dtype=float)
+    low = np.asarray(low, dtype=float)
+    high = np.asarray(high, dtype=float)
+    n = len(median)
+    if n == 0:
+        return "Empty forecast."
+
+    if timestamps is not None:
+        horizon = f"{n} steps, {_label(0, timestamps)} to {_label(n - 1, timestamps)}"
+    else:
+        horizon = f"{n} steps"
+
+    level = median.mean()
+    slope = np.polyfit(np.arange(n), median, 1)[0] if n > 1 else 0.0
+    change = median[-1] - median[0]
+
+    lines = [
+        f"Horizon: {horizon}",
+        f"Level: mean {level:.3f}, first {median[0]:.3f}, last {median[-1]:.3f}, "
+        f"min {median.min():.3f}, max {median.max():.3f}",
+        f"Trend: {slope:+.4f} per step ({change:+.3f} over the horizon)",
+    ]
+
+    if history is not None and len(history):
+        recent = np.asarray(history, dtype=float)[-n:]
+        recent_mean = np.nanmean(recent)
+        if recent_mean:
+            lines.append(f"Versus the last {len(recent)} observed steps (mean {recent_mean:.3f}): "
+                         f"{(level - recent_mean) / abs(recent_mean):+.1%}")
+
+    width = high - low
+    relative = f" ({width.mean() / abs(level):.1%} of level)" if level else ""
+    lines += [
+        f"Peaks: {_extremes(median, timestamps, largest=True)}",
+        f"Troughs: {_extremes(median, timestamps, largest=False)}",
+        f"Prediction interval width: mean {width.mean():.3f}{relative}, "
+        f"first step {width[0]:.3f}, last step {width[-1]:.3f}",
+        "Period aggregates of the median:",
+        _period_aggregates(median, timestamps),
+    ]
+    return "\n".join(lines)
@@ -0,0 +1,220 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+# Quantiles returned as (low, median, high) by every forecaster, Chronos included
+QUANTILE_LEVELS = [0.7, 0.8, 0.9]
+
+# Baselines fit on at most this many of the latest points
+MAX_FIT_POINTS = 2000
+
+# Seasonal lags tried when the caller does not know the season length
+CANDIDATE_SEASONS = (24, 48, 96, 168, 7, 12)
+
+SMOOTHING_ALPHAS = np.array([0.05, 0.1, 0.2, 0.3, 0.5, 0.7, 0.9])
+SMOOTHING_BETAS = np.array([0.0, 0.01, 0.05, 0.1, 0.2])
+DAMPING = 0.98
+
+# A baseline whose scaled holdout loss is at or below this is used without trying Chronos
+BASELINE_MAX_LOSS = float(os.getenv("FORECAST_BASELINE_MAX_LOSS", 0.3))
+# Series shorter than this never go to Chronos
+MIN_CHRONOS_CONTEXT = int(os.getenv("FORECAST_MIN_CHRONOS_CONTEXT", 48))
+
+
+def _season(values, season_length):
+    """Usable season length for a series, 1 when there is no room for two seasons"""
+    if not season_length or season_length < 2 or len(values) < 2 * season_length:
+        return 1
+    return int(season_length)
+
+
+def season_from_step(step_seconds):
+    """Season length implied by the sampling interval: a day for sub-daily data, a week for daily"""
+    if not step_seconds or step_seconds <= 0:
+        return None
+    if step_seconds < 86400:
+        return int(round(86400 / step_seconds))
+    if step_seconds == 86400:
+        return 7
+    if 28 * 86400 <= step_seconds <= 31 * 86400:
+        return 12
+    return None
+
+
+def detect_season(values):
+    """Candidate lag with the highest autocorrelation, or None if none is clearly seasonal"""
+    y = np.asarray(values, dtype=float)[-4 * MAX_FIT_POINTS:]
+    y = y - y.mean()
+    variance = np.dot(y, y) / max(len(y), 1)
+    if variance == 0:
+        return None
+
+    best, best_corr = None, 0.3
+    for lag in CANDIDATE_SEASONS:
+        if lag >= len(y) // 2:
+            continue
+        corr = np.dot(y[:-lag], y[lag:]) / ((len(y) - lag) * variance)
+        if corr > best_corr:
+            best, best_corr = lag, corr
+    return best
+
+
+def _bands(point, residuals, growth_rate):
+    """Quantiles from the empirical residual distribution, widening with the step ahead"""
+    residuals = residuals[np.isfinite(residuals)]
+    if len(residuals) == 0:
+        residuals = np.zeros(1)
+
+    offsets = np.quantile(residuals, QUANTILE_LEVELS)
+    growth = np.sqrt(1 + np.arange(len(point)) * growth_rate)
+    quantiles = np.sort(point[:, None] + offsets[None, :] * growth[:, None], axis=1)
+    return quantiles[:, 0].tolist(), quantiles[:, 1].tolist(), quantiles[:, 2].tolist()
+
+
+def seasonal_naive(values, prediction_length, season_length=None):
+    """Repeat the last season"""
+    values = np.asarray(values, dtype=float)
+    m = _season(values, season_length)
+    point = np.resize(values[-m:], prediction_length)
+    return _bands(point, values[m:] - values[:-m], 1 / m)
+
+
+def exponential_smoothing(values, prediction_length, season_length=None):
+    """Damped-trend Holt smoothing, with all grid parameters fitted in the same pass"""
+    y = np.asarray(values, dtype=float)[-MAX_FIT_POINTS:]
+    if len(y) < 3:
+        return _bands(np.full(prediction_length, y[-1]), y[1:] - y[:-1], 1)
+
+    alpha, beta = (grid.ravel() for grid in np.meshgrid(SMOOTHING_ALPHAS, SMOOTHING_BETAS))
+    level = np.full(alpha.shape, y[0])
+    trend = np.zeros(alpha.shape)
+    errors = np.empty((len(y) - 1, len(alpha)))
+
+    # Error-correction form; each step updates every (alpha, beta) pair at once
+    for t in range(1, len(y)):
+        error = y[t] - (level + DAMPING * trend)
+        errors[t - 1] = error
+        level = level + DAMPING * trend + alpha * error
+        trend = DAMPING * trend + alpha * beta * error
+
+    warmup = min(10, len(errors) - 1)
+    best = int(np.argmin(np.mean(errors[warmup:] ** 2, axis=0)))
+
+    damping = np.cumsum(DAMPING ** np.arange(1, prediction_length + 1))
+    point = level[best] + damping * trend[best]
+    return _bands(point, errors[warmup:, best], alpha[best] ** 2)
+
+
+def seasonal_trend(values, prediction_length, season_length=None):
+    """Linear trend plus the average seasonal profile of the detrended series"""
+    values = np.asarray(values, dtype=float)
+    m = _season(values, season_length)
+    y = values[-max(MAX_FIT_POINTS, 4 * m):]
+    n = len(y)
+
+    t = np.arange(n)
+    slope, intercept = np.polyfit(t, y, 1) if n > 1 else (0.0, y[-1])
+    detrended = y - (slope * t + intercept)
+
+    # Phase counted back from the end so forecast step k has phase k % m
+    phase = (t - n) % m
+    profile = np.bincount(phase, weights=detrended, minlength=m) / np.maximum(np.bincount(phase, minlength=m), 1)
+
+    fitted = slope * t + intercept + profile[phase]
+    future = np.arange(n, n + prediction_length)
+    point = slope * future + intercept + profile[np.arange(prediction_length) % m]
+    return _bands(point, y - fitted, 1 / m)
+
+
+BASELINES = {
+    "seasonal_naive": seasonal_naive,
+    "exponential_smoothing": exponential_smoothing,
+    "seasonal_trend": seasonal_trend,
+}
+
+
+def quantile_loss(actual, low, median, high):
+    """Mean pinball loss over QUANTILE_LEVELS"""
+    actual = np.asarray(actual, dtype=float)
+    losses = []
+    for level, quantile in zip(QUANTILE_LEVELS, (low, median, high)):
+        diff = actual - np.asarray(quantile, dtype=float)
+        losses.append(np.mean(np.maximum(level * diff, (level - 1) * diff)))
+    return float(np.mean(losses))
+
+
+def holdout_length(n, prediction_length):
+    """Points held out for model selection, or None when the series is too short to spare them"""
+    holdout = min(int(prediction_length), n // 5)
+    return holdout if holdout >= 2 else None
+
+
+def scaled_loss(train, actual, forecast, season_length=None):
+    """Holdout pinball loss relative to the in-sample seasonal naive error, comparable across series"""
+    m = _season(train, season_length)
+    scale = np.mean(np.abs(train[m:] - train[:-m])) if len(train) > m else 0.0
+    return quantile_loss(actual, *forecast) / (scale or 1e-9)
+
+
+def evaluate_baselines(values, holdout, season_length=None):
+    """Scaled holdout loss of each baseline"""
+    values = np.asarray(values, dtype=float)
+    train, actual = values[:-holdout], values[-holdout:]
+    return {
+        name: scaled_loss(train, actual, forecaster(train, holdout, season_length), season_length)
+        for name, forecaster in BASELINES.items()
+    }
+
+
+def series_key(values, prediction_length, season_length):
+    digest = hashlib.sha1(np.ascontiguousarray(values, dtype=float).tobytes()).hexdigest()
+    return digest, int(prediction_length), season_length
+
+
+_choices = OrderedDict()
+_choices_lock = threading.Lock()
+MAX_CACHED_CHOICES = 256
+
+
+def cached_choice(key):
+    with _choices_lock:
+        if key in _choices:
+            _choices.move_to_end(key)
+            return _choices[key]
+    return None
+
+
+def remember_choice(key, choice):
+    with _choices_lock:
+        _choices[key] = choice
+        _choices.move_to_end(key)
+        while len(_choices) > MAX_CACHED_CHOICES:
+            _choices.popitem(last=False)
+
+
+def benchmark_baselines(n=35_040, prediction_length=96, season_length=96, seed=0):
+    """Fit time and holdout loss of each baseline on a synthetic 15-minute load series"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(n)
+    values = 5 + 2 * np.sin(2 * np.pi * t / season_length) + 0.0001 * t + rng.normal(0, 0.3, n)
+
+    report = {}
+    train, actual = values[:-prediction_length], values[-prediction_length:]
+    for name, forecaster in BASELINES.items():
+        started = time.perf_counter()
+        forecast = forecaster(train, prediction_length, season_length)
+        report[name] = {
+            "seconds": time.perf_counter() - started,
+            "scaled_loss": scaled_loss(train, actual, forecast, season_length),
+        }
+    return report
+
+
+if __name__ == "__main__":
+    for name, result in benchmark_baselines().items():
+        print(f"{name:24s} {result['seconds'] * 1000:8.1f} ms  loss {result['scaled_loss']:.3f}")
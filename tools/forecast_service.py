@@ -0,0 +1,156 @@
+import logging
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+
+import torch
+from chronos import ChronosBoltPipeline
+
+from tools.forecast_models import QUANTILE_LEVELS
+
+
+logger = logging.getLogger(__name__)
+
+class _ForecastRequest:
+    def __init__(self, context, prediction_length):
+        self.context = context
+        self.prediction_length = prediction_length
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class ForecastService:
+    """Process-wide forecast service that micro-batches requests from all sessions
+
+    Requests are collected for up to `max_wait_ms` (or until `max_batch_size`
+    requests are waiting), grouped by prediction length and sent to Chronos as
+    one batched `predict_quantiles` call per group.
+    """
+
+    def __init__(self, model_name="amazon/chronos-bolt-small", max_batch_size=None, max_wait_ms=None):
+        self.pipeline = ChronosBoltPipeline.from_pretrained(model_name, torch_dtype=torch.bfloat16)
+        self.max_batch_size = max_batch_size or int(os.getenv("FORECAST_MAX_BATCH_SIZE", 16))
+        self.max_wait = (max_wait_ms or float(os.getenv("FORECAST_MAX_WAIT_MS", 20))) / 1000
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "batches": 0,
+            "last_batch_size": 0,
+            "max_batch_size_seen": 0,
+            "total_wait_s": 0.0,
+            "max_wait_s": 0.0,
+            "total_predict_s": 0.0,
+        }
+
+        self._worker = threading.Thread(target=self._run, name="forecast-service", daemon=True)
+        self._worker.start()
+
+    def submit(self, series, prediction_length):
+        """Queue a forecast and return a concurrent Future with (low, median, high) lists"""
+        request = _ForecastRequest(torch.tensor(series, dtype=torch.float32), int(prediction_length))
+        self._queue.put(request)
+        return request.future
+
+    def get_metrics(self):
+        """Snapshot of queue depth, batch sizes and waiting times"""
+        with self._lock:
+            stats = dict(self._stats)
+
+        batches = stats["batches"] or 1
+        requests = stats["requests"] or 1
+        return {
+            "queue_depth": self._queue.qsize(),
+            "requests": stats["requests"],
+            "batches": stats["batches"],
+            "last_batch_size": stats["last_batch_size"],
+            "max_batch_size_seen": stats["max_batch_size_seen"],
+            "avg_batch_size": stats["requests"] / batches,
+            "avg_wait_ms": 1000 * stats["total_wait_s"] / requests,
+            "max_wait_ms": 1000 * stats["max_wait_s"],
+            "avg_predict_ms": 1000 * stats["total_predict_s"] / batches,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_window_ms": 1000 * self.max_wait,
+        }
+
+    def _collect(self):
+        """Block for the first request, then gather more until the window closes or the batch is full"""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+
+            groups = defaultdict(list)
+            for request in batch:
+                # Claimed futures can no longer be cancelled; ones the caller already cancelled are skipped
+                if request.future.set_running_or_notify_cancel():
+                    groups[request.prediction_length].append(request)
+
+            for prediction_length, requests in groups.items():
+                # One failing batch must not stop the worker, or every later forecast waits forever
+                try:
+                    self._predict_group(prediction_length, requests)
+                except Exception as e:
+                    logger.exception("forecast batch of %d failed", len(requests))
+                    for request in requests:
+                        if not request.future.done():
+                            request.future.set_exception(e)
+
+    def _predict_group(self, prediction_length, requests):
+        started = time.perf_counter()
+        try:
+            # Chronos left-pads contexts of different lengths when given a list
+            quantiles, _ = self.pipeline.predict_quantiles(
+                [request.context for request in requests],
+                prediction_length=prediction_length,
+                quantile_levels=QUANTILE_LEVELS
+            )
+        except Exception as e:
+            for request in requests:
+                request.future.set_exception(e)
+            return
+
+        finished = time.perf_counter()
+        waits = [started - request.enqueued_at for request in requests]
+
+        for i, request in enumerate(requests):
+            low, median, high = quantiles[i, :, 0], quantiles[i, :, 1], quantiles[i, :, 2]
+            request.future.set_result((low.tolist(), median.tolist(), high.tolist()))
+
+        with self._lock:
+            self._stats["requests"] += len(requests)
+            self._stats["batches"] += 1
+            self._stats["last_batch_size"] = len(requests)
+            self._stats["max_batch_size_seen"] = max(self._stats["max_batch_size_seen"], len(requests))
+            self._stats["total_wait_s"] += sum(waits)
+            self._stats["max_wait_s"] = max(self._stats["max_wait_s"], max(waits))
+            self._stats["total_predict_s"] += finished - started
+
+
+_services = {}
+_services_lock = threading.Lock()
+
+
+def get_forecast_service(model_name="amazon/chronos-bolt-small"):
+    """Return the shared service for a model, loading it on first use"""
+    with _services_lock:
+        if model_name not in _services:
+            _services[model_name] = ForecastService(model_name)
+        return _services[model_name]
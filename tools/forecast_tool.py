@@ -1,49 +1,95 @@
-from chronos import ChronosBoltPipeline
-import torch
+import asyncio
+import logging
+import os
+
+import numpy as np
 import pandas as pd
 from matplotlib import pyplot as plt
 
+from tools import forecast_models
+from tools.tool_schemas import TOOL_SCHEMAS
+
+
+logger = logging.getLogger(__name__)
+
 
 class ChronosForecaster:
     def __init__(self, model_name="amazon/chronos-bolt-small"):
-        self.pipeline = ChronosBoltPipeline.from_pretrained(model_name,torch_dtype=torch.bfloat16)
+        self.model_name = model_name
+        # "auto" picks per series; a baseline name or "chronos" forces that model
+        self.model = os.getenv("FORECAST_MODEL", "auto")
+        self._service = None
         self.name = "forecast_tool"
-        self.description = "Generate time-series forecasts using Chronos"
 
+    @property
+    def service(self):
+        # Imported on first use so requests served by a baseline never load torch
+        if self._service is None:
+            from tools.forecast_service import get_forecast_service
+
+            # The service is shared by every session, so the model is loaded once per process
+            self._service = get_forecast_service(self.model_name)
+        return self._service
 
     def get_tool_schema(self):
-        return {
-            "type": "function",
-            "function": {
-                "name": self.name,
-                "description": self.description,
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "column_name": {
-                            "type": "string",
-                            "description": "Name of the column to forecast"
-                        },
-                        "prediction_length": {
-                            "type": "integer",
-                            "description": "Number of time steps to predict"
-                        }
-                    },
-                    "required": ["column_name", "prediction_length"]
-                }
-            }
-        }
+        return TOOL_SCHEMAS[self.name]
+
+    async def _chronos(self, series, prediction_length):
+        # Batched together with concurrent requests from other sessions
+        return await asyncio.wrap_future(self.service.submit(list(series), prediction_length))
+
+    async def select_model(self, values, prediction_length, season_length=None):
+        """Pick the model for a series by a holdout comparison, caching the choice
 
-    async def forecast(self, series, prediction_length):
+        Baselines are scored first; Chronos is only tried (and torch only loaded)
+        when none of them is good enough and the series is long enough for it.
+        Returns (model, scores).
+        """
+        if self.model != "auto":
+            return self.model, {}
+
+        key = forecast_models.series_key(values, prediction_length, season_length)
+        cached = forecast_models.cached_choice(key)
+        if cached is not None:
+            return cached
+
+        holdout = forecast_models.holdout_length(len(values), prediction_length)
+        if holdout is None:
+            choice = ("exponential_smoothing", {})
+            forecast_models.remember_choice(key, choice)
+            return choice
+
+        scores = forecast_models.evaluate_baselines(values, holdout, season_length)
+        best = min(scores, key=scores.get)
+
+        if scores[best] > forecast_models.BASELINE_MAX_LOSS and len(values) >= forecast_models.MIN_CHRONOS_CONTEXT:
+            train = values[:-holdout]
+            forecast = await self._chronos(train, holdout)
+            scores["chronos"] = forecast_models.scaled_loss(train, values[-holdout:], forecast, season_length)
+            best = min(scores, key=scores.get)
+
+        logger.info("forecast model %s for %d points, horizon %d: %s", best, len(values), prediction_length,
+                    {name: round(score, 3) for name, score in scores.items()})
+        forecast_models.remember_choice(key, (best, scores))
+        return best, scores
+
+    async def forecast(self, series, prediction_length, season_length=None):
         """
         series: list or pandas Series of float values
         prediction_length: number of time steps to predict (e.g., 24 for 1 day hourly)
+        season_length: steps per season (e.g., 24 for hourly data); detected when omitted
         """
         if isinstance(series, pd.Series):
             series = series.dropna().tolist()
 
-        context = torch.tensor(series).unsqueeze(0)  # shape (1, len)
-        quantiles , mean = self.pipeline.predict_quantiles(context, prediction_length=prediction_length,quantile_levels=[0.7, 0.8, 0.9])
+        values = np.asarray(series, dtype=float)
+        season_length = season_length or forecast_models.detect_season(values)
+        model, scores = await self.select_model(values, prediction_length, season_length)
+
+        if model == "chronos":
+            low, median, high = await self._chronos(series, prediction_length)
+        else:
+            low, median, high = forecast_models.BASELINES[model](values, prediction_length, season_length)
 
         forecast_index = range(len(series), len(series) + prediction_length)
 
@@ -53,25 +99,25 @@ class ChronosForecaster:
         historical_index = range(start_idx, len(series))
         historical_data = series[start_idx:]
 
-        low, median, high = quantiles[0, :, 0], quantiles[0, :, 1], quantiles[0, :, 2]
-
         fig, ax = plt.subplots(figsize=(12, 6))
         ax.plot(historical_index, historical_data,color="royalblue", label="historical data")
         ax.plot(forecast_index, median, color="tomato", label="median forecast")
         ax.fill_between(forecast_index, low, high, color="tomato", alpha=0.3, label="Prediction intervals")
         ax.legend()
         ax.grid()
-        ax.set_title("Time Series Forecast")
+        ax.set_title(f"Time Series Forecast ({model})")
         ax.set_xlabel("Time Steps")
         ax.set_ylabel("Values")
 
 
         return {
-            "median_forecast": median.tolist(),
-            "low_quantile": low.tolist(),
-            "high_quantile": high.tolist(),
+            "median_forecast": median,
+            "low_quantile": low,
+            "high_quantile": high,
             "forecast_index": list(forecast_index),
-            "figure": fig
+            "figure": fig,
+            "model": model,
+            "model_scores": scores
 
         }
 
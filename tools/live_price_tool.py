@@ -1,97 +1,55 @@
-import re
-import requests
+import asyncio
+import logging
 from datetime import date
-from bs4 import BeautifulSoup
-
-def get_live_energy_data():
-    """Scrape and structure the energy provider data"""
-    link = "https://kilovatora.gr/"
-    r = requests.get(link)
-    soup = BeautifulSoup(r.text, 'html.parser')
-
-    # Get provider names
-    img_tags = soup.select('div.d-flex.justify-content-between img[alt]')
-    provider_names = []
-    for img in img_tags:
-        name = img.get('alt')
-        cleaned_name = name.split("- τιμή κιλοβατώρας")[0].strip()
-        provider_names.append(cleaned_name)
-
-    contracts_per_provider = [5, 4, 2, 2, 3, 4, 2, 1, 1, 4, 1, 1]
-
-    tables = soup.find_all('table')
-
-    provider_contracts = {}
-    all_contracts = []
-
-    # Extract all contracts
-    for table in tables:
-        rows = table.find_all('tr')
-        for row in rows:
-            cells = row.find_all(['td', 'th'])
-            if len(cells) >= 4:
-                contract_name = cells[0].get_text(strip=True)
-                contract_name = re.sub(r'Ενημέρωση:.*?\d{4}', '', contract_name).strip()
-
-                if contract_name:
-                    before_2000 = cells[2].get_text(strip=True) if len(cells) > 2 else ""
-                    after_2000 = cells[3].get_text(strip=True) if len(cells) > 3 else ""
-
-                    contract_data = {
-                        'name': contract_name,
-                        'price_under_2000': before_2000,
-                        'price_over_2000': after_2000
-                    }
-                    all_contracts.append(contract_data)
 
+from model_tiers import ModelSelector
+from tools.price_sources import collect_prices, group_by_provider
+from tools.price_table import PriceTable
+from tools.tool_schemas import TOOL_SCHEMAS
 
 
+logger = logging.getLogger(__name__)
 
-    # Assign contracts to providers
-    contract_index = 0
-    for i, provider in enumerate(provider_names):
-        if i < len(contracts_per_provider):
-            num_contracts = contracts_per_provider[i]
-            provider_contracts[provider] = all_contracts[contract_index:contract_index + num_contracts]
-            contract_index += num_contracts
+def get_live_energy_data(sources=None):
+    """Current contracts per provider, merged from all price sources
 
-    return provider_contracts
+    Each contract carries the source it came from, when it was fetched and whether
+    it is a stale copy kept from the last successful scrape.
+    """
+    records, status = collect_prices(sources)
+    if not records:
+        errors = "; ".join(f"{name}: {info.get('error')}" for name, info in status.items())
+        raise RuntimeError(f"No price source returned data ({errors})")
+    return group_by_provider(records)
 
 
 class LivePriceTool:
 
-    def __init__(self, mistral_client):
+    def __init__(self, mistral_client, model_selector=None):
         self.client = mistral_client
+        self.model_selector = model_selector or ModelSelector()
         self.name = "live_price_tool"
-        self.description = "Live scrape a greek site for energy prices from different providers and give insights about the prices"
 
     def get_tool_schema(self):
 
-        return {
-            "type": "function",
-            "function": {
-                "name": self.name,
-                "description": self.description,
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "user_query": {
-                            "type": "string",
-                            "description": "User's question about the energy prices and providers."
-                        }
-                    },
-                    "required": ["user_query"]
-                }
-            }
-        }
+        return TOOL_SCHEMAS[self.name]
+
+    async def generate_insights(self, user_query, energy_data, latency_budget_s=None):
+        """Generate insights based on user query and energy data
+
+        Ranking and filtering happen locally on the typed price table; the model only
+        sees the rows relevant to the question.
+        """
+        table = energy_data if isinstance(energy_data, PriceTable) else PriceTable.from_energy_data(energy_data)
+        rows, selection = table.select_for_query(user_query)
+        price_rows = table.to_text(rows)
 
-    async def generate_insights(self, user_query, energy_data):
-        """Generate insights based on user query and energy data"""
         system_prompt = f"""
             You are an energy market analyst with access to current electricity pricing data from Greek energy providers.
 
-            Current energy data (updated {date.today().strftime('%Y-%m-%d')}):
-            {energy_data}
+            Current energy prices in €/kWh (updated {date.today().strftime('%Y-%m-%d')}), {selection}.
+            Tier under_2000 / over_2000 is the price for annual consumption under / over 2000 kWh:
+            {price_rows}
 
             Based on this data, provide helpful and meaningful insights, comparisons.
             You can:
@@ -101,28 +59,43 @@ class LivePriceTool:
                 - Create summary tables when requested and when you considered every provider and contract
             """
 
-        chat_response = await self.client.chat.complete_async(
-            model="ministral-8b-2410",
-            messages=[
-                {
-                    "role": "system",
-                    "content": system_prompt
-                },
-                {
-                    "role": "user",
-                    "content": user_query
-                }
-            ]
+        chat_response = await self.model_selector.complete(
+            "prices",
+            lambda model: self.client.chat.complete_async(
+                model=model,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": system_prompt
+                    },
+                    {
+                        "role": "user",
+                        "content": user_query
+                    }
+                ]
+            ),
+            prompt_text=system_prompt + user_query,
+            latency_budget_s=latency_budget_s
+        )
+
+        logger.info(
+            "price insights selection=%r rows=%d/%d prompt_chars=%d",
+            selection, len(rows), len(table), len(system_prompt)
         )
 
         return chat_response.choices[0].message.content
 
 
-    async def execute(self, user_query):
+    async def execute(self, user_query, latency_budget_s=None):
 
-        energy_data = get_live_energy_data()
+        try:
+            energy_data = await asyncio.to_thread(get_live_energy_data)
+        except RuntimeError as e:
+            # Every price source failed and none has a cached copy
+            return {"status": False, "error": str(e)}
+        price_table = PriceTable.from_energy_data(energy_data)
 
-        insights = await self.generate_insights(user_query, energy_data)
+        insights = await self.generate_insights(user_query, price_table, latency_budget_s)
 
         return {
             "status" : True,
@@ -269,4 +242,4 @@ class LivePriceTool:
 #
 #
 # if __name__ == "__main__":
-#     main()
\ No newline at end of file
+#     main()
@@ -1,41 +1,29 @@
-import os
+import asyncio
 from datetime import datetime
-from tavily import TavilyClient
+
+from agent_runtime import get_tavily_client
+from model_tiers import ModelSelector
+from tools.tool_schemas import TOOL_SCHEMAS
 
 
 class GreekNewsTool:
     """Greek news research tool for the main agent"""
 
-    def __init__(self, mistral_client):
+    def __init__(self, mistral_client, model_selector=None):
+        self.name = "greek_news_tool"
         self.mistral_client = mistral_client
-        tavily_api = os.getenv('TAVILY_API_KEY')
-        self.tavily_client = TavilyClient(tavily_api)
+        self.model_selector = model_selector or ModelSelector()
+        self.tavily_client = get_tavily_client()
 
     def get_tool_schema(self):
         """Return tool schema for agent integration"""
-        return {
-            "type": "function",
-            "function": {
-                "name": "greek_news_tool",
-                "description": "Search and analyze Greek news articles on any topic from the query. Provides summaries, relevance scores, and insights from Greek news sources.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "query": {
-                            "type": "string",
-                            "description": "The news query to search for"
-                        }
-                    },
-                    "required": ["query"]
-                }
-            }
-        }
+        return TOOL_SCHEMAS[self.name]
 
-    async def execute(self, query):
+    async def execute(self, query, latency_budget_s=None):
         """Execute Greek news search and analysis"""
         try:
-            # Search phase
-            context = self._search_news(query)
+            # Search phase; the Tavily client is blocking, so keep it off the event loop
+            context = await asyncio.to_thread(self._search_news, query)
 
             if not context or len(context["sources"]) == 0:
                 return {
@@ -46,10 +34,10 @@ class GreekNewsTool:
                 }
 
             # Extract content
-            extracted_context = self._extract_context(context)
+            extracted_context = await asyncio.to_thread(self._extract_context, context)
 
             # Generate analysis
-            analysis = await self._analyze_news(extracted_context, query)
+            analysis = await self._analyze_news(extracted_context, query, latency_budget_s)
 
             return {
                 "success": True,
@@ -125,7 +113,7 @@ class GreekNewsTool:
 
         return context
 
-    async def _analyze_news(self, context, query):
+    async def _analyze_news(self, context, query, latency_budget_s=None):
         """Generate comprehensive news analysis"""
 
         # Prepare context for analysis
@@ -154,10 +142,16 @@ class GreekNewsTool:
         Focus on factual reporting and preserve important Greek terms with English explanations.
         Always include the full working URL for each article."""
 
-        response = await self.mistral_client.chat.complete_async(
-            model="mistral-medium-2508",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.1
+        response = await self.model_selector.complete(
+            "news",
+            lambda model: self.mistral_client.chat.complete_async(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.1
+            ),
+            # No tool_count: articles are not tools, and their text already sizes the prompt
+            prompt_text=prompt,
+            latency_budget_s=latency_budget_s
         )
 
-        return response.choices[0].message.content
\ No newline at end of file
+        return response.choices[0].message.content
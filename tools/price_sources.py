@@ -0,0 +1,216 @@
+import logging
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+
+import requests
+from bs4 import BeautifulSoup
+
+
+logger = logging.getLogger(__name__)
+
+
+class PriceSource:
+    """A site that publishes provider contract prices
+
+    Subclasses implement `parse(html)` returning records with the keys
+    provider, name, price_under_2000 and price_over_2000 (raw price strings).
+    """
+
+    name = "source"
+    url = None
+    timeout_s = 8
+    # Lower wins when two sources list the same provider/contract
+    priority = 100
+
+    def fetch(self):
+        response = requests.get(self.url, timeout=self.timeout_s)
+        response.raise_for_status()
+        return response.text
+
+    def parse(self, html):
+        raise NotImplementedError
+
+    def collect(self):
+        return self.parse(self.fetch())
+
+
+class FixtureSource(PriceSource):
+    """Runs another source's parser on a local HTML file instead of the live site"""
+
+    def __init__(self, source, path):
+        self.source = source
+        self.path = path
+        self.name = source.name
+        self.priority = source.priority
+        self.timeout_s = source.timeout_s
+
+    def fetch(self):
+        with open(self.path, encoding="utf-8") as f:
+            return f.read()
+
+    def parse(self, html):
+        return self.source.parse(html)
+
+
+class KilovatoraSource(PriceSource):
+    name = "kilovatora"
+    url = "https://kilovatora.gr/"
+    priority = 10
+
+    # Number of contract rows per provider, in page order
+    contracts_per_provider = [5, 4, 2, 2, 3, 4, 2, 1, 1, 4, 1, 1]
+
+    def parse(self, html):
+        soup = BeautifulSoup(html, 'html.parser')
+
+        # Get provider names
+        img_tags = soup.select('div.d-flex.justify-content-between img[alt]')
+        provider_names = [img.get('alt').split("- τιμή κιλοβατώρας")[0].strip() for img in img_tags]
+
+        # Extract all contracts
+        all_contracts = []
+        for table in soup.find_all('table'):
+            for row in table.find_all('tr'):
+                cells = row.find_all(['td', 'th'])
+                if len(cells) >= 4:
+                    contract_name = cells[0].get_text(strip=True)
+                    contract_name = re.sub(r'Ενημέρωση:.*?\d{4}', '', contract_name).strip()
+
+                    if contract_name:
+                        all_contracts.append({
+                            'name': contract_name,
+                            'price_under_2000': cells[2].get_text(strip=True),
+                            'price_over_2000': cells[3].get_text(strip=True)
+                        })
+
+        # Assign contracts to providers
+        records = []
+        contract_index = 0
+        for provider, num_contracts in zip(provider_names, self.contracts_per_provider):
+            for contract in all_contracts[contract_index:contract_index + num_contracts]:
+                records.append({'provider': provider, **contract})
+            contract_index += num_contracts
+
+        return records
+
+
+PRICE_SOURCES = [KilovatoraSource()]
+
+
+def register_source(source):
+    """Add a source to the default set used by get_live_energy_data"""
+    PRICE_SOURCES.append(source)
+
+
+# Last successful result per source, served (marked stale) when the source fails
+_last_good = {}
+
+
+def _normalize(text):
+    return re.sub(r"\s+", " ", text or "").strip().casefold()
+
+
+def _run(source):
+    started = time.perf_counter()
+    records = source.collect()
+    if not records:
+        raise ValueError("no contracts parsed")
+    return records, time.perf_counter() - started
+
+
+def collect_prices(sources=None, grace_s=1.0):
+    """Fetch all sources concurrently and return (records, source_status)
+
+    Each source runs in its own thread with its own timeout. Once the first source
+    succeeds, the others get at most `grace_s` more, so a slow or broken site does not
+    hold up the answer.
+    """
+    sources = list(PRICE_SOURCES if sources is None else sources)
+    if not sources:
+        logger.warning("no price sources to collect from")
+        return [], {}
+
+    started = time.perf_counter()
+    deadline = started + max(source.timeout_s for source in sources)
+    first_success = None
+
+    status = {}
+    results = {}
+    pool = ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix="price-source")
+    futures = {pool.submit(_run, source): source for source in sources}
+    pending = set(futures)
+
+    while pending:
+        now = time.perf_counter()
+        limit = deadline if first_success is None else min(deadline, first_success + grace_s)
+        if now >= limit:
+            break
+
+        done, pending = wait(pending, timeout=limit - now, return_when=FIRST_COMPLETED)
+        for future in done:
+            source = futures[future]
+            try:
+                records, elapsed = future.result()
+            except Exception as e:
+                status[source.name] = {"ok": False, "error": str(e)}
+                continue
+
+            fetched_at = datetime.now(timezone.utc).isoformat()
+            results[source.name] = records
+            _last_good[source.name] = (records, fetched_at)
+            status[source.name] = {"ok": True, "seconds": elapsed, "fetched_at": fetched_at,
+                                   "stale": False, "contracts": len(records)}
+            if first_success is None:
+                first_success = time.perf_counter()
+
+    pool.shutdown(wait=False, cancel_futures=True)
+
+    for source in sources:
+        if source.name not in status:
+            status[source.name] = {"ok": False, "error": "timed out"}
+        if source.name not in results and source.name in _last_good:
+            results[source.name], fetched_at = _last_good[source.name]
+            status[source.name].update({"fetched_at": fetched_at, "stale": True})
+
+    logger.info("price sources %s in %.2fs", status, time.perf_counter() - started)
+    return merge_records(results, status, sources), status
+
+
+def merge_records(results, status, sources):
+    """Deduplicate by provider/contract, preferring fresh data and then source priority"""
+    priority = {source.name: source.priority for source in sources}
+    merged = {}
+
+    for source_name, records in results.items():
+        rank = (status[source_name].get("stale", False), priority.get(source_name, 100))
+        for record in records:
+            key = (_normalize(record["provider"]), _normalize(record["name"]))
+            entry = {**record, "source": source_name, "fetched_at": status[source_name].get("fetched_at"),
+                     "stale": status[source_name].get("stale", False)}
+
+            if key not in merged:
+                merged[key] = (rank, entry, [source_name])
+                continue
+
+            best_rank, _, seen = merged[key]
+            seen.append(source_name)
+            if rank < best_rank:
+                merged[key] = (rank, entry, seen)
+
+    records = []
+    for _, entry, seen in merged.values():
+        entry["sources"] = sorted(set(seen))
+        records.append(entry)
+    return records
+
+
+def group_by_provider(records):
+    """The {provider: [contract, ...]} shape used by the UI and the price tools"""
+    grouped = {}
+    for record in records:
+        contract = {key: value for key, value in record.items() if key != "provider"}
+        grouped.setdefault(record["provider"], []).append(contract)
+    return grouped
+
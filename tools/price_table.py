@@ -0,0 +1,108 @@
+import re
+
+import numpy as np
+
+from tools.tariff_engine import parse_price
+
+
+TIERS = ("under_2000", "over_2000")
+
+_UNDER = re.compile(r"\b(under|below|less than|up to)\b|<\s*2000|κάτω|έως|μέχρι", re.IGNORECASE)
+_OVER = re.compile(r"\b(over|above|more than)\b|>\s*2000|άνω|πάνω", re.IGNORECASE)
+_CHEAP = re.compile(r"cheap|\bbest\b|lowest|\bleast\b|\bsav|φθην|καλύτερ|χαμηλ", re.IGNORECASE)
+_EXPENSIVE = re.compile(r"expensive|highest|\bworst\b|ακριβ|υψηλ", re.IGNORECASE)
+_TOP = re.compile(r"\btop\s*(\d+)|\b(\d+)\s*(?:cheapest|best|most)", re.IGNORECASE)
+
+
+class PriceTable:
+    """Columnar, typed view of the scraped prices with per-tier sort indexes
+
+    One row per (provider, contract, tier) with the price as a float in €/kWh.
+    """
+
+    def __init__(self, providers, contracts, tiers, prices):
+        self.provider = np.asarray(providers, dtype=object)
+        self.contract = np.asarray(contracts, dtype=object)
+        self.tier = np.asarray(tiers, dtype=object)
+        self.price = np.asarray(prices, dtype=float)
+
+        # Ascending price order within each tier; NaN prices sort last and are dropped
+        self._order = {}
+        for tier in TIERS:
+            rows = np.flatnonzero(self.tier == tier)
+            rows = rows[~np.isnan(self.price[rows])]
+            self._order[tier] = rows[np.argsort(self.price[rows], kind="stable")]
+
+    @classmethod
+    def from_energy_data(cls, energy_data):
+        providers, contracts, tiers, prices = [], [], [], []
+        for provider, provider_contracts in energy_data.items():
+            for contract in provider_contracts:
+                for tier in TIERS:
+                    providers.append(provider)
+                    contracts.append(contract["name"])
+                    tiers.append(tier)
+                    prices.append(parse_price(contract.get(f"price_{tier}")))
+        return cls(providers, contracts, tiers, prices)
+
+    def __len__(self):
+        return len(self.price)
+
+    @property
+    def providers(self):
+        return sorted(set(self.provider))
+
+    def rank(self, tier, k=None, provider=None, max_price=None, descending=False):
+        """Row positions for a tier ordered by price, optionally filtered"""
+        rows = self._order[tier]
+        if descending:
+            rows = rows[::-1]
+        if provider is not None:
+            rows = rows[self.provider[rows] == provider]
+        if max_price is not None:
+            rows = rows[self.price[rows] <= max_price]
+        return rows[:k] if k else rows
+
+    def all_rows(self, provider=None, tiers=TIERS):
+        rows = np.concatenate([self._order[tier] for tier in tiers])
+        if provider is not None:
+            rows = rows[self.provider[rows] == provider]
+        return rows
+
+    def to_text(self, rows):
+        """Compact pipe-separated rows for the LLM"""
+        lines = ["provider | contract | tier | €/kWh"]
+        lines.extend(
+            f"{self.provider[i]} | {self.contract[i]} | {self.tier[i]} | {self.price[i]:.4f}" for i in rows
+        )
+        return "\n".join(lines)
+
+    def select_for_query(self, query, k=5):
+        """Pick the rows a price question needs, answering ranking and filter questions locally
+
+        Returns (rows, description). Falls back to the whole table for open questions
+        such as full comparisons.
+        """
+        provider = next((name for name in self.providers if name.lower() in query.lower()), None)
+
+        tiers = []
+        if _UNDER.search(query):
+            tiers.append("under_2000")
+        if _OVER.search(query):
+            tiers.append("over_2000")
+        ranking = _CHEAP.search(query) or _EXPENSIVE.search(query)
+
+        if not ranking:
+            rows = self.all_rows(provider, tiers or TIERS)
+            return rows, f"all contracts ({', '.join(tiers or TIERS)})" + (f" of {provider}" if provider else "")
+
+        top = _TOP.search(query)
+        if top:
+            k = int(top.group(1) or top.group(2))
+
+        descending = bool(_EXPENSIVE.search(query)) and not _CHEAP.search(query)
+        rows = np.concatenate([
+            self.rank(tier, k=k, provider=provider, descending=descending) for tier in (tiers or TIERS)
+        ])
+        order = "most expensive" if descending else "cheapest"
+        return rows, f"top {k} {order} per tier ({', '.join(tiers or TIERS)})" + (f" for {provider}" if provider else "")
@@ -0,0 +1,174 @@
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from tools.energy_kernels import TIME_COLUMN, _time_indexed, energy_totals
+from tools.tool_schemas import TOOL_SCHEMAS
+
+
+TIER_THRESHOLD_KWH = 2000
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)?")
+
+
+def parse_price(text):
+    """Turn a scraped price such as '0,145 €/kWh' into a float in €/kWh (NaN if missing)"""
+    if text is None:
+        return np.nan
+    if isinstance(text, (int, float)):
+        return float(text)
+
+    match = _NUMBER.search(text)
+    if not match:
+        return np.nan
+
+    value = float(match.group().replace(",", "."))
+    if "mwh" in text.lower():
+        value /= 1000
+    return value
+
+
+def build_tariffs(energy_data):
+    """Flatten the scraped provider dict into a frame with numeric prices"""
+    rows = [
+        {
+            "provider": provider,
+            "contract": contract["name"],
+            "price_under_2000": parse_price(contract.get("price_under_2000")),
+            "price_over_2000": parse_price(contract.get("price_over_2000")),
+        }
+        for provider, contracts in energy_data.items()
+        for contract in contracts
+    ]
+    return pd.DataFrame(rows, columns=["provider", "contract", "price_under_2000", "price_over_2000"])
+
+
+def period_consumption(df, column, is_power=False, freq="MS", time_column=TIME_COLUMN):
+    """kWh per period from either energy readings (summed) or power readings (integrated)"""
+    if is_power:
+        return energy_totals(df, column, freq, time_column).fillna(0)
+    data = _time_indexed(df, time_column)[column]
+    return data.resample(freq).sum()
+
+
+def annualization_factor(times):
+    """Scale factor from the span the readings cover (first to last, plus one interval) to a full year"""
+    if len(times) < 2:
+        return 12.0
+    step = pd.Series(times).diff().median()
+    covered_days = (times[-1] - times[0] + step) / pd.Timedelta(days=1)
+    return 365.25 / covered_days
+
+
+def split_tiers(period_kwh, threshold=TIER_THRESHOLD_KWH, mode="bracket"):
+    """kWh billed at the under/over price for each period
+
+    period_kwh has shape (..., periods) of annualized consumption.
+    mode="bracket": the whole year is billed at the rate of the annual bracket it falls in.
+    mode="block": the first `threshold` kWh of the year at the under price, the rest at the over price.
+    """
+    period_kwh = np.asarray(period_kwh, dtype=float)
+
+    if mode == "bracket":
+        annual = period_kwh.sum(axis=-1, keepdims=True)
+        under = np.where(annual <= threshold, period_kwh, 0.0)
+        return under, period_kwh - under
+
+    if mode == "block":
+        cumulative = np.cumsum(period_kwh, axis=-1)
+        under = np.clip(cumulative, 0, threshold) - np.clip(cumulative - period_kwh, 0, threshold)
+        return under, period_kwh - under
+
+    raise ValueError("mode must be 'bracket' or 'block'")
+
+
+def cost_matrix(period_kwh, price_under, price_over, threshold=TIER_THRESHOLD_KWH, mode="bracket"):
+    """Cost of every contract in every period, shape (contracts, periods)"""
+    under, over = split_tiers(period_kwh, threshold, mode)
+    price_under = np.asarray(price_under, dtype=float)[:, None]
+    price_over = np.asarray(price_over, dtype=float)[:, None]
+
+    # A missing price only matters if some consumption is billed at it
+    return (np.where(under > 0, price_under * under, 0.0)
+            + np.where(over > 0, price_over * over, 0.0))
+
+
+def portfolio_costs(period_kwh, price_under, price_over, threshold=TIER_THRESHOLD_KWH, mode="bracket"):
+    """Annual cost of every customer on every contract, shape (customers, contracts)
+
+    period_kwh is (customers, periods) of annualized consumption.
+    """
+    under, over = split_tiers(period_kwh, threshold, mode)
+    return (under.sum(axis=1)[:, None] * np.asarray(price_under)[None, :]
+            + over.sum(axis=1)[:, None] * np.asarray(price_over)[None, :])
+
+
+def rank_contracts(energy_data, df, column, is_power=False, current_contract=None,
+                   threshold=TIER_THRESHOLD_KWH, mode="bracket"):
+    """Annualized cost of every contract for this consumption, cheapest first
+
+    current_contract is a contract name (optionally 'provider / contract'); savings are
+    reported against it, or against the most expensive contract if it is not given.
+    """
+    tariffs = build_tariffs(energy_data)
+    consumption = period_consumption(df, column, is_power)
+    readings = _time_indexed(df)[column].index
+    annualized = consumption.to_numpy(dtype=float) * annualization_factor(readings)
+
+    costs = cost_matrix(annualized, tariffs["price_under_2000"], tariffs["price_over_2000"], threshold, mode)
+    tariffs["annual_kwh"] = annualized.sum()
+    tariffs["annual_cost_eur"] = costs.sum(axis=1)
+    tariffs = tariffs.dropna(subset=["annual_cost_eur"])
+
+    baseline = tariffs["annual_cost_eur"].max()
+    if current_contract:
+        labels = tariffs["provider"] + " / " + tariffs["contract"]
+        match = tariffs[(tariffs["contract"] == current_contract) | (labels == current_contract)]
+        if not match.empty:
+            baseline = match["annual_cost_eur"].iloc[0]
+
+    tariffs["savings_eur"] = baseline - tariffs["annual_cost_eur"]
+    return tariffs.sort_values("annual_cost_eur").reset_index(drop=True)
+
+
+class TariffCostTool:
+    """Ranks every live contract by annual cost for the uploaded consumption data"""
+
+    def __init__(self):
+        self.name = "tariff_cost_tool"
+
+    def get_tool_schema(self):
+        return TOOL_SCHEMAS[self.name]
+
+    def execute(self, df, energy_data, column_name, is_power=False, current_contract=None, top_k=10):
+        if column_name not in df.columns:
+            return {"error": f"Column '{column_name}' not found", "table": None, "text": ""}
+
+        try:
+            table = rank_contracts(energy_data, df, column_name, is_power, current_contract)
+        except Exception as e:
+            return {"error": str(e), "table": None, "text": ""}
+
+        text = table.head(top_k).round(2).to_string(index=False)
+        return {"error": None, "table": table, "text": text}
+
+
+def benchmark_portfolio(n_customers=5000, n_contracts=30, n_periods=12, seed=0):
+    """Time the broadcast cost evaluation for a whole customer portfolio"""
+    rng = np.random.default_rng(seed)
+    period_kwh = rng.gamma(4, 80, size=(n_customers, n_periods))
+    price_under = rng.uniform(0.10, 0.20, n_contracts)
+    price_over = price_under + rng.uniform(0.0, 0.03, n_contracts)
+
+    started = time.perf_counter()
+    costs = portfolio_costs(period_kwh, price_under, price_over)
+    best = costs.argmin(axis=1)
+    elapsed = time.perf_counter() - started
+
+    return {"customers": n_customers, "contracts": n_contracts, "periods": n_periods,
+            "seconds": elapsed, "best_contract_counts": np.bincount(best, minlength=n_contracts).tolist()}
+
+
+if __name__ == "__main__":
+    print(benchmark_portfolio())
@@ -0,0 +1,178 @@
+"""Function-calling schemas of every tool
+
+Kept apart from the tool modules so the agent can advertise its tools without
+importing their heavy dependencies (torch, matplotlib, tavily, bs4).
+"""
+
+TOOL_SCHEMAS = {
+    "data_analysis_tool": {
+        "type": "function",
+        "function": {
+            "name": "data_analysis_tool",
+            "description": "Generate and execute Python code for data analysis tasks including statistics, visualizations, and data exploration",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "user_query": {
+                        "type": "string",
+                        "description": "The user's data analysis question or request"
+                    },
+                    "data_summary": {
+                        "type": "string",
+                        "description": "Summary of the dataset structure and contents"
+                    }
+                },
+                "required": ["user_query", "data_summary"]
+            }
+        }
+    },
+    "forecast_tool": {
+        "type": "function",
+        "function": {
+            "name": "forecast_tool",
+            "description": "Generate time-series forecasts with Chronos or a classical baseline, whichever fits the series best",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "column_name": {
+                        "type": "string",
+                        "description": "Name of the column to forecast"
+                    },
+                    "prediction_length": {
+                        "type": "integer",
+                        "description": "Number of time steps to predict"
+                    }
+                },
+                "required": ["column_name", "prediction_length"]
+            }
+        }
+    },
+    "live_price_tool": {
+        "type": "function",
+        "function": {
+            "name": "live_price_tool",
+            "description": "Live scrape a greek site for energy prices from different providers and give insights about the prices",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "user_query": {
+                        "type": "string",
+                        "description": "User's question about the energy prices and providers."
+                    }
+                },
+                "required": ["user_query"]
+            }
+        }
+    },
+    "greek_news_tool": {
+        "type": "function",
+        "function": {
+            "name": "greek_news_tool",
+            "description": "Search and analyze Greek news articles on any topic from the query. Provides summaries, relevance scores, and insights from Greek news sources.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {
+                        "type": "string",
+                        "description": "The news query to search for"
+                    }
+                },
+                "required": ["query"]
+            }
+        }
+    },
+    "energy_kernel_tool": {
+        "type": "function",
+        "function": {
+            "name": "energy_kernel_tool",
+            "description": (
+                "Fast precomputed energy analytics on the uploaded dataset: load profile by hour/weekday, peak "
+                "demand and its time, daily/monthly energy from power readings, load factor and baseload vs peak"
+                " split. Prefer this over data_analysis_tool for these questions."
+            ),
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "kernel": {
+                        "type": "string",
+                        "enum": ["load_profile", "peak_demand", "energy_totals", "load_factor", "baseload_peak_split"],
+                        "description": "Which computation to run"
+                    },
+                    "column_name": {
+                        "type": "string",
+                        "description": "Numeric column to analyse"
+                    },
+                    "by": {
+                        "type": "string",
+                        "enum": ["hour", "weekday", "hour_weekday"],
+                        "description": "Grouping for load_profile"
+                    },
+                    "freq": {
+                        "type": "string",
+                        "enum": ["h", "D", "W", "MS"],
+                        "description": "Period for energy_totals (hourly, daily, weekly, monthly)"
+                    }
+                },
+                "required": ["kernel", "column_name"]
+            }
+        }
+    },
+    "tariff_cost_tool": {
+        "type": "function",
+        "function": {
+            "name": "tariff_cost_tool",
+            "description": (
+                "Compute the annualized cost of every Greek electricity contract for the user's uploaded "
+                "consumption data and rank them, with savings against the current contract. Use for 'which "
+                "contract is cheapest for me' questions."
+            ),
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "column_name": {
+                        "type": "string",
+                        "description": "Column with the consumption readings"
+                    },
+                    "is_power": {
+                        "type": "boolean",
+                        "description": "True if the column holds power (kW) rather than energy per reading (kWh)"
+                    },
+                    "current_contract": {
+                        "type": "string",
+                        "description": "The user's current contract name, if mentioned"
+                    }
+                },
+                "required": ["column_name"]
+            }
+        }
+    },
+    "anomaly_detection_tool": {
+        "type": "function",
+        "function": {
+            "name": "anomaly_detection_tool",
+            "description": (
+                "Detect anomalies in meter data: spikes, seasonal outliers by hour-of-week, negative readings "
+                "and flatlines/stuck meters. Returns flagged time intervals per column."
+            ),
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "columns": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Numeric columns to check (all numeric columns if omitted)"
+                    },
+                    "window": {
+                        "type": "integer",
+                        "description": "Rolling window in readings (default 96, one day of 15-minute data)"
+                    },
+                    "threshold": {
+                        "type": "number",
+                        "description": "Robust z-score above which a reading is flagged (default 6)"
+                    }
+                },
+                "required": []
+            }
+        }
+    },
+}
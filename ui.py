@@ -1,7 +1,129 @@
-import asyncio
+import logging
 import os
+import uuid
 import streamlit as st
-from main_agent import MainAgent, load_data, display_energy_providers_carousel
+from agent_runtime import get_runtime
+from analysis_workspace import get_workspace
+from dataset_store import load_dataset
+from main_agent import MainAgent, display_energy_providers_carousel
+from memory_accounting import MemoryBudgetError, get_memory_accountant
+from session_store import get_session_store, load_table
+
+CHAT_PAGE_SIZE = 20
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+
+@st.cache_resource
+def get_agent(mistral_api_key):
+    """One agent (and its tools and clients) per process, reused across reruns and sessions"""
+    # Tools load in the background while the first page renders
+    return MainAgent(mistral_api_key, preload_tools=True)
+
+
+@st.cache_data(max_entries=512, show_spinner=False)
+def read_png(path):
+    """Rendered figure bytes; every figure is drawn once, when its message is stored"""
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@st.cache_data(max_entries=128, show_spinner=False)
+def read_table(path):
+    return load_table(path)
+
+
+def render_message(msg):
+    with st.chat_message(msg["role"]):
+        st.write(msg["content"])
+        for code in msg.get("code_blocks", []):
+            st.code(code, language="python")
+        for fig in msg.get("figures", []):
+            st.image(read_png(fig))
+        for table in msg.get("tables", []):
+            st.dataframe(table)
+        for path in msg.get("table_paths", []):
+            st.dataframe(read_table(path))
+
+
+@st.fragment
+def memory_panel():
+    # On demand: with MEMORY_TRACEMALLOC=1 the report takes an allocation snapshot
+    if st.button("Show memory report"):
+        # Other users' sessions are only listed by the admin endpoint
+        st.json(get_memory_accountant().report(session_id=st.session_state.session_id), expanded=False)
+
+
+def show_older_messages():
+    st.session_state.chat_pages += 1
+
+
+@st.fragment
+def live_prices_panel():
+    """Sidebar prices; its buttons and carousel rerun only this fragment"""
+    st.header("⚡ Live Energy Prices")
+    if st.button("🔄 Load Live Prices"):
+        from tools.live_price_tool import get_live_energy_data
+        try:
+            st.session_state.energy_data = get_live_energy_data()
+            st.success("✅ Prices loaded!")
+        except Exception as e:
+            st.error(f"❌ Failed: {e}")
+
+    if st.session_state.get("energy_data"):
+        display_energy_providers_carousel(st.session_state.energy_data)
+
+
+@st.fragment
+def data_panel(store):
+    """Upload and preview; the loaded dataset is shared with the chat through session_state"""
+    uploaded = st.file_uploader("Upload your dataset", type=["csv", "xlsx"])
+    if not uploaded:
+        st.session_state.dataset = None
+        st.session_state.upload_id = None
+        store.track_object("dataset", None, None)
+        return
+
+    change = None
+    upload_id = getattr(uploaded, "file_id", None)
+    # The same upload is not even re-hashed on reruns
+    if upload_id is None or upload_id != st.session_state.get("upload_id") or st.session_state.get("dataset") is None:
+        # Reuse the cached frame, parse only appended rows, or load a new dataset
+        try:
+            dataset, change = load_dataset(uploaded, st.session_state.get("dataset"))
+        except MemoryBudgetError as e:
+            dataset, change = None, None
+            st.error(f"❌ {e}")
+        st.session_state.dataset = dataset
+        st.session_state.upload_id = upload_id
+        store.track_object("dataset", uploaded.name, dataset.memory_bytes if dataset is not None else None)
+
+        if change == "new" and len(store):
+            # The chat belongs to the previous dataset; redraw the whole page without it
+            store.clear()
+            st.session_state.chat_pages = 1
+            st.rerun()
+
+    dataset = st.session_state.dataset
+    if dataset is not None:
+        df = dataset.clean
+        st.subheader("📂 Data Preview")
+        st.dataframe(df.head(8))
+        st.caption(f"{df.shape[0]} rows × {df.shape[1]} columns")
+        if change == "appended":
+            st.caption(f"Appended new rows to the loaded dataset in {dataset.load_seconds:.2f}s")
+
+
+@st.fragment
+def chat_history(store):
+    """Last pages of the chat; loading older messages reruns only this fragment"""
+    first_shown = max(len(store) - st.session_state.chat_pages * CHAT_PAGE_SIZE, 0)
+    if first_shown > 0:
+        st.button(f"⬆️ Load older messages ({first_shown} more)", on_click=show_older_messages)
+
+    for msg in store.page(first_shown):
+        render_message(msg)
+
 
 def main():
     st.set_page_config(page_title="Energy Assistant", page_icon=":zap:")
@@ -10,89 +132,77 @@ def main():
 
     # --- Sidebar: Live Prices ---
     with st.sidebar:
-        st.header("⚡ Live Energy Prices")
-        if st.button("🔄 Load Live Prices"):
-            from tools.live_price_tool import get_live_energy_data
-            try:
-                st.session_state.energy_data = get_live_energy_data()
-                st.success("✅ Prices loaded!")
-            except Exception as e:
-                st.error(f"❌ Failed: {e}")
-
-        if st.session_state.get("energy_data"):
-            display_energy_providers_carousel(st.session_state.energy_data)
+        live_prices_panel()
 
     # --- Session state init ---
-    st.session_state.setdefault("conversation_history", [])
-    st.session_state.setdefault("chat_messages", [])
+    # Chat messages and LLM history live in a disk-backed store, not in session_state
+    st.session_state.setdefault("session_id", uuid.uuid4().hex)
+    st.session_state.setdefault("chat_pages", 1)
+    store = get_session_store(st.session_state.session_id)
 
     # --- Setup agent ---
     mistral_api_key = os.getenv("MISTRAL_API_KEY")
     if not mistral_api_key:
         st.error("Missing MISTRAL_API_KEY env variable")
         return
-    agent = MainAgent(mistral_api_key)
-
-    # --- Upload data ---
-    df = None
-    uploaded = st.file_uploader("Upload your dataset", type=["csv", "xlsx"])
+    agent = get_agent(mistral_api_key)
+    runtime = get_runtime()
 
-    if uploaded:
-        # Reset state if a new file is uploaded
-        if "last_uploaded" not in st.session_state or st.session_state.last_uploaded != uploaded.name:
-            st.session_state.chat_messages = []
-            st.session_state.conversation_history = []
-            st.session_state.last_uploaded = uploaded.name
-
-        df = load_data(uploaded)
-        if df is not None:
-            st.subheader("📂 Data Preview")
-            st.dataframe(df.head(8))
-            st.caption(f"{df.shape[0]} rows × {df.shape[1]} columns")
+    with st.sidebar:
+        with st.expander("⚙️ Runtime metrics"):
+            st.json(runtime.get_metrics())
+        with st.expander("🧠 Memory (this session)"):
+            memory_panel()
 
+    # --- Upload data ---
+    data_panel(store)
 
     # --- Show chat ---
     st.subheader("💬 Chat")
-    for msg in st.session_state.chat_messages:
-        with st.chat_message(msg["role"]):
-            st.write(msg["content"])
-            for code in msg.get("code_blocks", []):
-                st.code(code, language="python")
-            for fig in msg.get("figures", []):
-                st.pyplot(fig)
+    chat_history(store)
 
     # --- Input ---
+    # New messages are drawn below the history as they arrive; there is no full-page rerun after an answer
     query = st.chat_input("Ask something about your data , energy prices , or news...")
     if query:
-        st.session_state.chat_messages.append({"role": "user", "content": query})
+        render_message(store.append({"role": "user", "content": query}))
+        dataset = st.session_state.get("dataset")
 
         with st.spinner("Analyzing..."):
-            result = asyncio.run(agent.analyze_query(query, df, st.session_state.conversation_history))
+            result = runtime.run(agent.analyze_query(
+                query, dataset.clean if dataset is not None else None, store.get_history(),
+                dataset_summary=dataset.summary if dataset is not None else None,
+                workspace=get_workspace(st.session_state.session_id)
+            ))
 
         if result["type"] == "tool_with_response":
-            figures, code_blocks = [], []
+            figures, code_blocks, tables = [], [], []
             for tool_result in result["tool_results"]:
                 figures.extend(tool_result.get("figures", []))
+                for key in ("table", "intervals"):
+                    if tool_result.get(key) is not None:
+                        tables.append(tool_result[key])
                 if tool_result.get("type") == "analysis":
                     code_blocks.append(tool_result.get("code", ""))
                 if tool_result.get("type") == "forecast":
                     fig = tool_result.get("result", {}).get("figure")
                     if fig: figures.append(fig)
 
-            st.session_state.chat_messages.append({
+            message = {
                 "role": "assistant",
                 "content": result["llm_response"],
                 "figures": figures,
-                "code_blocks": code_blocks
-            })
+                "code_blocks": code_blocks,
+                "tables": tables
+            }
         else:
-            st.session_state.chat_messages.append({
+            message = {
                 "role": "assistant",
                 "content": result["response"]
-            })
+            }
 
-        st.session_state.conversation_history = result["conversation_history"]
-        st.rerun()
+        render_message(store.append(message))
+        store.set_history(result["conversation_history"])
 
 if __name__ == "__main__":
     main()